@@ -19,7 +19,10 @@ import os
 # Imports locais
 from models import User, Site, MonitorLog, Payment, SystemConfig
 from database import SessionLocal
-from auth import decode_token, get_password_hash, verify_password
+from auth import decode_token, get_password_hash_async, verify_password_async
+from password_pool import PasswordPoolBusy
+from user_cache import invalidate_user
+from heartbeat_store import invalidate_slug
 
 
 # ============================================
@@ -51,7 +54,10 @@ class AdminAuth(AuthenticationBackend):
             if not user:
                 return False
             
-            if not verify_password(password, user.hashed_password):
+            try:
+                if not await verify_password_async(password, user.hashed_password):
+                    return False
+            except PasswordPoolBusy:
                 return False
             
             # 🔒 REGRA DE OURO: Apenas superusers podem acessar
@@ -229,9 +235,23 @@ class UserAdmin(ModelView, model=User):
         """Hook executado ao criar/editar usuário"""
         # Se está setando nova senha
         if 'password' in data and data['password']:
-            model.hashed_password = get_password_hash(data['password'])
+            model.hashed_password = await get_password_hash_async(data['password'])
             del data['password']
     
+    async def after_model_change(self, data: dict, model: User, is_created: bool, request: Request) -> None:
+        """Descarta o usuário do cache de autenticação (plano, status, admin)"""
+        invalidate_user(model.id)
+    
+    async def on_model_delete(self, model: User, request: Request) -> None:
+        """Guarda os slugs dos heartbeats apagados em cascata com o usuário"""
+        request.state.heartbeat_slugs = [heartbeat.slug for heartbeat in model.heartbeat_checks]
+    
+    async def after_model_delete(self, model: User, request: Request) -> None:
+        invalidate_user(model.id)
+        # Após o commit: a rota /ping/{slug} deixa de aceitar os heartbeats apagados
+        for slug in getattr(request.state, "heartbeat_slugs", []):
+            invalidate_slug(slug)
+    
     # TODO: Implementar actions customizadas
     # - Impersonate User (gerar JWT e redirecionar)
     # - Ban/Unban User (toggle is_active)
@@ -0,0 +1,161 @@
+"""
+SentinelWeb - KPIs do Dashboard Executivo (Admin)
+=================================================
+O dashboard do admin consulta /admin/api/dashboard-stats em polling, e
+cada aba aberta multiplica a carga. Aqui os KPIs são calculados em duas
+consultas agregadas (usuários + pagamentos vencidos, sites por status)
+e guardados como snapshot no Redis pela task refresh_admin_stats
+(Celery Beat, a cada ADMIN_STATS_REFRESH_SECONDS). A rota só lê o
+snapshot; sem ele (beat parado, Redis reiniciado), recalcula na hora.
+
+Chaves no Redis:
+    admin:dashboard_stats → JSON com os KPIs, profundidade das filas e generated_at
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Payment, PaymentStatus, Site, User
+from plan_limits import get_plan_comparison
+from redis_pool import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Intervalo de recálculo do snapshot pelo Celery Beat (segundos)
+ADMIN_STATS_REFRESH_SECONDS = float(os.getenv("ADMIN_STATS_REFRESH_SECONDS", "30"))
+
+# Snapshot expira se o beat parar (a rota volta a calcular na hora)
+ADMIN_STATS_SNAPSHOT_TTL = int(os.getenv("ADMIN_STATS_SNAPSHOT_TTL", str(int(ADMIN_STATS_REFRESH_SECONDS * 4))))
+
+# Filas do Celery exibidas no dashboard (fila padrão + fila de Whois)
+ADMIN_STATS_QUEUES = [
+    queue.strip() for queue in os.getenv(
+        "ADMIN_STATS_QUEUES", f"celery,{os.getenv('WHOIS_QUEUE', 'whois')}"
+    ).split(",") if queue.strip()
+]
+
+SNAPSHOT_KEY = "admin:dashboard_stats"
+
+
+# ============================================
+# CÁLCULO
+# ============================================
+
+def compute_kpis(db: Session) -> Dict:
+    """
+    KPIs de negócio e operação em duas consultas agregadas (COUNT ... FILTER).
+
+    Returns:
+        Dict com MRR, ARPU, churn risk, health score e as contagens por
+        plano / status (mesmas chaves da rota antiga)
+    """
+    users = db.execute(
+        select(
+            func.count(User.id).label("total"),
+            func.count(User.id).filter(User.plan_status == 'free').label("free"),
+            func.count(User.id).filter(User.plan_status == 'pro').label("pro"),
+            func.count(User.id).filter(User.plan_status == 'agency').label("agency"),
+            # Churn Risk: pagamentos vencidos (subconsulta na mesma ida ao banco)
+            select(func.count(Payment.id))
+            .where(Payment.status == PaymentStatus.OVERDUE)
+            .scalar_subquery().label("overdue"),
+        ).where(User.is_active == True)
+    ).one()
+
+    sites = db.execute(
+        select(
+            func.count(Site.id).label("total"),
+            func.count(Site.id).filter(Site.current_status == 'online').label("online"),
+            func.count(Site.id).filter(Site.current_status == 'offline').label("offline"),
+            func.count(Site.id).filter(Site.current_status == 'unknown').label("unknown"),
+        ).where(Site.is_active == True)
+    ).one()
+
+    # MRR (Monthly Recurring Revenue) com os preços de plan_limits
+    prices = get_plan_comparison()
+    mrr = users.pro * prices['pro']['price'] + users.agency * prices['agency']['price']
+
+    return {
+        "mrr": mrr,
+        "arpu": mrr / users.total if users.total > 0 else 0,
+        "churn_risk": users.overdue,
+        # Saúde Operacional: % de sites online
+        "health_score": round((sites.online / sites.total * 100) if sites.total > 0 else 100, 1),
+        "total_users": users.total,
+        "total_sites": sites.total,
+        "plan_free": users.free,
+        "plan_pro": users.pro,
+        "plan_agency": users.agency,
+        "sites_online": sites.online,
+        "sites_offline": sites.offline,
+        "sites_unknown": sites.unknown,
+    }
+
+
+def queue_depths() -> Dict[str, int]:
+    """
+    Tarefas aguardando em cada fila do Celery (LLEN no broker Redis, um
+    round-trip pelo pool compartilhado). Redis indisponível = dict vazio.
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for queue in ADMIN_STATS_QUEUES:
+            pipe.llen(queue)
+        return dict(zip(ADMIN_STATS_QUEUES, pipe.execute()))
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao ler as filas do Celery no Redis: {e}")
+        return {}
+
+
+# ============================================
+# SNAPSHOT
+# ============================================
+
+def refresh_snapshot() -> Dict:
+    """
+    Recalcula os KPIs (sessão própria) e grava o snapshot no Redis.
+
+    Returns:
+        O snapshot gravado (também devolvido se o Redis falhar)
+    """
+    db = SessionLocal()
+    try:
+        snapshot = compute_kpis(db)
+    finally:
+        db.close()
+
+    queues = queue_depths()
+    snapshot.update({
+        "queue_size": sum(queues.values()),
+        "queues": queues,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+    try:
+        get_redis().set(SNAPSHOT_KEY, json.dumps(snapshot), ex=max(1, ADMIN_STATS_SNAPSHOT_TTL))
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível gravar o snapshot do admin no Redis: {e}")
+
+    return snapshot
+
+
+async def get_snapshot() -> Optional[Dict]:
+    """Snapshot atual do Redis, ou None se não houver (ou o Redis estiver indisponível)"""
+    try:
+        raw = await get_async_redis().get(SNAPSHOT_KEY)
+    except Exception as e:
+        logger.warning(f"⚠️ Redis indisponível para o snapshot do admin: {e}")
+        return None
+
+    return json.loads(raw) if raw else None
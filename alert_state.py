@@ -0,0 +1,307 @@
+"""
+SentinelWeb - Estado de Alertas (deduplicação e anti-flapping)
+==============================================================
+Decide QUANDO um alerta deve ser enviado, a partir do resultado de cada
+check. O conteúdo da mensagem continua com quem chama (tasks.py).
+
+Para cada site × tipo de alerta (AlertState):
+- Confirmação N-de-M: só abre o alerta se N dos últimos M checks falharam
+- Histerese: só fecha após R checks seguidos OK
+- Fingerprint: com o alerta aberto, avisa de novo só se o problema mudou
+  (ex: entrou em mais uma RBL), não a cada scan
+- Re-notificação: lembrete a cada X horas enquanto o problema persistir
+- Flapping: se o alerta abre/fecha demais em pouco tempo, avisa uma vez
+  que o site está instável e silencia até estabilizar
+
+Eventos retornados por AlertStateStore.evaluate:
+    'fire', 'changed', 'renotify', 'resolve', 'flapping' ou None
+
+As mensagens decididas aqui só vão para a fila (enqueue_alert) depois do
+commit da sessão: se a transação do scan falhar, o estado não avança e
+nenhum alerta sai.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from alerts import enqueue_alert
+from models import AlertState
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+ALERT_DOWN_WINDOW = int(os.getenv("ALERT_DOWN_WINDOW", "3"))
+ALERT_DOWN_THRESHOLD = int(os.getenv("ALERT_DOWN_THRESHOLD", "2"))
+ALERT_RECOVER_CHECKS = int(os.getenv("ALERT_RECOVER_CHECKS", "2"))
+ALERT_DOWN_RENOTIFY_HOURS = float(os.getenv("ALERT_DOWN_RENOTIFY_HOURS", "6"))
+ALERT_RENOTIFY_HOURS = float(os.getenv("ALERT_RENOTIFY_HOURS", "24"))
+
+ALERT_FLAP_WINDOW_MINUTES = int(os.getenv("ALERT_FLAP_WINDOW_MINUTES", "60"))
+ALERT_FLAP_THRESHOLD = int(os.getenv("ALERT_FLAP_THRESHOLD", "4"))
+
+# window/threshold: N-de-M para abrir; recover: checks OK seguidos para fechar;
+# renotify_hours: lembrete enquanto aberto (0 = nunca); notify_resolve: avisa ao fechar
+ALERT_RULES = {
+    "down": {
+        "window": ALERT_DOWN_WINDOW,
+        "threshold": ALERT_DOWN_THRESHOLD,
+        "recover": ALERT_RECOVER_CHECKS,
+        "renotify_hours": ALERT_DOWN_RENOTIFY_HOURS,
+        "notify_resolve": True,
+    },
+    "blacklist": {"window": 1, "threshold": 1, "recover": 1, "renotify_hours": ALERT_RENOTIFY_HOURS, "notify_resolve": True},
+    "wordpress_vulns": {"window": 1, "threshold": 1, "recover": 1, "renotify_hours": ALERT_RENOTIFY_HOURS * 7, "notify_resolve": True},
+    "cve": {"window": 1, "threshold": 1, "recover": 1, "renotify_hours": ALERT_RENOTIFY_HOURS * 7, "notify_resolve": True},
+    "security_headers": {"window": 1, "threshold": 1, "recover": 1, "renotify_hours": ALERT_RENOTIFY_HOURS * 7, "notify_resolve": False},
+    "seo_noindex": {"window": 1, "threshold": 1, "recover": 1, "renotify_hours": ALERT_RENOTIFY_HOURS, "notify_resolve": True},
+    "performance": {"window": 1, "threshold": 1, "recover": 1, "renotify_hours": ALERT_RENOTIFY_HOURS * 7, "notify_resolve": False},
+    "visual": {"window": 1, "threshold": 1, "recover": 1, "renotify_hours": ALERT_RENOTIFY_HOURS * 7, "notify_resolve": False},
+}
+
+# Nome de cada tipo nas mensagens genéricas (resolvido / instável)
+ALERT_LABELS = {
+    "down": "Site fora do ar",
+    "blacklist": "Blacklist (RBL)",
+    "wordpress_vulns": "Vulnerabilidades WordPress",
+    "cve": "Vulnerabilidades críticas (CVE)",
+    "security_headers": "Security Headers nota F",
+    "seo_noindex": "Bloqueio de indexação",
+    "performance": "Performance crítica",
+    "visual": "Mudança visual",
+}
+
+# Eventos que levam a mensagem do problema (os demais têm mensagem própria)
+PROBLEM_EVENTS = {"fire", "changed", "renotify"}
+
+
+def fingerprint(value) -> str:
+    """Assinatura estável de um problema (listas são ordenadas)"""
+    if isinstance(value, (list, tuple, set)):
+        value = sorted(str(item) for item in value)
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# ============================================
+# STORE
+# ============================================
+
+class AlertStateStore:
+    """
+    Acesso aos AlertState de uma sessão, com cache por (site_id, tipo).
+
+    Uma instância por sessão (for_session); não faz commit, as mudanças
+    entram na transação de quem chama (junto com o scan).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._states: Dict[Tuple[int, str], Optional[AlertState]] = {}
+        self._outbox: List[Tuple[str, str]] = []
+
+    @classmethod
+    def for_session(cls, db: Session) -> "AlertStateStore":
+        """Store associado à sessão (criado na primeira chamada)"""
+        if "alert_state_store" not in db.info:
+            store = cls(db)
+            event.listen(db, "after_commit", store._send_outbox)
+            event.listen(db, "after_rollback", store._discard)
+            db.info["alert_state_store"] = store
+        return db.info["alert_state_store"]
+
+    def queue(self, message: str, chat_id: str) -> None:
+        """Agenda a mensagem para depois do commit"""
+        self._outbox.append((message, chat_id))
+
+    def _send_outbox(self, session: Session) -> None:
+        outbox, self._outbox = self._outbox, []
+        for message, chat_id in outbox:
+            enqueue_alert(message, chat_id)
+
+    def _discard(self, session: Session) -> None:
+        # Linhas novas somem no rollback: o cache é recarregado do banco
+        self._outbox.clear()
+        self._states.clear()
+
+    def preload(self, site_ids: Iterable[int], alert_types: Optional[Iterable[str]] = None) -> None:
+        """Carrega os estados de vários sites em uma query (scans em lote)"""
+        site_ids = list(site_ids)
+        types = list(alert_types or ALERT_RULES)
+        if not site_ids:
+            return
+
+        for site_id in site_ids:
+            for alert_type in types:
+                self._states.setdefault((site_id, alert_type), None)
+
+        rows = self.db.query(AlertState).filter(
+            AlertState.site_id.in_(site_ids),
+            AlertState.alert_type.in_(types)
+        ).all()
+        for state in rows:
+            self._states[(state.site_id, state.alert_type)] = state
+
+    def get(self, site_id: int, alert_type: str) -> Optional[AlertState]:
+        key = (site_id, alert_type)
+        if key not in self._states:
+            self._states[key] = self.db.query(AlertState).filter(
+                AlertState.site_id == site_id,
+                AlertState.alert_type == alert_type
+            ).first()
+        return self._states[key]
+
+    def _create(self, site_id: int, alert_type: str) -> AlertState:
+        state = AlertState(site_id=site_id, alert_type=alert_type, status='ok', history='', notify_count=0)
+        self.db.add(state)
+        self._states[(site_id, alert_type)] = state
+        return state
+
+    def evaluate(self, site_id: int, alert_type: str, failing: bool,
+                 problem_fingerprint: Optional[str] = None, now: Optional[datetime] = None) -> Optional[str]:
+        """
+        Registra o resultado de um check e decide se o dono deve ser avisado.
+
+        Args:
+            site_id: ID do site
+            alert_type: Chave de ALERT_RULES
+            failing: True se a condição de alerta está presente neste check
+            problem_fingerprint: Assinatura do problema (ver fingerprint())
+            now: Horário de referência (UTC)
+
+        Returns:
+            'fire', 'changed', 'renotify', 'resolve', 'flapping' ou None
+        """
+        rule = ALERT_RULES[alert_type]
+        now = now or datetime.now(timezone.utc)
+
+        state = self.get(site_id, alert_type)
+        if state is None:
+            # Sites saudáveis não ganham linha (nada a lembrar)
+            if not failing:
+                return None
+            state = self._create(site_id, alert_type)
+
+        keep = max(rule["window"], rule["recover"])
+        history = ((state.history or '') + ('1' if failing else '0'))[-keep:]
+        if state.history != history:
+            state.history = history
+
+        event = None
+
+        if state.status != 'firing':
+            if failing and history[-rule["window"]:].count('1') >= rule["threshold"]:
+                state.status = 'firing'
+                state.opened_at = now
+                state.fingerprint = problem_fingerprint
+                event = self._transition(state, now, 'fire')
+
+        elif not failing:
+            if history[-rule["recover"]:] == '0' * rule["recover"]:
+                state.status = 'ok'
+                state.fingerprint = None
+                event = self._transition(state, now, 'resolve')
+                if event == 'resolve' and not rule["notify_resolve"]:
+                    event = None
+
+        elif problem_fingerprint and problem_fingerprint != state.fingerprint:
+            # Sem assinatura anterior (ex: estado criado pela migração): só registra
+            if state.fingerprint:
+                event = 'changed'
+            state.fingerprint = problem_fingerprint
+
+        elif rule["renotify_hours"] and state.last_notified_at and not state.flapping:
+            if now - _as_utc(state.last_notified_at) >= timedelta(hours=rule["renotify_hours"]):
+                event = 'renotify'
+
+        # Fim do flapping: nenhuma transição na janela. Avisa o estado atual,
+        # já que os avisos ficaram suspensos
+        if event is None and state.flapping and not self._recent_transitions(state, now):
+            state.flapping = False
+            if state.status == 'firing':
+                event = 'fire'
+            elif rule["notify_resolve"]:
+                event = 'resolve'
+
+        if event:
+            state.last_notified_at = now
+            state.notify_count = (state.notify_count or 0) + 1
+
+        return event
+
+    @staticmethod
+    def _recent_transitions(state: AlertState, now: datetime) -> List[float]:
+        horizon = now.timestamp() - ALERT_FLAP_WINDOW_MINUTES * 60
+        return [t for t in json.loads(state.transitions or '[]') if t >= horizon]
+
+    def _transition(self, state: AlertState, now: datetime, event: str) -> Optional[str]:
+        """Registra abertura/fechamento e aplica a supressão de flapping"""
+        recent = self._recent_transitions(state, now)
+        recent.append(now.timestamp())
+        state.transitions = json.dumps(recent)
+
+        if len(recent) >= ALERT_FLAP_THRESHOLD:
+            if state.flapping:
+                return None  # Já avisado: silencia até estabilizar
+            state.flapping = True
+            return 'flapping'
+
+        if state.flapping:
+            state.flapping = False
+
+        return event
+
+
+def format_alert(event: str, message: Optional[str], alert_type: str, site_label: str,
+                 state: Optional[AlertState] = None, resolved_message: Optional[str] = None) -> str:
+    """
+    Monta a mensagem final de um evento.
+
+    Args:
+        event: Evento retornado por evaluate()
+        message: Mensagem do problema (fire/changed/renotify)
+        alert_type: Chave de ALERT_RULES
+        site_label: Nome do site nas mensagens genéricas
+        state: AlertState (para o "desde" do lembrete)
+        resolved_message: Mensagem própria de resolução (ex: site voltou)
+    """
+    label = ALERT_LABELS.get(alert_type, alert_type)
+    now = datetime.now(timezone.utc).strftime('%d/%m/%Y %H:%M:%S')
+
+    if event == 'resolve':
+        return resolved_message or (
+            f"✅ <b>RESOLVIDO - {label.upper()}</b>\n\n"
+            f"🌐 <b>Site:</b> {site_label}\n"
+            f"⏰ <b>Horário:</b> {now} UTC\n\n"
+            f"O problema não foi mais detectado."
+        )
+
+    if event == 'flapping':
+        return (
+            f"〰️ <b>ALERTA INSTÁVEL - {label.upper()}</b>\n\n"
+            f"🌐 <b>Site:</b> {site_label}\n"
+            f"⏰ <b>Horário:</b> {now} UTC\n\n"
+            f"O alerta abriu e fechou {ALERT_FLAP_THRESHOLD} vezes em "
+            f"{ALERT_FLAP_WINDOW_MINUTES} minutos. Novos avisos deste tipo ficam "
+            f"suspensos até o site estabilizar."
+        )
+
+    if event == 'renotify':
+        since = ""
+        if state is not None and state.opened_at:
+            since = f" (desde {_as_utc(state.opened_at).strftime('%d/%m/%Y %H:%M')} UTC)"
+        return f"🔁 <b>LEMBRETE - PROBLEMA AINDA ATIVO</b>{since}\n\n{message}"
+
+    if event == 'changed':
+        return f"🔄 <b>ATUALIZAÇÃO - O PROBLEMA MUDOU</b>\n\n{message}"
+
+    return message
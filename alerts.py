@@ -0,0 +1,443 @@
+"""
+SentinelWeb - Fila e Dispatcher de Alertas Telegram
+===================================================
+Os scans e verificações não chamam mais a API do Telegram diretamente:
+enqueue_alert() só grava o alerta no Redis e retorna. A task
+dispatch_alerts (Celery Beat, a cada poucos segundos) envia o que venceu.
+
+- Agrupamento: alertas para o mesmo chat dentro de ALERT_COALESCE_SECONDS
+  viram uma única mensagem (digest), ex: vários sites caindo juntos
+- Limites do Telegram: token bucket global (~30 msg/s, do processo) e
+  intervalo mínimo por chat (~1 msg/s, no Redis); ambos valem entre
+  execuções do dispatcher
+- 429: pausa global no Redis até o retry_after; enquanto durar, o
+  dispatcher não retira nada da fila
+- Envio assíncrono e concorrente pelo AsyncClient do http_pool
+- Retry com backoff exponencial; 429 respeita o retry_after do Telegram
+- Sem Redis, cai para o envio síncrono (send_telegram_alert)
+
+Chaves no Redis:
+    alerts:due               → zset {chat_id: epoch em que o digest deve sair}
+    alerts:pending:{chat_id} → lista de JSON {"text", "attempts"}
+    alerts:dispatch:lock     → lock do dispatcher
+    alerts:pause_until       → epoch até quando o Telegram pediu pausa (429)
+    alerts:chat_next:{id}    → epoch do próximo envio permitido para o chat
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from redis.exceptions import LockError
+
+from http_pool import get_async_http_client, run_async
+from redis_pool import get_redis
+from scanner import TELEGRAM_BOT_TOKEN, send_telegram_alert
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Janela de agrupamento dos alertas do mesmo chat
+ALERT_COALESCE_SECONDS = float(os.getenv("ALERT_COALESCE_SECONDS", "15"))
+
+# Limites do Telegram (mensagens por segundo)
+ALERT_GLOBAL_RATE = float(os.getenv("ALERT_GLOBAL_RATE", "25"))
+ALERT_CHAT_RATE = float(os.getenv("ALERT_CHAT_RATE", "1"))
+
+# Retry
+ALERT_MAX_RETRIES = int(os.getenv("ALERT_MAX_RETRIES", "5"))
+ALERT_RETRY_BASE_SECONDS = float(os.getenv("ALERT_RETRY_BASE_SECONDS", "5"))
+ALERT_RETRY_MAX_SECONDS = float(os.getenv("ALERT_RETRY_MAX_SECONDS", "300"))
+
+# Máximo de chats processados por execução do dispatcher
+ALERT_DISPATCH_BATCH = int(os.getenv("ALERT_DISPATCH_BATCH", "500"))
+
+# Limite de tamanho de mensagem do Telegram
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+DUE_KEY = "alerts:due"
+PENDING_PREFIX = "alerts:pending:"
+DISPATCH_LOCK = "alerts:dispatch:lock"
+PAUSE_KEY = "alerts:pause_until"
+CHAT_NEXT_PREFIX = "alerts:chat_next:"
+
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+# Retira da fila os chats vencidos e devolve [chat_id, [itens], ...]
+_CLAIM_SCRIPT = """
+local chats = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local result = {}
+for _, chat in ipairs(chats) do
+    redis.call('ZREM', KEYS[1], chat)
+    local key = ARGV[3] .. chat
+    table.insert(result, chat)
+    table.insert(result, redis.call('LRANGE', key, 0, -1))
+    redis.call('DEL', key)
+end
+return result
+"""
+
+# Grava a pausa global só se for mais longa que a atual
+_PAUSE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tonumber(ARGV[1]) > current then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+end
+return 1
+"""
+
+
+# ============================================
+# ENFILEIRAMENTO
+# ============================================
+
+def enqueue_alert(message: str, chat_id: str, attempts: int = 0, delay: Optional[float] = None) -> bool:
+    """
+    Enfileira um alerta para o chat (mesma assinatura de send_telegram_alert).
+
+    O primeiro alerta de um chat abre a janela de agrupamento; os seguintes
+    entram no mesmo digest.
+
+    Args:
+        message: Mensagem (HTML do Telegram)
+        chat_id: ID do chat do Telegram do usuário
+        attempts: Tentativas já feitas (uso interno do retry)
+        delay: Segundos até o envio (padrão: ALERT_COALESCE_SECONDS)
+
+    Returns:
+        True se enfileirado (ou enviado pelo fallback), False caso contrário
+    """
+    if not chat_id:
+        print("⚠️  chat_id não fornecido. Alerta não enviado.")
+        return False
+
+    item = json.dumps({"text": message, "attempts": attempts}, ensure_ascii=False)
+    due = time.time() + (ALERT_COALESCE_SECONDS if delay is None else delay)
+
+    try:
+        with get_redis().pipeline(transaction=True) as pipe:
+            pipe.rpush(PENDING_PREFIX + str(chat_id), item)
+            # Alerta novo não adia a janela já aberta; retry empurra para depois
+            if delay is None:
+                pipe.zadd(DUE_KEY, {str(chat_id): due}, nx=True)
+            else:
+                pipe.zadd(DUE_KEY, {str(chat_id): due}, gt=True)
+            pipe.execute()
+        return True
+
+    except Exception as e:
+        logger.warning(f"⚠️ Fila de alertas indisponível, enviando direto: {e}")
+        return send_telegram_alert(message, chat_id)
+
+
+# ============================================
+# LIMITES DE ENVIO
+# ============================================
+
+class TokenBucket:
+    """Token bucket assíncrono (uso em um único event loop)"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_bucket_pid: Optional[int] = None
+_global_bucket: Optional[TokenBucket] = None
+
+
+def get_global_bucket() -> TokenBucket:
+    """Bucket global do processo (sobrevive entre execuções; recriado após fork)"""
+    global _bucket_pid, _global_bucket
+
+    if _global_bucket is None or _bucket_pid != os.getpid():
+        _bucket_pid = os.getpid()
+        _global_bucket = TokenBucket(ALERT_GLOBAL_RATE)
+
+    return _global_bucket
+
+
+def paused_until() -> float:
+    """Epoch até quando os envios estão pausados por um 429 (0 = sem pausa)"""
+    try:
+        return float(get_redis().get(PAUSE_KEY) or 0)
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao ler a pausa de alertas no Redis: {e}")
+        return 0.0
+
+
+def pause_sending(retry_after: float) -> None:
+    """Pausa todos os envios por retry_after segundos (vale para todos os workers)"""
+    until = time.time() + retry_after
+    try:
+        get_redis().eval(_PAUSE_SCRIPT, 1, PAUSE_KEY, until, max(1, int(retry_after * 1000)))
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao gravar a pausa de alertas no Redis: {e}")
+
+
+def _chat_next_send(chat_id: str) -> float:
+    try:
+        return float(get_redis().get(CHAT_NEXT_PREFIX + chat_id) or 0)
+    except Exception:
+        return 0.0
+
+
+def _mark_chat_sent(chat_id: str) -> float:
+    """Registra o envio e devolve o epoch do próximo envio permitido para o chat"""
+    interval = 1 / ALERT_CHAT_RATE
+    next_at = time.time() + interval
+    try:
+        get_redis().set(CHAT_NEXT_PREFIX + chat_id, next_at, px=max(1, int(interval * 1000)))
+    except Exception:
+        pass
+    return next_at
+
+
+# ============================================
+# DIGEST
+# ============================================
+
+def build_digest(texts: List[str]) -> List[str]:
+    """
+    Junta os alertas de um chat em mensagens de até 4096 caracteres.
+
+    Um único alerta sai como está; vários ganham um cabeçalho com o total.
+    A quebra acontece sempre entre alertas, para não cortar tags HTML.
+    """
+    if len(texts) == 1:
+        return texts
+
+    header = f"📬 <b>{len(texts)} alertas</b>\n\n"
+    messages = []
+    current = header
+
+    for text in texts:
+        candidate = text if current in ("", header) else DIGEST_SEPARATOR + text
+        if len(current) + len(candidate) > TELEGRAM_MAX_MESSAGE_LENGTH and current not in ("", header):
+            messages.append(current)
+            current = text
+        else:
+            current += candidate
+
+    messages.append(current)
+    return messages
+
+
+# ============================================
+# ENVIO
+# ============================================
+
+async def _send_message(client: httpx.AsyncClient, chat_id: str, text: str) -> Tuple[bool, Optional[float]]:
+    """
+    Envia uma mensagem.
+
+    Returns:
+        (sucesso, retry_after) — retry_after vem do 429 do Telegram;
+        None em erros definitivos (ex: 400 chat inexistente)
+    """
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+
+    try:
+        response = await client.post(url, json=payload, timeout=10)
+    except httpx.HTTPError as e:
+        print(f"❌ Exceção ao enviar alerta Telegram: {e}")
+        return False, 0.0
+
+    if response.status_code == 200:
+        return True, None
+
+    if response.status_code == 429:
+        try:
+            retry_after = float(response.json().get("parameters", {}).get("retry_after", 0))
+        except ValueError:
+            retry_after = 0.0
+        print(f"⏳ Telegram rate limit para chat_id {chat_id}: retry_after={retry_after}s")
+        return False, retry_after
+
+    if response.status_code >= 500:
+        return False, 0.0
+
+    print(f"❌ Erro ao enviar alerta Telegram: {response.status_code} - {response.text}")
+    return False, None
+
+
+def _retry_delay(attempts: int, retry_after: float) -> float:
+    backoff = ALERT_RETRY_BASE_SECONDS * (2 ** attempts)
+    return min(ALERT_RETRY_MAX_SECONDS, max(retry_after, backoff))
+
+
+def _requeue(messages: List[str], chat_id: str, attempts: int, delay: float) -> None:
+    """Reenfileira as mensagens do chat (Redis síncrono: no dispatcher, via to_thread)"""
+    for message in messages:
+        enqueue_alert(message, chat_id, attempts=attempts, delay=delay)
+
+
+async def _dispatch_chat(client: httpx.AsyncClient, chat_id: str, items: List[Dict],
+                         global_bucket: TokenBucket, stats: Dict[str, int],
+                         unsent: Dict[str, List[Tuple[str, int]]]) -> None:
+    """
+    Envia o digest de um chat; o que falhar volta para a fila com backoff.
+
+    unsent[chat_id] guarda as mensagens ainda não resolvidas (nem enviadas,
+    nem reenfileiradas, nem descartadas); se o envio for interrompido, quem
+    chama devolve essas mensagens à fila.
+    """
+    attempts = max(item.get("attempts", 0) for item in items)
+    messages = build_digest([item["text"] for item in items])
+    unsent[chat_id] = [(text, attempts) for text in messages]
+    # Redis síncrono fora do event loop (o loop do http_pool também roda os scans)
+    next_at = await asyncio.to_thread(_chat_next_send, chat_id)
+
+    for index, text in enumerate(messages):
+        # Intervalo mínimo por chat (inclui envios de execuções anteriores)
+        wait = next_at - time.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await global_bucket.acquire()
+
+        # Outro chat tomou 429 enquanto este esperava: devolve o resto à fila
+        pause = await asyncio.to_thread(paused_until) - time.time()
+        if pause > 0:
+            await asyncio.to_thread(_requeue, messages[index:], chat_id, attempts, pause)
+            unsent[chat_id] = []
+            stats["retried"] += len(messages) - index
+            return
+
+        ok, retry_after = await _send_message(client, chat_id, text)
+        unsent[chat_id] = unsent[chat_id][1:]
+        next_at = await asyncio.to_thread(_mark_chat_sent, chat_id)
+
+        if ok:
+            stats["sent"] += 1
+            continue
+
+        if retry_after is None or attempts + 1 > ALERT_MAX_RETRIES:
+            unsent[chat_id] = []
+            stats["dropped"] += len(messages) - index
+            logger.error(f"❌ Alerta descartado para chat_id {chat_id} após {attempts + 1} tentativa(s)")
+            return
+
+        # Reenfileira esta parte e as seguintes com backoff
+        delay = _retry_delay(attempts, retry_after)
+        await asyncio.to_thread(_requeue, messages[index:], chat_id, attempts + 1, delay)
+        unsent[chat_id] = []
+        stats["retried"] += len(messages) - index
+
+        # Em 429 o Telegram pede para pausar os envios: pausa global no
+        # Redis (próximas execuções e outros workers) e esvazia o bucket
+        if retry_after:
+            await asyncio.to_thread(pause_sending, retry_after)
+            global_bucket.tokens = min(global_bucket.tokens, 1 - retry_after * global_bucket.rate)
+        return
+
+
+async def _dispatch(claimed: Dict[str, List[Dict]], unsent: Dict[str, List[Tuple[str, int]]]) -> Dict[str, int]:
+    client = get_async_http_client()
+    global_bucket = get_global_bucket()
+    stats = {"chats": len(claimed), "sent": 0, "retried": 0, "dropped": 0}
+
+    # Um chat com erro não derruba os outros (o que ficou em unsent volta à fila)
+    results = await asyncio.gather(*[
+        _dispatch_chat(client, chat_id, items, global_bucket, stats, unsent)
+        for chat_id, items in claimed.items()
+    ], return_exceptions=True)
+
+    for chat_id, result in zip(claimed, results):
+        if isinstance(result, BaseException):
+            logger.error(f"❌ Erro ao enviar alertas para chat_id {chat_id}: {result!r}")
+
+    return stats
+
+
+def _requeue_unsent(unsent: Dict[str, List[Tuple[str, int]]]) -> int:
+    """Devolve à fila as mensagens retiradas que não chegaram a ser resolvidas"""
+    count = 0
+    for chat_id, messages in unsent.items():
+        for text, attempts in messages:
+            enqueue_alert(text, chat_id, attempts=attempts)
+            count += 1
+    if count:
+        logger.warning(f"⚠️ {count} alerta(s) devolvido(s) à fila após falha no dispatcher")
+    return count
+
+
+def dispatch_due_alerts() -> Dict[str, int]:
+    """
+    Envia os digests cuja janela de agrupamento venceu.
+
+    Protegido por lock no Redis (um dispatcher por vez). Chamado pela
+    task dispatch_alerts.
+
+    Returns:
+        Dict com chats processados e mensagens enviadas/reenfileiradas/descartadas
+    """
+    empty = {"chats": 0, "sent": 0, "retried": 0, "dropped": 0}
+
+    if not TELEGRAM_BOT_TOKEN:
+        return empty
+
+    client = get_redis()
+    lock = client.lock(DISPATCH_LOCK, timeout=120)
+
+    # Telegram pediu pausa (429): nada sai da fila até o retry_after
+    if paused_until() > time.time():
+        return empty
+
+    # Outro dispatcher ainda rodando: deixa para o próximo tick
+    if not lock.acquire(blocking=False):
+        return empty
+
+    try:
+        flat = client.eval(_CLAIM_SCRIPT, 1, DUE_KEY, time.time(), ALERT_DISPATCH_BATCH, PENDING_PREFIX)
+
+        claimed = {}
+        for chat_id, raw_items in zip(flat[::2], flat[1::2]):
+            items = [json.loads(raw) for raw in raw_items]
+            if items:
+                claimed[chat_id] = items
+
+        if not claimed:
+            return empty
+
+        # Itens já saíram do Redis: até serem resolvidos, ficam em unsent
+        unsent = {
+            chat_id: [(item["text"], item.get("attempts", 0)) for item in items]
+            for chat_id, items in claimed.items()
+        }
+        try:
+            stats = run_async(_dispatch(claimed, unsent))
+        except Exception as e:
+            logger.error(f"❌ Dispatcher de alertas interrompido: {e!r}")
+            stats = dict(empty, chats=len(claimed))
+
+        stats["retried"] += _requeue_unsent(unsent)
+        return stats
+    finally:
+        try:
+            lock.release()
+        except LockError as e:
+            # Lock expirou durante o envio (outro dispatcher pode ter assumido)
+            logger.warning(f"⚠️ Lock do dispatcher de alertas perdido: {e}")
@@ -9,6 +9,7 @@ from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from models import SystemConfig, User, Payment, PaymentStatus, BillingType
+from user_cache import invalidate_user
 
 
 def generate_valid_cpf(user_id: int) -> str:
@@ -307,6 +308,7 @@ class AsaasAPI:
                 print(f"🚀 Upgrade: {user.email} → Plano Agency")
             
             self.db.commit()
+            invalidate_user(user.id)
             
         except Exception as e:
             print(f"❌ Erro ao fazer upgrade: {e}")
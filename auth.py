@@ -6,14 +6,17 @@ Inclui funções para hash de senha e verificação.
 """
 
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db, get_db
 from models import User
+from password_pool import run_password_op
+from user_cache import AuthUser, get_auth_user
 import os
 import sys
 
@@ -54,8 +57,11 @@ if len(SECRET_KEY) < 32:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 1440))  # 24 horas padrão
 
+# Custo do bcrypt (2^rounds). Ao mudar, hashes antigos são refeitos no próximo login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 # Contexto para hash de senhas usando bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # Bearer token scheme
 security = HTTPBearer(auto_error=False)
@@ -92,6 +98,30 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password_truncated)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha e, se o hash usar parâmetros antigos (ex: BCRYPT_ROUNDS
+    mudou), devolve um novo hash com os parâmetros atuais.
+    
+    Returns:
+        (senha correta, novo hash ou None se não precisar atualizar)
+    """
+    return pwd_context.verify_and_update(plain_password[:72], hashed_password)
+
+
+# Versões assíncronas: bcrypt no pool dedicado (password_pool.py), fora do event loop.
+# Raises PasswordPoolBusy quando o pool está saturado (respondido com 429).
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Versão assíncrona do verify_password"""
+    return await run_password_op(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Versão assíncrona do get_password_hash"""
+    return await run_password_op(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Cria um token JWT para autenticação.
@@ -138,10 +168,13 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """
     Autentica usuário por email e senha.
     
+    A verificação roda no pool de senhas; se o hash estiver com parâmetros
+    antigos, é refeito e salvo (rehash transparente no login).
+    
     Args:
         db: Sessão do banco
         email: Email do usuário
@@ -149,28 +182,34 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     
     Returns:
         User se autenticado, None caso contrário
+    
+    Raises:
+        PasswordPoolBusy: Pool de senhas saturado
     """
     user = get_user_by_email(db, email)
     
     if not user:
         return None
     
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await run_password_op(verify_and_update_password, password, user.hashed_password)
+    
+    if not valid:
         return None
     
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    
     return user
 
 
-def get_current_user_from_token(
+def _token_user_id(
     request: Request,
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
+    credentials: Optional[HTTPAuthorizationCredentials]
+) -> Optional[int]:
     """
-    Obtém o usuário atual a partir do token JWT.
+    Extrai o ID do usuário do token JWT (sem tocar no banco).
     Verifica primeiro o cookie, depois o header Authorization.
-    
-    Este é um dependency do FastAPI usado para proteger rotas.
     """
     token = None
     
@@ -197,7 +236,25 @@ def get_current_user_from_token(
     if not user_id:
         return None
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    return int(user_id)
+
+
+def get_current_user_from_token(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: Session = Depends(get_db)
+) -> Optional[User]:
+    """
+    Obtém o usuário atual a partir do token JWT.
+    Verifica primeiro o cookie, depois o header Authorization.
+    
+    Este é um dependency do FastAPI usado para proteger rotas.
+    """
+    user_id = _token_user_id(request, credentials)
+    if user_id is None:
+        return None
+    
+    user = db.query(User).filter(User.id == user_id).first()
     
     return user
 
@@ -226,3 +283,68 @@ def get_optional_user(
     Útil para rotas públicas que mostram conteúdo diferente se logado.
     """
     return user
+
+
+# ============================================
+# DEPENDÊNCIAS ASSÍNCRONAS (AsyncSession)
+# ============================================
+# Usadas pelas rotas que leem pelo get_async_db. O usuário fica na mesma
+# AsyncSession da rota (cache de dependências do FastAPI por request).
+
+async def get_current_user_from_token_async(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[User]:
+    """Versão assíncrona do get_current_user_from_token"""
+    user_id = _token_user_id(request, credentials)
+    if user_id is None:
+        return None
+    
+    return await db.get(User, user_id)
+
+
+async def get_current_user_async(
+    user: Optional[User] = Depends(get_current_user_from_token_async)
+) -> User:
+    """Versão assíncrona do get_current_user (401 se não autenticado)"""
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não autenticado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def get_optional_user_async(
+    user: Optional[User] = Depends(get_current_user_from_token_async)
+) -> Optional[User]:
+    """Versão assíncrona do get_optional_user"""
+    return user
+
+
+# ============================================
+# PROJEÇÃO EM CACHE (sem consulta ao banco)
+# ============================================
+# Para rotas que só precisam de id / plano / flags (APIs JSON, XHR dos
+# gráficos, ações que redirecionam). Usuário desativado = não autenticado.
+
+async def get_current_auth_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> AuthUser:
+    """
+    Dependency que exige usuário autenticado e ativo, lido do cache de
+    usuários (user_cache.py). Retorna 401 caso contrário.
+    """
+    user_id = _token_user_id(request, credentials)
+    user = await get_auth_user(user_id) if user_id is not None else None
+    
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não autenticado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
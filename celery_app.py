@@ -44,10 +44,29 @@ celery_app.conf.update(
     
     # Beat Schedule (Tarefas Periódicas)
     beat_schedule={
-        # Scan de uptime a cada 5 minutos
-        "scan-all-sites-every-5-minutes": {
-            "task": "tasks.scan_all_sites",
-            "schedule": 300.0,  # 5 minutos em segundos
+        # Scheduler de uptime: despacha apenas os sites com next_check_at vencido
+        # (cada site respeita o próprio check_interval)
+        "dispatch-due-sites": {
+            "task": "tasks.dispatch_due_sites",
+            "schedule": float(os.getenv("SCHEDULER_TICK_SECONDS", "15")),
+        },
+        
+        # Checks lentos (Whois, RBL, WordPress, SEO, Tech) com cadência própria
+        "dispatch-slow-checks": {
+            "task": "tasks.dispatch_slow_checks",
+            "schedule": float(os.getenv("SLOW_CHECK_TICK_SECONDS", "300")),
+        },
+        
+        # Rollups de MonitorLog (5m → 1h → 1d) para os gráficos
+        "compact-monitor-rollups": {
+            "task": "tasks.compact_monitor_rollups",
+            "schedule": float(os.getenv("ROLLUP_TICK_SECONDS", "300")),
+        },
+        
+        # Retenção/partições de monitor_logs 1x por dia às 4h
+        "maintain-monitor-logs-daily": {
+            "task": "tasks.maintain_monitor_logs",
+            "schedule": __import__('celery.schedules', fromlist=['crontab']).crontab(hour=4, minute=0),
         },
         
         # PageSpeed Audit 1x por dia às 3h da manhã
@@ -56,6 +75,24 @@ celery_app.conf.update(
             "schedule": __import__('celery.schedules', fromlist=['crontab']).crontab(hour=3, minute=0),
         },
         
+        # Envia os alertas Telegram enfileirados (agrupados por chat)
+        "dispatch-alerts": {
+            "task": "tasks.dispatch_alerts",
+            "schedule": float(os.getenv("ALERT_DISPATCH_TICK_SECONDS", "2")),
+        },
+        
+        # Grava no banco os pings de heartbeat acumulados no Redis
+        "flush-heartbeat-pings": {
+            "task": "tasks.flush_heartbeat_pings",
+            "schedule": float(os.getenv("HEARTBEAT_FLUSH_SECONDS", "5")),
+        },
+        
+        # Snapshot dos KPIs do dashboard executivo (/admin/api/dashboard-stats)
+        "refresh-admin-stats": {
+            "task": "tasks.refresh_admin_stats",
+            "schedule": float(os.getenv("ADMIN_STATS_REFRESH_SECONDS", "30")),
+        },
+        
         # Verificação de Heartbeats a cada 1 minuto
         "check-heartbeats-every-minute": {
             "task": "check_heartbeats",
@@ -3,9 +3,15 @@ SentinelWeb - Configuração do Banco de Dados
 ============================================
 Este módulo configura a conexão com PostgreSQL (produção) ou SQLite (dev).
 Suporta pool de conexões e configurações otimizadas.
+
+Dois engines sobre o mesmo banco:
+- engine / SessionLocal (síncrono): Celery, migrações e rotas de escrita
+- async_engine / AsyncSessionLocal (asyncpg / aiosqlite): rotas quentes
+  do FastAPI, que não podem bloquear o event loop do uvicorn
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool, NullPool
@@ -52,11 +58,55 @@ else:
         "Use: postgresql://... ou sqlite:///..."
     )
 
+# ============================================
+# ENGINE ASSÍNCRONO (FastAPI)
+# ============================================
+
+def _async_url(url: str) -> str:
+    """Troca o driver da DATABASE_URL pelo equivalente assíncrono"""
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return f"postgresql+asyncpg://{rest}"
+
+
+# Sobrescreva se o driver assíncrono precisar de parâmetros diferentes
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+if DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=NullPool,
+        echo=False
+    )
+else:
+    # Mesmo dimensionamento do pool síncrono (cada worker do uvicorn tem o seu)
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=20,
+        max_overflow=40,
+        pool_timeout=30,
+        pool_recycle=3600,
+        pool_pre_ping=True,
+        echo=False,
+        connect_args={
+            "timeout": 10,
+            "server_settings": {"timezone": "utc"}
+        }
+    )
+
 # SessionLocal: Fábrica de sessões do banco
 # autocommit=False: Transações manuais para maior controle
 # autoflush=False: Evita flush automático, melhor performance
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# AsyncSessionLocal: sessões do engine assíncrono
+# expire_on_commit=False: objetos continuam legíveis nos templates após commit
+# (atributo expirado exigiria I/O implícito, proibido fora de um await)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Base para os modelos ORM
 Base = declarative_base()
 
@@ -78,6 +128,20 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Versão assíncrona do get_db (AsyncSession).
+
+    Uso:
+        @app.get("/")
+        async def route(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(select(Site))
+            ...
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """
     Inicializa o banco de dados criando todas as tabelas.
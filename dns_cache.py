@@ -0,0 +1,273 @@
+"""
+SentinelWeb - Cache de DNS do Worker
+====================================
+Resolvedor assíncrono (dnspython) com cache LRU que respeita o TTL dos
+registros, compartilhado por todos os checks do processo:
+
+- async_full_scan resolve o domínio uma vez e mede o tempo (ScanResult.dns_ms)
+- O AsyncClient do http_pool conecta usando este cache (CachedResolverBackend)
+- SSL, portas e blacklist recebem/consultam o mesmo resultado
+
+Respostas negativas (NXDOMAIN / sem registros) também ficam em cache por
+DNS_NEGATIVE_TTL segundos. Timeouts e falhas do resolvedor não são
+guardados: a próxima consulta tenta de novo.
+
+O cache vive no event loop persistente do http_pool (run_async); código
+síncrono usa resolve_host_sync().
+"""
+
+import asyncio
+import ipaddress
+import os
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+import httpcore
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+DNS_CACHE_MAX_ENTRIES = int(os.getenv("DNS_CACHE_MAX_ENTRIES", "10000"))
+
+# Limites aplicados ao TTL dos registros (segundos)
+DNS_CACHE_MIN_TTL = int(os.getenv("DNS_CACHE_MIN_TTL", "30"))
+DNS_CACHE_MAX_TTL = int(os.getenv("DNS_CACHE_MAX_TTL", "3600"))
+
+# Validade do cache negativo (NXDOMAIN / sem registros)
+DNS_NEGATIVE_TTL = int(os.getenv("DNS_NEGATIVE_TTL", "60"))
+
+# Tempo máximo de uma resolução (todas as tentativas)
+DNS_RESOLVE_TIMEOUT = float(os.getenv("DNS_RESOLVE_TIMEOUT", "3"))
+
+
+@dataclass
+class DNSResult:
+    """Resultado de uma resolução (do cache ou não)"""
+    addresses: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    negative: bool = False  # Resposta definitiva de que o nome não resolve
+    cached: bool = False
+    elapsed_ms: float = 0.0
+
+    @property
+    def address(self) -> Optional[str]:
+        return self.addresses[0] if self.addresses else None
+
+    @property
+    def ipv4(self) -> List[str]:
+        return [address for address in self.addresses if ":" not in address]
+
+
+def _is_ip(name: str) -> bool:
+    try:
+        ipaddress.ip_address(name)
+        return True
+    except ValueError:
+        return False
+
+
+def _use_system_resolver(name: str) -> bool:
+    """Nomes locais (/etc/hosts, rede do Docker) que o dnspython não enxerga"""
+    return "." not in name or name == "localhost" or name.endswith(".localhost")
+
+
+class DNSCache:
+    """
+    Cache LRU (nome → endereços) com expiração por TTL.
+
+    Resoluções simultâneas do mesmo nome compartilham uma única consulta.
+    Não é thread-safe: usar sempre no mesmo event loop.
+    """
+
+    def __init__(self, max_entries: int = DNS_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, List[str], Optional[str]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._resolver: Optional[dns.asyncresolver.Resolver] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, name: str) -> Optional[Tuple[List[str], Optional[str]]]:
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+
+        expires, addresses, error = entry
+        if expires <= time.monotonic():
+            del self._entries[name]
+            return None
+
+        self._entries.move_to_end(name)
+        return addresses, error
+
+    def put(self, name: str, addresses: List[str], error: Optional[str], ttl: float) -> None:
+        self._entries[name] = (time.monotonic() + ttl, addresses, error)
+        self._entries.move_to_end(name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _get_resolver(self) -> Optional[dns.asyncresolver.Resolver]:
+        """Resolvedor do /etc/resolv.conf (None se não houver configuração)"""
+        if self._resolver is None:
+            try:
+                self._resolver = dns.asyncresolver.Resolver()
+            except dns.resolver.NoResolverConfiguration:
+                return None
+            self._resolver.lifetime = DNS_RESOLVE_TIMEOUT
+        return self._resolver
+
+    async def _query(self, name: str) -> Tuple[List[str], Optional[str], Optional[float]]:
+        """
+        Consulta A (e AAAA se não houver A).
+
+        Returns:
+            (endereços, erro, ttl) — ttl None significa não guardar
+        """
+        resolver = None if _use_system_resolver(name) else self._get_resolver()
+
+        if resolver is None:
+            loop = asyncio.get_running_loop()
+            try:
+                infos = await asyncio.wait_for(
+                    loop.getaddrinfo(name, None, type=socket.SOCK_STREAM),
+                    timeout=DNS_RESOLVE_TIMEOUT
+                )
+            except socket.gaierror:
+                return [], "Não foi possível resolver o domínio", DNS_NEGATIVE_TTL
+            except asyncio.TimeoutError:
+                return [], "Timeout na resolução DNS", None
+
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            return addresses, None, DNS_CACHE_MIN_TTL
+
+        for rdtype in ("A", "AAAA"):
+            try:
+                answer = await resolver.resolve(name, rdtype)
+            except dns.resolver.NXDOMAIN:
+                return [], "Domínio inexistente (NXDOMAIN)", DNS_NEGATIVE_TTL
+            except dns.resolver.NoAnswer:
+                continue
+            except dns.exception.Timeout:
+                return [], "Timeout na resolução DNS", None
+            except dns.exception.DNSException as e:
+                return [], f"Erro na resolução DNS: {e}", None
+
+            ttl = min(DNS_CACHE_MAX_TTL, max(DNS_CACHE_MIN_TTL, answer.rrset.ttl))
+            return [record.to_text() for record in answer], None, ttl
+
+        return [], "Domínio sem registros A/AAAA", DNS_NEGATIVE_TTL
+
+    async def resolve(self, name: str) -> DNSResult:
+        """Resolve o nome (cache → consulta em andamento → resolvedor)"""
+        start = time.perf_counter()
+        name = name.strip().lower().rstrip(".")
+
+        if _is_ip(name):
+            return DNSResult(addresses=[name], cached=True)
+
+        cached = self.get(name)
+        if cached is not None:
+            addresses, error = cached
+            return DNSResult(
+                addresses=addresses, error=error, negative=error is not None, cached=True,
+                elapsed_ms=round((time.perf_counter() - start) * 1000, 2)
+            )
+
+        inflight = self._inflight.get(name)
+        shared = inflight is not None
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._query_and_store(name))
+            self._inflight[name] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(name, None))
+
+        # shield: quem desistir (timeout do check) não cancela a consulta dos outros
+        addresses, error, ttl = await asyncio.shield(inflight)
+
+        return DNSResult(
+            addresses=addresses, error=error, negative=ttl is not None and error is not None,
+            cached=shared, elapsed_ms=round((time.perf_counter() - start) * 1000, 2)
+        )
+
+    async def _query_and_store(self, name: str) -> Tuple[List[str], Optional[str], Optional[float]]:
+        addresses, error, ttl = await self._query(name)
+        if ttl is not None:
+            self.put(name, addresses, error, ttl)
+        return addresses, error, ttl
+
+
+# ============================================
+# CACHE DO PROCESSO
+# ============================================
+
+_pid: Optional[int] = None
+_cache: Optional[DNSCache] = None
+
+
+def get_dns_cache() -> DNSCache:
+    """Cache do processo (recriado após fork, como os clientes do http_pool)"""
+    global _pid, _cache
+
+    if _cache is None or _pid != os.getpid():
+        _pid = os.getpid()
+        _cache = DNSCache()
+
+    return _cache
+
+
+async def resolve_host(name: str) -> DNSResult:
+    """Resolve um host pelo cache compartilhado do processo"""
+    return await get_dns_cache().resolve(name)
+
+
+def resolve_host_sync(name: str) -> DNSResult:
+    """Wrapper síncrono de resolve_host (roda no event loop do http_pool)"""
+    from http_pool import run_async
+
+    # A e AAAA em sequência, cada uma limitada a DNS_RESOLVE_TIMEOUT
+    return run_async(resolve_host(name), timeout=DNS_RESOLVE_TIMEOUT * 2 + 1)
+
+
+# ============================================
+# BACKEND DE REDE DO HTTPCORE
+# ============================================
+
+class CachedResolverBackend(httpcore.AsyncNetworkBackend):
+    """
+    Backend do httpcore que resolve o host pelo DNSCache antes de conectar.
+
+    O TLS continua usando o nome original (SNI e validação), só o
+    connect vai direto para o IP.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend):
+        self._backend = backend
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        result = await resolve_host(host)
+
+        if result.negative:
+            raise httpcore.ConnectError(result.error)
+
+        # Falha transitória do resolvedor: deixa o backend resolver como antes
+        target = result.address or host
+
+        return await self._backend.connect_tcp(
+            target, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
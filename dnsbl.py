@@ -0,0 +1,190 @@
+"""
+SentinelWeb - Consultas DNSBL (Blacklist / RBL)
+===============================================
+Consulta as RBLs em paralelo (dnspython assíncrono) e guarda o resultado
+por (IP, RBL) com o TTL da própria resposta:
+
+- Listado: TTL do registro A devolvido pela RBL
+- Não listado (NXDOMAIN): RBL_NEGATIVE_TTL
+- Timeout / erro: não guarda, a próxima verificação tenta de novo
+
+Como muitos sites dividem o IP da hospedagem, check_blacklist_many()
+resolve todos os domínios de um lote, agrupa por IP e consulta cada
+(IP, RBL) uma única vez.
+
+Roda no event loop persistente do http_pool (run_async), junto com o
+cache de DNS (dns_cache.py).
+"""
+
+import asyncio
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+from dns_cache import DNSCache, resolve_host
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# RBLs consultadas (separadas por vírgula)
+RBL_PROVIDERS = [
+    rbl.strip() for rbl in os.getenv(
+        "RBL_PROVIDERS",
+        "zen.spamhaus.org,bl.spamcop.net,b.barracudacentral.org,dnsbl.sorbs.net,cbl.abuseat.org"
+    ).split(",") if rbl.strip()
+]
+
+# Tempo máximo de cada consulta (segundos)
+RBL_QUERY_TIMEOUT = float(os.getenv("RBL_QUERY_TIMEOUT", "2"))
+
+# Validade do resultado em cache
+RBL_MIN_TTL = int(os.getenv("RBL_MIN_TTL", "300"))
+RBL_MAX_TTL = int(os.getenv("RBL_MAX_TTL", "21600"))
+RBL_NEGATIVE_TTL = int(os.getenv("RBL_NEGATIVE_TTL", "3600"))
+
+# Máximo de consultas DNSBL simultâneas por lote
+RBL_CONCURRENCY = int(os.getenv("RBL_CONCURRENCY", "100"))
+
+# Códigos de erro das RBLs (ex: Spamhaus recusando resolvedor público), não são listagem
+RBL_ERROR_PREFIX = "127.255.255."
+
+
+def clean_domain(domain: str) -> str:
+    """Remove protocolo, www e paths (mesma regra antiga do check_blacklist)"""
+    clean = re.sub(r'^https?://', '', domain)
+    clean = re.sub(r'^www\.', '', clean)
+    return clean.split('/')[0]
+
+
+def reverse_ip(ip: str) -> str:
+    """1.2.3.4 → 4.3.2.1"""
+    return '.'.join(reversed(ip.split('.')))
+
+
+class DNSBLCache(DNSCache):
+    """
+    Cache das consultas "<ip invertido>.<rbl>".
+
+    Reaproveita o LRU e o compartilhamento de consultas do DNSCache; só a
+    consulta muda: endereços = listado, resultado negativo = não listado.
+    """
+
+    def __init__(self, timeout: float = RBL_QUERY_TIMEOUT, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def _get_resolver(self) -> Optional[dns.asyncresolver.Resolver]:
+        if self._resolver is None:
+            try:
+                self._resolver = dns.asyncresolver.Resolver()
+            except dns.resolver.NoResolverConfiguration:
+                return None
+            self._resolver.timeout = self.timeout
+            self._resolver.lifetime = self.timeout
+        return self._resolver
+
+    async def _query(self, name: str) -> Tuple[List[str], Optional[str], Optional[float]]:
+        resolver = self._get_resolver()
+        if resolver is None:
+            return [], "Resolvedor DNS não configurado", None
+
+        try:
+            answer = await resolver.resolve(name, "A")
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            # Resposta esperada: NÃO está listado
+            return [], "Não listado", RBL_NEGATIVE_TTL
+        except dns.exception.Timeout:
+            return [], "Timeout", None
+        except dns.exception.DNSException as e:
+            return [], str(e), None
+
+        codes = [record.to_text() for record in answer]
+        if all(code.startswith(RBL_ERROR_PREFIX) for code in codes):
+            return [], f"Consulta recusada pela RBL ({', '.join(codes)})", None
+
+        ttl = min(RBL_MAX_TTL, max(RBL_MIN_TTL, answer.rrset.ttl))
+        return codes, None, ttl
+
+
+_pid: Optional[int] = None
+_cache: Optional[DNSBLCache] = None
+
+
+def get_dnsbl_cache() -> DNSBLCache:
+    """Cache do processo (recriado após fork)"""
+    global _pid, _cache
+
+    if _cache is None or _pid != os.getpid():
+        _pid = os.getpid()
+        _cache = DNSBLCache()
+
+    return _cache
+
+
+async def lookup_ip(ip: str, providers: Optional[List[str]] = None,
+                    semaphore: Optional[asyncio.Semaphore] = None) -> List[str]:
+    """
+    Consulta um IPv4 em todas as RBLs ao mesmo tempo.
+
+    Returns:
+        RBLs onde o IP está listado
+    """
+    providers = providers or RBL_PROVIDERS
+    cache = get_dnsbl_cache()
+    reversed_ip = reverse_ip(ip)
+
+    async def _lookup(rbl: str) -> bool:
+        if semaphore is None:
+            result = await cache.resolve(f"{reversed_ip}.{rbl}")
+        else:
+            async with semaphore:
+                result = await cache.resolve(f"{reversed_ip}.{rbl}")
+
+        if result.addresses:
+            print(f"⚠️  BLACKLIST DETECTADA: {ip} listado em {rbl}")
+            return True
+        if result.error and not result.negative:
+            print(f"⏱️  Falha ao consultar {rbl} para {ip}: {result.error}")
+        return False
+
+    listed = await asyncio.gather(*(_lookup(rbl) for rbl in providers))
+    return [rbl for rbl, is_listed in zip(providers, listed) if is_listed]
+
+
+async def async_check_blacklist_many(domains: List[str]) -> List[Tuple[bool, List[str]]]:
+    """
+    Verifica vários domínios, consultando cada IP uma única vez.
+
+    Returns:
+        Lista de (is_blacklisted, rbls) na mesma ordem de domains;
+        domínios que não resolvem para IPv4 voltam como (False, [])
+    """
+    cleaned = [clean_domain(domain) for domain in domains]
+    resolved = await asyncio.gather(*(resolve_host(domain) for domain in cleaned))
+
+    ips: List[Optional[str]] = []
+    for domain, result in zip(cleaned, resolved):
+        if result.ipv4:
+            ips.append(result.ipv4[0])
+        else:
+            print(f"⚠️  Não foi possível resolver IP para {domain}")
+            ips.append(None)
+
+    unique_ips = list(dict.fromkeys(ip for ip in ips if ip))
+    semaphore = asyncio.Semaphore(max(1, RBL_CONCURRENCY))
+    listings = await asyncio.gather(*(lookup_ip(ip, semaphore=semaphore) for ip in unique_ips))
+    by_ip: Dict[str, List[str]] = dict(zip(unique_ips, listings))
+
+    results = []
+    for domain, ip in zip(cleaned, ips):
+        blacklisted_in = by_ip.get(ip, []) if ip else []
+        if blacklisted_in:
+            print(f"🚨 ALERTA: {domain} está em {len(blacklisted_in)} blacklist(s): {', '.join(blacklisted_in)}")
+        results.append((bool(blacklisted_in), list(blacklisted_in)))
+
+    return results
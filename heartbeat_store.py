@@ -0,0 +1,255 @@
+"""
+SentinelWeb - Buffer de Pings de Heartbeat (Redis → PostgreSQL)
+===============================================================
+A rota /ping/{slug} não toca no banco: resolve o slug por um cache no
+Redis e registra o ping em dois hashes (último ping e contagem por
+heartbeat). A task flush_heartbeat_pings (Celery Beat, a cada poucos
+segundos) grava tudo em heartbeat_checks em um único UPDATE em lote.
+
+Chaves no Redis:
+    hb:slug:{slug}       → JSON {id, name, expected_period} (TTL; "0" = não existe)
+    hb:pending:last      → hash {id: epoch do último ping}
+    hb:pending:count     → hash {id: pings desde o último flush}
+    hb:flushing:*        → cópia em processamento (sobrevive a um crash do flush)
+    hb:flush:lock        → lock do flush (beat, check_heartbeats e watchdog)
+    hb:events (pub/sub)  → "id:prazo" a cada ping, consumido pelo heartbeat_watchdog.py
+
+Se o Redis estiver indisponível, a rota grava direto no banco (record_ping_db).
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, func, select, update
+
+from database import AsyncSessionLocal, SessionLocal
+from models import HeartbeatCheck
+from redis_pool import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Validade do cache slug → heartbeat (e do cache negativo de slugs inexistentes)
+HEARTBEAT_SLUG_CACHE_TTL = int(os.getenv("HEARTBEAT_SLUG_CACHE_TTL", "300"))
+HEARTBEAT_SLUG_MISS_TTL = int(os.getenv("HEARTBEAT_SLUG_MISS_TTL", "30"))
+
+SLUG_KEY = "hb:slug:{}"
+PENDING_LAST = "hb:pending:last"
+PENDING_COUNT = "hb:pending:count"
+FLUSHING_LAST = "hb:flushing:last"
+FLUSHING_COUNT = "hb:flushing:count"
+FLUSH_LOCK = "hb:flush:lock"
+EVENTS_CHANNEL = "hb:events"
+
+# Move os pings pendentes para as chaves de processamento (se não houver
+# um flush anterior interrompido) e devolve o conteúdo delas.
+_CLAIM_SCRIPT = """
+for i = 1, 2 do
+    local pending = KEYS[i]
+    local flushing = KEYS[i + 2]
+    if redis.call('EXISTS', flushing) == 0 and redis.call('EXISTS', pending) == 1 then
+        redis.call('RENAME', pending, flushing)
+    end
+end
+return {redis.call('HGETALL', KEYS[3]), redis.call('HGETALL', KEYS[4])}
+"""
+
+
+# ============================================
+# CACHE DE SLUG
+# ============================================
+
+async def lookup_slug_db(slug: str) -> Optional[Dict]:
+    """Busca o heartbeat ativo pelo slug no banco (AsyncSession própria)"""
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(HeartbeatCheck.id, HeartbeatCheck.name, HeartbeatCheck.expected_period).where(
+                HeartbeatCheck.slug == slug,
+                HeartbeatCheck.is_active == True
+            )
+        )).first()
+        return {"id": row.id, "name": row.name, "expected_period": row.expected_period} if row else None
+
+
+async def resolve_slug(slug: str) -> Optional[Dict]:
+    """
+    Resolve slug → {id, name, expected_period} pelo cache do Redis, consultando o banco
+    (engine assíncrono) só no cache miss.
+
+    Raises:
+        redis.RedisError: Redis indisponível (quem chama faz o fallback)
+    """
+    client = get_async_redis()
+    key = SLUG_KEY.format(slug)
+
+    cached = await client.get(key)
+    if cached is not None:
+        return json.loads(cached) if cached != "0" else None
+
+    heartbeat = await lookup_slug_db(slug)
+
+    if heartbeat:
+        await client.set(key, json.dumps(heartbeat), ex=HEARTBEAT_SLUG_CACHE_TTL)
+    else:
+        await client.set(key, "0", ex=HEARTBEAT_SLUG_MISS_TTL)
+
+    return heartbeat
+
+
+def invalidate_slug(slug: str) -> None:
+    """Remove o slug do cache (após editar, desativar ou apagar o heartbeat)"""
+    try:
+        get_redis().delete(SLUG_KEY.format(slug))
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao invalidar cache do heartbeat {slug}: {e}")
+
+
+# ============================================
+# INGESTÃO
+# ============================================
+
+async def record_ping(heartbeat: Dict, now: datetime) -> None:
+    """
+    Registra um ping no buffer do Redis e avisa o watchdog do novo prazo
+    (todos os comandos em um round-trip).
+
+    Args:
+        heartbeat: Dict retornado por resolve_slug
+        now: Horário do ping (UTC)
+
+    Raises:
+        redis.RedisError: Redis indisponível
+    """
+    client = get_async_redis()
+    heartbeat_id = heartbeat["id"]
+
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.hset(PENDING_LAST, heartbeat_id, now.timestamp())
+        pipe.hincrby(PENDING_COUNT, heartbeat_id, 1)
+        if heartbeat.get("expected_period"):
+            deadline = now.timestamp() + heartbeat["expected_period"]
+            pipe.publish(EVENTS_CHANNEL, f"{heartbeat_id}:{deadline}")
+        await pipe.execute()
+
+
+async def record_ping_db(slug: str, now: datetime) -> Optional[Dict]:
+    """
+    Fallback sem Redis: grava o ping direto no banco (comportamento antigo),
+    pelo engine assíncrono para não bloquear o event loop da rota.
+
+    Returns:
+        {id, name} do heartbeat ou None se o slug não existir
+    """
+    async with AsyncSessionLocal() as db:
+        heartbeat = await db.scalar(select(HeartbeatCheck).where(
+            HeartbeatCheck.slug == slug,
+            HeartbeatCheck.is_active == True
+        ))
+
+        if not heartbeat:
+            return None
+
+        heartbeat.last_ping = now
+        heartbeat.next_expected_ping = now + timedelta(seconds=heartbeat.expected_period)
+        heartbeat.next_deadline = heartbeat.next_expected_ping
+        heartbeat.status = 'up'
+        heartbeat.total_pings = (heartbeat.total_pings or 0) + 1
+        heartbeat.alert_sent = False
+        await db.commit()
+
+        return {"id": heartbeat.id, "name": heartbeat.name, "expected_period": heartbeat.expected_period}
+
+
+# ============================================
+# FLUSH (write-behind)
+# ============================================
+
+def _as_dict(flat) -> Dict[str, str]:
+    """HGETALL via Lua volta como lista [campo, valor, ...]"""
+    return dict(zip(flat[::2], flat[1::2]))
+
+
+def flush_pings() -> int:
+    """
+    Grava os pings acumulados no Redis em heartbeat_checks.
+
+    Um único UPDATE em lote (executemany) com last_ping, next_expected_ping,
+    next_deadline, status, total_pings (incremento) e alert_sent. As chaves
+    de processamento só são apagadas após o commit.
+
+    Protegido por lock no Redis: o beat, o check_heartbeats e o watchdog
+    podem chamar ao mesmo tempo sem contar os mesmos pings duas vezes.
+
+    Returns:
+        Quantidade de heartbeats atualizados
+    """
+    client = get_redis()
+
+    with client.lock(FLUSH_LOCK, timeout=60, blocking_timeout=10):
+        return _flush_claimed(client)
+
+
+def _flush_claimed(client) -> int:
+    """Executa o flush (chamar com FLUSH_LOCK adquirido)"""
+    last_raw, count_raw = client.eval(_CLAIM_SCRIPT, 4, PENDING_LAST, PENDING_COUNT, FLUSHING_LAST, FLUSHING_COUNT)
+    last_pings = _as_dict(last_raw)
+    counts = _as_dict(count_raw)
+
+    if not last_pings:
+        client.delete(FLUSHING_LAST, FLUSHING_COUNT)
+        return 0
+
+    db = SessionLocal()
+    try:
+        ids = [int(heartbeat_id) for heartbeat_id in last_pings]
+        periods = dict(
+            db.query(HeartbeatCheck.id, HeartbeatCheck.expected_period)
+            .filter(HeartbeatCheck.id.in_(ids))
+            .all()
+        )
+
+        params = []
+        for heartbeat_id, timestamp in last_pings.items():
+            heartbeat_id = int(heartbeat_id)
+            if heartbeat_id not in periods:
+                continue  # apagado depois do ping
+
+            last_ping = datetime.fromtimestamp(float(timestamp), tz=timezone.utc)
+            params.append({
+                "b_id": heartbeat_id,
+                "b_last_ping": last_ping,
+                "b_next_expected": last_ping + timedelta(seconds=periods[heartbeat_id]),
+                "b_count": int(counts.get(str(heartbeat_id), 1)),
+            })
+
+        if params:
+            table = HeartbeatCheck.__table__
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(
+                    last_ping=bindparam("b_last_ping"),
+                    next_expected_ping=bindparam("b_next_expected"),
+                    next_deadline=bindparam("b_next_expected"),
+                    total_pings=func.coalesce(table.c.total_pings, 0) + bindparam("b_count"),
+                    status='up',
+                    alert_sent=False,
+                ),
+                params,
+            )
+            db.commit()
+
+        client.delete(FLUSHING_LAST, FLUSHING_COUNT)
+        return len(params)
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,211 @@
+"""
+SentinelWeb - Watchdog de Heartbeats
+====================================
+Processo de longa duração que detecta heartbeats atrasados ('late') e
+perdidos ('down') com precisão de ~1 segundo, em vez de esperar o
+próximo tick de 60s do check_heartbeats.
+
+Funcionamento:
+- Ao iniciar, carrega (id, next_deadline) de heartbeat_checks em um heap
+- Cada ping publica "id:prazo" no canal hb:events (ver heartbeat_store.py),
+  que atualiza o prazo do heartbeat no heap
+- Quando um prazo vence, grava os pings pendentes do Redis e aplica a
+  transição com a mesma lógica do check_heartbeats (_process_due_heartbeats)
+- A cada HEARTBEAT_WATCHDOG_RESYNC_SECONDS o heap é recarregado do banco
+  (pub/sub não é garantido; cobre edições pelo admin e eventos perdidos)
+
+O check_heartbeats do Celery Beat continua rodando como rede de segurança;
+os dois usam FOR UPDATE SKIP LOCKED e nunca processam a mesma linha.
+
+Uso:
+    python heartbeat_watchdog.py
+"""
+
+import heapq
+import logging
+import os
+import signal
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from database import SessionLocal
+from heartbeat_store import EVENTS_CHANNEL, flush_pings
+from models import HeartbeatCheck
+from redis_pool import get_redis
+from tasks import _as_utc, _process_due_heartbeats
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger("heartbeat_watchdog")
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Intervalo de recarga completa do heap a partir do banco
+HEARTBEAT_WATCHDOG_RESYNC_SECONDS = float(os.getenv("HEARTBEAT_WATCHDOG_RESYNC_SECONDS", "300"))
+
+# Espera máxima por eventos antes de reavaliar o heap
+HEARTBEAT_WATCHDOG_TICK_SECONDS = float(os.getenv("HEARTBEAT_WATCHDOG_TICK_SECONDS", "1"))
+
+
+class DeadlineHeap:
+    """
+    Heap de prazos (epoch, id) com remoção preguiçosa.
+
+    Só o prazo mais recente de cada heartbeat vale (self.deadlines);
+    entradas antigas que sobem ao topo do heap são descartadas.
+    """
+
+    def __init__(self):
+        self.heap: List[Tuple[float, int]] = []
+        self.deadlines: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def set(self, heartbeat_id: int, deadline: Optional[float]) -> None:
+        """Define (ou remove, com None) o prazo de um heartbeat"""
+        if deadline is None:
+            self.deadlines.pop(heartbeat_id, None)
+            return
+
+        if self.deadlines.get(heartbeat_id) == deadline:
+            return
+
+        self.deadlines[heartbeat_id] = deadline
+        heapq.heappush(self.heap, (deadline, heartbeat_id))
+
+    def next_deadline(self) -> Optional[float]:
+        """Prazo mais próximo ainda válido"""
+        while self.heap:
+            deadline, heartbeat_id = self.heap[0]
+            if self.deadlines.get(heartbeat_id) == deadline:
+                return deadline
+            heapq.heappop(self.heap)
+        return None
+
+    def pop_due(self, now: float) -> List[int]:
+        """Remove e retorna os heartbeats com prazo vencido"""
+        due = []
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > now:
+                return due
+            _, heartbeat_id = heapq.heappop(self.heap)
+            del self.deadlines[heartbeat_id]
+            due.append(heartbeat_id)
+
+    def clear(self) -> None:
+        self.heap.clear()
+        self.deadlines.clear()
+
+
+class HeartbeatWatchdog:
+    """Loop principal: eventos de ping → heap → transições no banco"""
+
+    def __init__(self):
+        self.deadlines = DeadlineHeap()
+        self.running = True
+        self.last_resync = 0.0
+
+    def stop(self, *args) -> None:
+        logger.info("🛑 Encerrando watchdog de heartbeats...")
+        self.running = False
+
+    def load_deadlines(self, heartbeat_ids: Optional[List[int]] = None) -> None:
+        """Carrega os prazos do banco (todos, ou só os ids informados)"""
+        db = SessionLocal()
+        try:
+            query = db.query(HeartbeatCheck.id, HeartbeatCheck.next_deadline).filter(
+                HeartbeatCheck.is_active == True
+            )
+
+            if heartbeat_ids is None:
+                self.deadlines.clear()
+                query = query.filter(HeartbeatCheck.next_deadline != None)
+            else:
+                query = query.filter(HeartbeatCheck.id.in_(heartbeat_ids))
+
+            for heartbeat_id, deadline in query.all():
+                self.deadlines.set(heartbeat_id, _as_utc(deadline).timestamp() if deadline else None)
+        finally:
+            db.close()
+
+    def handle_event(self, data: str) -> None:
+        """Evento de ping: "id:prazo" (epoch em segundos)"""
+        try:
+            heartbeat_id, deadline = data.split(":", 1)
+            self.deadlines.set(int(heartbeat_id), float(deadline))
+        except ValueError:
+            logger.warning(f"⚠️ Evento de heartbeat inválido: {data}")
+
+    def fire(self, heartbeat_ids: List[int]) -> None:
+        """Aplica as transições dos heartbeats vencidos e reagenda os prazos"""
+        # Pings ainda no buffer podem ter adiado o prazo
+        try:
+            flush_pings()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao gravar pings pendentes: {e}")
+
+        db = SessionLocal()
+        try:
+            stats = _process_due_heartbeats(db, datetime.now(timezone.utc), heartbeat_ids)
+            db.commit()
+
+            if stats["late"] or stats["down"]:
+                logger.info(
+                    f"💓 Watchdog: {stats['late']} late, {stats['down']} down, "
+                    f"{stats['alerts_sent']} alertas enviados"
+                )
+        except Exception as e:
+            logger.error(f"❌ Erro ao processar heartbeats vencidos: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+        # Próximo prazo (late → down, ou o adiado por um ping)
+        self.load_deadlines(heartbeat_ids)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(EVENTS_CHANNEL)
+
+        logger.info("🐕 Watchdog de heartbeats iniciado")
+
+        while self.running:
+            now = time.time()
+
+            if now - self.last_resync >= HEARTBEAT_WATCHDOG_RESYNC_SECONDS:
+                self.load_deadlines()
+                self.last_resync = now
+                logger.info(f"🔄 Watchdog: {len(self.deadlines)} prazos carregados do banco")
+
+            # Espera eventos até o próximo prazo (no máximo um tick)
+            next_deadline = self.deadlines.next_deadline()
+            timeout = HEARTBEAT_WATCHDOG_TICK_SECONDS
+            if next_deadline is not None:
+                timeout = max(0.0, min(timeout, next_deadline - now))
+
+            try:
+                message = pubsub.get_message(timeout=timeout)
+                while message:
+                    if message["type"] == "message":
+                        self.handle_event(message["data"])
+                    message = pubsub.get_message(timeout=0)
+            except Exception as e:
+                logger.error(f"❌ Erro no pub/sub de heartbeats: {e}")
+                time.sleep(HEARTBEAT_WATCHDOG_TICK_SECONDS)
+
+            due = self.deadlines.pop_due(time.time())
+            if due:
+                self.fire(due)
+
+        pubsub.close()
+
+
+if __name__ == "__main__":
+    HeartbeatWatchdog().run()
@@ -0,0 +1,239 @@
+"""
+SentinelWeb - Exportação de Histórico (NDJSON / Arrow)
+======================================================
+Exporta o histórico de verificações de um site (ou de todos os sites
+da conta) em streaming, para relatórios do cliente.
+
+- Formatos: NDJSON (uma linha JSON por registro) ou Arrow IPC (stream)
+- Resolução: 'raw' lê monitor_logs; '5m', '1h' e '1d' leem monitor_rollups
+- Memória constante: as linhas vêm do banco em lotes (yield_per, cursor
+  no servidor no PostgreSQL) e cada lote é enviado assim que fica pronto
+
+Arrow depende do pacote opcional pyarrow (ARROW_AVAILABLE).
+"""
+
+import json
+import os
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from database import SessionLocal
+from models import MonitorLog, MonitorRollup
+from rollups import RESOLUTIONS, to_naive_utc
+
+# Arrow IPC depende do pacote opcional pyarrow
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    ARROW_AVAILABLE = False
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Linhas por lote lido do banco (e por RecordBatch no Arrow)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Colunas exportáveis: nome → (atributo do model, tipo)
+RAW_COLUMNS = {
+    "site_id": (MonitorLog.site_id, "int"),
+    "checked_at": (MonitorLog.checked_at, "timestamp"),
+    "status": (MonitorLog.status, "string"),
+    "http_status_code": (MonitorLog.http_status_code, "int"),
+    "latency_ms": (MonitorLog.latency_ms, "float"),
+    "dns_ms": (MonitorLog.dns_ms, "float"),
+    "ssl_valid": (MonitorLog.ssl_valid, "bool"),
+    "ssl_days_remaining": (MonitorLog.ssl_days_remaining, "int"),
+    "error_message": (MonitorLog.error_message, "string"),
+}
+
+ROLLUP_COLUMNS = {
+    "site_id": (MonitorRollup.site_id, "int"),
+    "bucket_start": (MonitorRollup.bucket_start, "timestamp"),
+    "check_count": (MonitorRollup.check_count, "int"),
+    "online_count": (MonitorRollup.online_count, "int"),
+    "latency_count": (MonitorRollup.latency_count, "int"),
+    "latency_sum": (MonitorRollup.latency_sum, "float"),
+    "latency_min": (MonitorRollup.latency_min, "float"),
+    "latency_max": (MonitorRollup.latency_max, "float"),
+    "latency_p95": (MonitorRollup.latency_p95, "float"),
+}
+
+DEFAULT_RAW_COLUMNS = ["site_id", "checked_at", "status", "http_status_code", "latency_ms"]
+DEFAULT_ROLLUP_COLUMNS = ["site_id", "bucket_start", "check_count", "online_count", "latency_sum", "latency_count", "latency_p95"]
+
+
+# ============================================
+# VALIDAÇÃO
+# ============================================
+
+def available_columns(resolution: str) -> Dict[str, tuple]:
+    """Colunas exportáveis para a resolução ('raw' ou uma das RESOLUTIONS)"""
+    return RAW_COLUMNS if resolution == "raw" else ROLLUP_COLUMNS
+
+
+def parse_columns(columns: Optional[str], resolution: str) -> List[str]:
+    """
+    Valida a lista de colunas pedida (separada por vírgula).
+
+    Raises:
+        ValueError: Resolução ou coluna desconhecida
+    """
+    if resolution != "raw" and resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolução inválida: {resolution} (use raw, {', '.join(RESOLUTIONS)})")
+
+    allowed = available_columns(resolution)
+
+    if not columns:
+        return list(DEFAULT_RAW_COLUMNS if resolution == "raw" else DEFAULT_ROLLUP_COLUMNS)
+
+    selected = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in allowed]
+    if unknown:
+        raise ValueError(f"Colunas inválidas: {', '.join(unknown)} (disponíveis: {', '.join(allowed)})")
+
+    return list(dict.fromkeys(selected))
+
+
+# ============================================
+# LEITURA
+# ============================================
+
+def iter_rows(site_ids: Sequence[int], start: datetime, end: datetime,
+              resolution: str, columns: List[str]) -> Iterator[List[tuple]]:
+    """
+    Lê as linhas do período em lotes de EXPORT_BATCH_SIZE.
+
+    Abre a própria sessão: o gerador roda durante o streaming da resposta,
+    depois que a sessão da requisição (get_db) já foi fechada.
+    """
+    if not site_ids:
+        return
+
+    source = available_columns(resolution)
+    attributes = [source[name][0] for name in columns]
+
+    db = SessionLocal()
+    try:
+        if resolution == "raw":
+            query = db.query(*attributes).filter(
+                MonitorLog.site_id.in_(site_ids),
+                MonitorLog.checked_at >= start,
+                MonitorLog.checked_at < end,
+            ).order_by(MonitorLog.site_id, MonitorLog.checked_at)
+        else:
+            query = db.query(*attributes).filter(
+                MonitorRollup.site_id.in_(site_ids),
+                MonitorRollup.resolution == resolution,
+                MonitorRollup.bucket_start >= start,
+                MonitorRollup.bucket_start < end,
+            ).order_by(MonitorRollup.site_id, MonitorRollup.bucket_start)
+
+        batch = []
+        for row in query.yield_per(EXPORT_BATCH_SIZE):
+            batch.append(tuple(row))
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+    finally:
+        db.close()
+
+
+def _json_value(value, kind: str):
+    if value is None:
+        return None
+    if kind == "timestamp":
+        return to_naive_utc(value).isoformat() + "Z"
+    return value
+
+
+# ============================================
+# FORMATOS
+# ============================================
+
+def stream_ndjson(batches: Iterator[List[tuple]], resolution: str, columns: List[str]) -> Iterator[bytes]:
+    """Serializa os lotes como NDJSON (um registro por linha)"""
+    kinds = [available_columns(resolution)[name][1] for name in columns]
+
+    for batch in batches:
+        lines = []
+        for row in batch:
+            record = {
+                name: _json_value(value, kind)
+                for name, value, kind in zip(columns, row, kinds)
+            }
+            lines.append(json.dumps(record, ensure_ascii=False))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _arrow_type(kind: str):
+    return {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }[kind]
+
+
+def stream_arrow(batches: Iterator[List[tuple]], resolution: str, columns: List[str]) -> Iterator[bytes]:
+    """Serializa os lotes como Arrow IPC (formato stream), um RecordBatch por lote"""
+    kinds = [available_columns(resolution)[name][1] for name in columns]
+    schema = pa.schema([(name, _arrow_type(kind)) for name, kind in zip(columns, kinds)])
+
+    sink = BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate(0)
+        return data
+
+    yield drain()
+
+    for batch in batches:
+        arrays = []
+        for index, kind in enumerate(kinds):
+            values = [row[index] for row in batch]
+            if kind == "timestamp":
+                values = [to_naive_utc(value) if value is not None else None for value in values]
+            arrays.append(pa.array(values, type=schema.field(index).type))
+
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield drain()
+
+    writer.close()
+    yield drain()
+
+
+def export_history(site_ids: Sequence[int], start: datetime, end: datetime,
+                   resolution: str, columns: List[str], export_format: str) -> Iterator[bytes]:
+    """
+    Gera o conteúdo da exportação (para StreamingResponse).
+
+    Args:
+        site_ids: Sites incluídos (já validados como da conta)
+        start: Início do período (UTC)
+        end: Fim do período (UTC, exclusivo)
+        resolution: 'raw', '5m', '1h' ou '1d'
+        columns: Colunas validadas por parse_columns
+        export_format: 'ndjson' ou 'arrow'
+    """
+    batches = iter_rows(site_ids, to_naive_utc(start), to_naive_utc(end), resolution, columns)
+
+    if export_format == "arrow":
+        return stream_arrow(batches, resolution, columns)
+
+    return stream_ndjson(batches, resolution, columns)
@@ -0,0 +1,451 @@
+"""
+SentinelWeb - Pool de Clientes HTTP
+===================================
+Registro de clientes httpx compartilhados pelo processo do worker.
+
+Cada check do scanner.py usa estes clientes em vez de criar um novo
+(ou usar requests.get / httpx.get avulso). Assim as conexões TCP/TLS
+são reaproveitadas (keep-alive) entre as requisições ao mesmo host,
+por exemplo as ~10 requisições do scan WordPress.
+
+Recursos:
+- Keep-alive com limites globais e por host (HTTP_MAX_CONNECTIONS_PER_HOST)
+- HTTP/2 quando o pacote h2 está instalado (httpx[http2])
+- Timeouts configuráveis por variável de ambiente
+- Seguro para Celery prefork: os clientes são criados sob demanda no
+  processo filho e recriados se o PID mudar
+- Event loop persistente (run_async) para que o AsyncClient também
+  sobreviva entre tasks, em vez de morrer a cada asyncio.run()
+- AsyncClient resolve DNS pelo cache do worker (dns_cache.py)
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+import httpcore
+import httpx
+
+from dns_cache import CachedResolverBackend
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "50"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "6"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true"
+
+# Hosts com semáforo guardado por transport (os ociosos são descartados acima disso)
+HTTP_MAX_TRACKED_HOSTS = int(os.getenv("HTTP_MAX_TRACKED_HOSTS", "1024"))
+
+# Espera padrão do run_async (segundos): abaixo do soft time limit do
+# Celery (240s), para a task falhar com erro claro em vez de ficar presa
+HTTP_RUN_ASYNC_TIMEOUT = float(os.getenv("HTTP_RUN_ASYNC_TIMEOUT", "200"))
+
+# HTTP/2 depende do pacote opcional h2
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# ============================================
+# LIMITE DE CONEXÕES POR HOST
+# ============================================
+# O httpx só limita o total de conexões do pool. Os transports abaixo
+# seguram um semáforo por host até o corpo da resposta ser fechado,
+# para um único site lento não ocupar o pool inteiro.
+
+class _HostSemaphores:
+    """
+    Semáforos por host, com no máximo HTTP_MAX_TRACKED_HOSTS entradas.
+
+    Cada entrada conta as requisições em andamento (esperando ou com o
+    semáforo). Ao passar do limite, os hosts ociosos menos recentes são
+    descartados; um host em uso nunca perde o semáforo.
+    """
+
+    def __init__(self, max_per_host: int, factory: Callable[[int], Any]):
+        self._max_per_host = max(1, max_per_host)
+        self._factory = factory
+        self._entries: "OrderedDict[str, list]" = OrderedDict()  # host → [semáforo, em uso]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def checkout(self, host: str) -> Any:
+        """Semáforo do host (marcado como em uso até o checkin)"""
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                entry = self._entries[host] = [self._factory(self._max_per_host), 0]
+                self._evict()
+            else:
+                self._entries.move_to_end(host)
+            entry[1] += 1
+            return entry[0]
+
+    def checkin(self, host: str) -> None:
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None:
+                entry[1] -= 1
+
+    def _evict(self) -> None:
+        """Descarta hosts ociosos, do menos recente ao mais recente. Chamar com _lock"""
+        if len(self._entries) <= HTTP_MAX_TRACKED_HOSTS:
+            return
+        for host in list(self._entries):
+            if len(self._entries) <= HTTP_MAX_TRACKED_HOSTS:
+                break
+            if self._entries[host][1] == 0:
+                del self._entries[host]
+
+
+class _ReleasingByteStream(httpx.SyncByteStream):
+    """Libera a vaga do host quando o corpo da resposta é fechado"""
+
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _AsyncReleasingByteStream(httpx.AsyncByteStream):
+    """Versão assíncrona do _ReleasingByteStream"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _PerHostLimitTransport(httpx.HTTPTransport):
+    """HTTPTransport com no máximo N requisições simultâneas por host"""
+
+    def __init__(self, max_per_host: int, **kwargs):
+        super().__init__(**kwargs)
+        self._semaphores = _HostSemaphores(max_per_host, threading.BoundedSemaphore)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._semaphores.checkout(host)
+
+        def release() -> None:
+            semaphore.release()
+            self._semaphores.checkin(host)
+
+        try:
+            semaphore.acquire()
+        except BaseException:
+            self._semaphores.checkin(host)
+            raise
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            release()
+            raise
+        response.stream = _ReleasingByteStream(response.stream, release)
+        return response
+
+
+class _AsyncPerHostLimitTransport(httpx.AsyncHTTPTransport):
+    """
+    AsyncHTTPTransport com no máximo N requisições simultâneas por host.
+    Resolve os hosts pelo cache de DNS do worker (dns_cache.py).
+    """
+
+    def __init__(self, max_per_host: int, verify: bool = True, http2: bool = False,
+                 limits: httpx.Limits = httpx.Limits()):
+        super().__init__(verify=verify, http2=http2, limits=limits)
+        self._semaphores = _HostSemaphores(max_per_host, asyncio.Semaphore)
+        # O httpx não aceita network_backend no construtor: o pool do
+        # httpcore (API pública dele) é montado aqui, com o backend que
+        # resolve pelo cache de DNS, e substitui o atributo privado _pool
+        # do AsyncHTTPTransport, que é o que handle_async_request usa.
+        # Depende da versão do httpx: ver os pins em requirements.txt
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(verify=verify),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=CachedResolverBackend(httpcore.AnyIOBackend()),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._semaphores.checkout(host)
+
+        def release() -> None:
+            semaphore.release()
+            self._semaphores.checkin(host)
+
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            # Cancelada na espera: não chegou a ocupar o semáforo
+            self._semaphores.checkin(host)
+            raise
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        response.stream = _AsyncReleasingByteStream(response.stream, release)
+        return response
+
+
+# ============================================
+# REGISTRO DE CLIENTES (por processo)
+# ============================================
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_sync_clients: Dict[bool, httpx.Client] = {}
+_async_clients: Dict[bool, httpx.AsyncClient] = {}
+_probe_client: Optional[httpx.AsyncClient] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+
+
+def _reset_if_forked() -> None:
+    """
+    Descarta clientes herdados do processo pai (Celery prefork).
+    Sockets e o thread do event loop não sobrevivem ao fork.
+    Deve ser chamada com _lock adquirido.
+    """
+    global _pid, _loop, _loop_thread, _probe_client
+
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _sync_clients.clear()
+        _async_clients.clear()
+        _probe_client = None
+        _loop = None
+        _loop_thread = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def get_http_client(verify: bool = True) -> httpx.Client:
+    """
+    Retorna o cliente HTTP síncrono compartilhado do processo.
+
+    Args:
+        verify: Se deve validar o certificado TLS. Os checks de segurança
+                (WordPress, uptime) usam verify=False para não falhar em
+                sites com SSL inválido — o SSL é avaliado à parte.
+
+    Returns:
+        httpx.Client com keep-alive (não feche; é reaproveitado)
+
+    Note:
+        Timeouts específicos podem ser passados por requisição
+        (client.get(url, timeout=5)); o padrão é HTTP_TIMEOUT.
+    """
+    with _lock:
+        _reset_if_forked()
+
+        client = _sync_clients.get(verify)
+        if client is None or client.is_closed:
+            http2 = HTTP_ENABLE_HTTP2 and HTTP2_AVAILABLE
+            client = httpx.Client(
+                timeout=_timeout(),
+                follow_redirects=True,
+                transport=_PerHostLimitTransport(
+                    max_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+                    verify=verify,
+                    http2=http2,
+                    limits=_limits(),
+                ),
+            )
+            _sync_clients[verify] = client
+
+        return client
+
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    """Inicia (uma vez por processo) o event loop persistente em um thread daemon"""
+    global _loop, _loop_thread
+
+    with _lock:
+        _reset_if_forked()
+
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever,
+                name="sentinelweb-http-loop",
+                daemon=True,
+            )
+            _loop_thread.start()
+
+        return _loop
+
+
+def get_async_http_client(verify: bool = True) -> httpx.AsyncClient:
+    """
+    Retorna o AsyncClient compartilhado, vinculado ao event loop persistente.
+
+    Só pode ser usado dentro de corrotinas executadas via run_async();
+    um AsyncClient não pode ser usado em outro event loop.
+
+    Args:
+        verify: Se deve validar o certificado TLS
+
+    Returns:
+        httpx.AsyncClient com keep-alive (não feche; é reaproveitado)
+    """
+    with _lock:
+        _reset_if_forked()
+
+        client = _async_clients.get(verify)
+        if client is None or client.is_closed:
+            http2 = HTTP_ENABLE_HTTP2 and HTTP2_AVAILABLE
+            client = httpx.AsyncClient(
+                timeout=_timeout(),
+                follow_redirects=True,
+                transport=_AsyncPerHostLimitTransport(
+                    max_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+                    verify=verify,
+                    http2=http2,
+                    limits=_limits(),
+                ),
+            )
+            _async_clients[verify] = client
+
+        return client
+
+
+def get_async_probe_client() -> httpx.AsyncClient:
+    """
+    Retorna o AsyncClient das sondas de confirmação de queda (scanner.py).
+
+    Diferente do cliente compartilhado: sem keep-alive (cada sonda abre uma
+    conexão nova, então uma conexão velha do pool não causa falso negativo),
+    sem limite por host, sem validar TLS e sem seguir redirects (3xx já
+    conta como online). As sondas conectam direto no IP resolvido, com
+    Host e SNI do domínio.
+
+    Mesmas regras de uso de get_async_http_client (só dentro de run_async).
+    """
+    global _probe_client
+
+    with _lock:
+        _reset_if_forked()
+
+        if _probe_client is None or _probe_client.is_closed:
+            _probe_client = httpx.AsyncClient(
+                timeout=_timeout(),
+                follow_redirects=False,
+                verify=False,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=0,
+                ),
+            )
+
+        return _probe_client
+
+
+def run_async(coro: Coroutine, timeout: Optional[float] = HTTP_RUN_ASYNC_TIMEOUT) -> Any:
+    """
+    Executa uma corrotina no event loop persistente e espera o resultado.
+
+    Substitui asyncio.run() nos wrappers síncronos do scanner: o loop (e
+    portanto o AsyncClient e suas conexões) continua vivo entre chamadas.
+
+    Args:
+        coro: Corrotina a executar
+        timeout: Tempo máximo de espera em segundos (padrão
+                 HTTP_RUN_ASYNC_TIMEOUT; None = sem limite)
+
+    Returns:
+        O resultado da corrotina
+
+    Raises:
+        TimeoutError: Se passar do timeout (a corrotina é cancelada)
+    """
+    loop = _ensure_loop()
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is loop:
+        raise RuntimeError("run_async() não pode ser chamada de dentro do próprio event loop do pool")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        # Não deixa a corrotina rodando no loop depois de desistir dela
+        future.cancel()
+        raise
+
+
+def close_http_clients() -> None:
+    """Fecha todos os clientes do processo (útil em testes e no shutdown)"""
+    global _probe_client
+
+    with _lock:
+        for client in _sync_clients.values():
+            client.close()
+        _sync_clients.clear()
+
+        loop = _loop
+        async_clients = list(_async_clients.values())
+        _async_clients.clear()
+        if _probe_client is not None:
+            async_clients.append(_probe_client)
+            _probe_client = None
+
+    if loop is not None and not loop.is_closed():
+        for client in async_clients:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(5)
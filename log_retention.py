@@ -0,0 +1,243 @@
+"""
+SentinelWeb - Retenção e Particionamento de monitor_logs
+========================================================
+No PostgreSQL, monitor_logs é particionada por mês (RANGE em checked_at),
+com partições criadas antecipadamente. A retenção remove (ou desanexa
+para arquivamento) partições inteiras, sem DELETE linha a linha.
+
+No SQLite (desenvolvimento) ou em um PostgreSQL ainda não particionado,
+a retenção cai para DELETE em lotes pequenos.
+
+A conversão da tabela existente é feita por migrate_partition_monitor_logs.py.
+A retenção física usa a maior retenção entre os planos
+(plan_limits.MAX_LOG_RETENTION_DAYS); a de cada plano é aplicada nas consultas.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from plan_limits import MAX_LOG_RETENTION_DAYS
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Quantos meses à frente manter partições criadas
+MONITOR_LOG_PARTITIONS_AHEAD = int(os.getenv("MONITOR_LOG_PARTITIONS_AHEAD", "3"))
+
+# 'drop' remove a partição; 'detach' desanexa (tabela fica disponível para pg_dump/arquivo)
+MONITOR_LOG_RETENTION_MODE = os.getenv("MONITOR_LOG_RETENTION_MODE", "drop")
+
+# Tamanho do lote do DELETE no modo sem partições
+MONITOR_LOG_DELETE_BATCH = int(os.getenv("MONITOR_LOG_DELETE_BATCH", "5000"))
+
+PARTITION_PATTERN = re.compile(r"^monitor_logs_(\d{4})_(\d{2})$")
+
+
+# ============================================
+# HELPERS
+# ============================================
+
+def month_start(value: datetime) -> datetime:
+    """Primeiro instante do mês"""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """Soma meses a um início de mês"""
+    index = value.year * 12 + (value.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    """Nome da partição mensal (ex: monitor_logs_2024_03)"""
+    return f"monitor_logs_{month.year}_{month.month:02d}"
+
+
+def is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def is_partitioned(db: Session) -> bool:
+    """Verifica se monitor_logs já é uma tabela particionada (PostgreSQL)"""
+    if not is_postgres(db):
+        return False
+
+    return bool(db.execute(text("""
+        SELECT EXISTS (
+            SELECT 1
+            FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = 'monitor_logs'
+        )
+    """)).scalar())
+
+
+def list_partitions(db: Session) -> List[Tuple[str, datetime]]:
+    """Lista as partições mensais anexadas: [(nome, início do mês)]"""
+    rows = db.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'monitor_logs'
+    """)).scalars().all()
+
+    partitions = []
+    for name in rows:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((name, datetime(int(match.group(1)), int(match.group(2)), 1)))
+
+    return sorted(partitions, key=lambda item: item[1])
+
+
+# ============================================
+# PARTIÇÕES
+# ============================================
+
+def create_partition(db: Session, month: datetime) -> str:
+    """Cria (se não existir) a partição do mês informado"""
+    month = month_start(month)
+    name = partition_name(month)
+
+    db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF monitor_logs "
+        f"FOR VALUES FROM ('{month.isoformat()}+00') TO ('{add_months(month, 1).isoformat()}+00')"
+    ))
+
+    return name
+
+
+def ensure_partitions(db: Session, now: Optional[datetime] = None, ahead: int = MONITOR_LOG_PARTITIONS_AHEAD) -> List[str]:
+    """
+    Garante partições do mês atual até `ahead` meses à frente.
+
+    Returns:
+        Nomes das partições criadas nesta execução
+    """
+    current = month_start(now or datetime.utcnow())
+    existing = {name for name, _ in list_partitions(db)}
+
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) not in existing:
+            created.append(create_partition(db, month))
+
+    return created
+
+
+def drop_expired_partitions(db: Session, horizon: datetime) -> List[str]:
+    """
+    Remove (ou desanexa) as partições cujo mês inteiro é anterior ao horizonte.
+
+    Returns:
+        Nomes das partições removidas/desanexadas
+    """
+    removed = []
+
+    for name, month in list_partitions(db):
+        if add_months(month, 1) > horizon:
+            continue
+
+        if MONITOR_LOG_RETENTION_MODE == "detach":
+            db.execute(text(f"ALTER TABLE monitor_logs DETACH PARTITION {name}"))
+        else:
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+        removed.append(name)
+
+    return removed
+
+
+def delete_expired_rows(db: Session, horizon: datetime, batch_size: int = MONITOR_LOG_DELETE_BATCH) -> int:
+    """
+    Fallback sem partições: apaga logs antigos em lotes pequenos
+    (um commit por lote, para não segurar locks nem inflar o WAL).
+
+    Returns:
+        Quantidade de linhas removidas
+    """
+    deleted = 0
+
+    while True:
+        result = db.execute(text("""
+            DELETE FROM monitor_logs
+            WHERE id IN (
+                SELECT id FROM monitor_logs
+                WHERE checked_at < :horizon
+                ORDER BY id
+                LIMIT :batch_size
+            )
+        """), {"horizon": horizon, "batch_size": batch_size})
+        db.commit()
+
+        deleted += result.rowcount or 0
+        if not result.rowcount or result.rowcount < batch_size:
+            return deleted
+
+
+# ============================================
+# ORQUESTRAÇÃO
+# ============================================
+
+def apply_retention(db: Session, now: Optional[datetime] = None) -> Dict[str, object]:
+    """
+    Executa a manutenção de monitor_logs (chamada pela task do Celery).
+
+    PostgreSQL particionado: cria partições à frente e remove as expiradas.
+    Demais casos: DELETE em lotes.
+
+    Returns:
+        Dict com o que foi feito
+    """
+    now = now or datetime.utcnow()
+    horizon = now - timedelta(days=MAX_LOG_RETENTION_DAYS)
+
+    if is_partitioned(db):
+        created = ensure_partitions(db, now)
+        removed = drop_expired_partitions(db, horizon)
+        db.commit()
+        return {
+            "mode": "partitions",
+            "created": created,
+            "removed": removed,
+            "horizon": horizon.isoformat(),
+        }
+
+    deleted = delete_expired_rows(db, horizon)
+    return {
+        "mode": "delete",
+        "deleted": deleted,
+        "horizon": horizon.isoformat(),
+    }
+
+
+def estimate_monitor_log_count(db: Session) -> int:
+    """
+    Estimativa barata do total de logs (evita COUNT(*) na tabela inteira).
+
+    PostgreSQL: reltuples das estatísticas (soma das partições, se houver).
+    SQLite: maior id (logs só são inseridos, e a retenção apaga os mais antigos).
+    """
+    if is_postgres(db):
+        estimate = db.execute(text("""
+            SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+            FROM pg_class c
+            WHERE c.relname = 'monitor_logs'
+               OR c.oid IN (
+                   SELECT i.inhrelid
+                   FROM pg_inherits i
+                   JOIN pg_class p ON p.oid = i.inhparent
+                   WHERE p.relname = 'monitor_logs'
+               )
+        """)).scalar()
+        return int(estimate or 0)
+
+    return int(db.execute(text("SELECT COALESCE(MAX(id), 0) FROM monitor_logs")).scalar() or 0)
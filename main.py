@@ -6,28 +6,34 @@ Configura rotas, templates e middlewares.
 """
 
 from fastapi import FastAPI, Request, Depends, HTTPException, status, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select
 from typing import Optional
 from datetime import datetime, timedelta, timezone
 import os
 import redis
 
 # Imports locais
-from database import get_db, init_db, engine
-from models import User, Site, MonitorLog, HeartbeatCheck, SystemConfig, Payment, PaymentStatus, BillingType
+from database import get_async_db, get_db, init_db, engine
+from models import User, Site, MonitorLog, HeartbeatCheck, SystemConfig, BillingType
 from schemas import (
     UserCreate, UserLogin, UserUpdate, SiteCreate, SiteUpdate, 
     SiteResponse, MessageResponse, DashboardStats
 )
 from auth import (
-    get_password_hash, create_access_token, authenticate_user,
-    get_current_user, get_optional_user, get_user_by_email
+    create_access_token, authenticate_user,
+    get_current_user, get_optional_user, get_user_by_email,
+    get_current_user_async, get_current_auth_user, get_password_hash_async
 )
+from password_pool import PasswordPoolBusy, PASSWORD_POOL_RETRY_AFTER
+from user_cache import AuthUser, invalidate_user
 from tasks import scan_site, scan_all_sites
+from rollups import get_site_buckets, pick_resolution, regroup, summarize
+from log_retention import estimate_monitor_log_count
 
 # SQLAdmin imports
 from sqladmin import Admin
@@ -139,6 +145,16 @@ templates.env.filters["latency"] = format_latency
 templates.env.filters["from_json"] = from_json
 
 
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request: Request, exc: PasswordPoolBusy):
+    """Pool de bcrypt saturado (rajada de logins): recusa rápido em vez de enfileirar"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Muitas tentativas simultâneas, tente novamente em instantes"},
+        headers={"Retry-After": str(PASSWORD_POOL_RETRY_AFTER)}
+    )
+
+
 # ============================================
 # SQLADMIN - PAINEL ADMINISTRATIVO
 # ============================================
@@ -183,77 +199,22 @@ admin.add_view(SystemConfigAdmin)
 # ============================================
 
 @app.get("/admin/api/dashboard-stats")
-async def admin_dashboard_stats(db: Session = Depends(get_db)):
+async def admin_dashboard_stats():
     """
     Endpoint que retorna KPIs para o dashboard executivo.
-    Calcula MRR, Churn Risk, Saúde Operacional, Fila Celery, etc.
+    MRR, Churn Risk, Saúde Operacional, Fila Celery (total e por fila), etc.
+    
+    Lê o snapshot mantido pela task refresh_admin_stats (ver admin_stats.py);
+    sem snapshot, calcula na hora (em thread) e grava para as próximas abas.
     """
+    from starlette.concurrency import run_in_threadpool
+    from admin_stats import get_snapshot, refresh_snapshot
+    
     try:
-        # Total de usuários
-        total_users = db.query(User).filter(User.is_active == True).count()
-        
-        # Distribuição de planos
-        plan_free = db.query(User).filter(User.plan_status == 'free', User.is_active == True).count()
-        plan_pro = db.query(User).filter(User.plan_status == 'pro', User.is_active == True).count()
-        plan_agency = db.query(User).filter(User.plan_status == 'agency', User.is_active == True).count()
-        
-        # MRR (Monthly Recurring Revenue)
-        # Assume: Pro = R$ 49/mês, Agency = R$ 149/mês
-        mrr = (plan_pro * 49) + (plan_agency * 149)
-        
-        # ARPU (Average Revenue Per User)
-        arpu = mrr / total_users if total_users > 0 else 0
-        
-        # Churn Risk: Usuários com pagamentos vencidos
-        churn_risk = db.query(Payment).filter(
-            Payment.status == PaymentStatus.OVERDUE
-        ).count()
-        
-        # Total de sites
-        total_sites = db.query(Site).filter(Site.is_active == True).count()
-        
-        # Distribuição de status dos sites
-        sites_online = db.query(Site).filter(
-            Site.is_active == True,
-            Site.current_status == 'online'
-        ).count()
-        
-        sites_offline = db.query(Site).filter(
-            Site.is_active == True,
-            Site.current_status == 'offline'
-        ).count()
-        
-        sites_unknown = db.query(Site).filter(
-            Site.is_active == True,
-            Site.current_status == 'unknown'
-        ).count()
-        
-        # Saúde Operacional: % de sites online
-        health_score = (sites_online / total_sites * 100) if total_sites > 0 else 100
-        
-        # Fila Celery (Redis)
-        queue_size = 0
-        try:
-            redis_client = redis.from_url(os.getenv("REDIS_URL", "redis://redis:6379/0"))
-            queue_size = redis_client.llen("celery")
-        except Exception as e:
-            print(f"⚠️ Erro ao conectar no Redis: {str(e)}")
-        
-        return {
-            "mrr": mrr,
-            "arpu": arpu,
-            "churn_risk": churn_risk,
-            "health_score": round(health_score, 1),
-            "queue_size": queue_size,
-            "total_users": total_users,
-            "total_sites": total_sites,
-            "plan_free": plan_free,
-            "plan_pro": plan_pro,
-            "plan_agency": plan_agency,
-            "sites_online": sites_online,
-            "sites_offline": sites_offline,
-            "sites_unknown": sites_unknown
-        }
+        snapshot = await get_snapshot()
+        if snapshot is None:
+            snapshot = await run_in_threadpool(refresh_snapshot)
+        return snapshot
         
     except Exception as e:
         print(f"❌ Erro ao calcular estatísticas do admin: {str(e)}")
@@ -379,7 +340,7 @@ async def login(
     db: Session = Depends(get_db)
 ):
     """Processa o login"""
-    user = authenticate_user(db, email, password)
+    user = await authenticate_user(db, email, password)
     
     if not user:
         return templates.TemplateResponse("login.html", {
@@ -458,7 +419,7 @@ async def register(
         })
     
     # Cria o usuário
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
     new_user = User(
         email=email,
         hashed_password=hashed_password,
@@ -498,10 +459,7 @@ async def logout():
 # ============================================
 
 @app.get("/ping/{slug}")
-async def heartbeat_ping(
-    slug: str,
-    db: Session = Depends(get_db)
-):
+async def heartbeat_ping(slug: str):
     """
     Rota ultra-rápida para receber pings de heartbeat.
     
@@ -522,37 +480,31 @@ async def heartbeat_ping(
         JSON com status OK
     
     Performance:
-        - Query simples por índice único
-        - Update mínimo de 4 campos
-        - Sem cálculos pesados
-        - Sem I/O adicional
-        - Resposta em <50ms
+        - Slug resolvido por cache no Redis (banco só no cache miss)
+        - Ping gravado em hashes do Redis, sem tocar no banco
+        - heartbeat_checks é atualizado em lote pela task flush_heartbeat_pings
+        - Sem Redis, cai para o update direto no banco (AsyncSession)
     """
-    from datetime import datetime, timezone, timedelta
+    from datetime import datetime, timezone
+    from heartbeat_store import resolve_slug, record_ping, record_ping_db
     
-    # Busca heartbeat (query otimizada por índice único)
-    heartbeat = db.query(HeartbeatCheck).filter(
-        HeartbeatCheck.slug == slug,
-        HeartbeatCheck.is_active == True
-    ).first()
+    now = datetime.now(timezone.utc)
+    
+    try:
+        heartbeat = await resolve_slug(slug)
+        if heartbeat:
+            await record_ping(heartbeat, now)
+    except redis.RedisError as e:
+        print(f"⚠️ Redis indisponível no ping, gravando direto no banco: {str(e)}")
+        heartbeat = await record_ping_db(slug, now)
     
     if not heartbeat:
         raise HTTPException(status_code=404, detail="Heartbeat not found")
     
-    # Update ultra-rápido (apenas 5 campos)
-    now = datetime.now(timezone.utc)
-    heartbeat.last_ping = now
-    heartbeat.next_expected_ping = now + timedelta(seconds=heartbeat.expected_period)
-    heartbeat.status = 'up'
-    heartbeat.total_pings += 1
-    heartbeat.alert_sent = False  # Reset flag de alerta
-    
-    db.commit()
-    
     # Resposta mínima (formato curl-friendly)
     return {
         "ok": True,
-        "name": heartbeat.name,
+        "name": heartbeat["name"],
         "timestamp": now.isoformat()
     }
 
@@ -565,7 +517,7 @@ async def heartbeat_ping(
 async def public_status_page(
     request: Request,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Página pública de status dos sites de um usuário.
@@ -583,16 +535,16 @@ async def public_status_page(
         Não requer autenticação - é uma página pública
     """
     # Busca o usuário
-    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    user = await db.scalar(select(User).where(User.id == user_id, User.is_active == True))
     
     if not user:
         raise HTTPException(status_code=404, detail="Status page não encontrada")
     
     # Busca apenas sites ativos do usuário
-    sites = db.query(Site).filter(
+    sites = (await db.scalars(select(Site).where(
         Site.owner_id == user_id,
         Site.is_active == True
-    ).order_by(Site.domain).all()
+    ).order_by(Site.domain))).all()
     
     # Calcula estatísticas
     total_sites = len(sites)
@@ -753,8 +705,8 @@ async def subscription_page(
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(
     request: Request,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Dashboard principal com lista de sites"""
     from plan_limits import get_usage_stats
@@ -763,10 +715,11 @@ async def dashboard(
         # Garante que o usuário tem um plan_status válido
         if not user.plan_status or user.plan_status not in ['free', 'pro', 'agency']:
             user.plan_status = 'free'
-            db.commit()
+            await db.commit()
+            invalidate_user(user.id)
         
         # Busca sites do usuário
-        sites = db.query(Site).filter(Site.owner_id == user.id).order_by(Site.domain).all()
+        sites = (await db.scalars(select(Site).where(Site.owner_id == user.id).order_by(Site.domain))).all()
         
         # Calcula estatísticas
         total_sites = len(sites)
@@ -790,7 +743,7 @@ async def dashboard(
         }
         
         # Estatísticas de uso do plano
-        plan_usage = get_usage_stats(user, db)
+        plan_usage = await db.run_sync(lambda session: get_usage_stats(user, session))
         
         # Função helper para o template (timezone-aware)
         def now():
@@ -912,36 +865,28 @@ async def add_site(
 async def site_detail(
     request: Request,
     site_id: int,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Página de detalhes completos do site (Raio-X)"""
-    site = db.query(Site).filter(
+    site = await db.scalar(select(Site).where(
         Site.id == site_id,
         Site.owner_id == user.id
-    ).first()
+    ))
     
     if not site:
         raise HTTPException(status_code=404, detail="Site não encontrado")
     
-    # Busca últimos logs para estatísticas
-    recent_logs = db.query(MonitorLog).filter(
-        MonitorLog.site_id == site_id
-    ).order_by(MonitorLog.checked_at.desc()).limit(100).all()
-    
-    # Calcula estatísticas
-    total_checks = len(recent_logs)
-    online_checks = len([log for log in recent_logs if log.status == "online"])
-    uptime_percent = (online_checks / total_checks * 100) if total_checks > 0 else 0
-    
-    # Latência média
-    latencies = [log.latency_ms for log in recent_logs if log.latency_ms is not None]
-    avg_latency = sum(latencies) / len(latencies) if latencies else None
+    # Estatísticas das últimas 24h (rollups; run_sync reaproveita as consultas
+    # síncronas do rollups.py sobre a conexão assíncrona, sem bloquear o loop)
+    stats = summarize(await db.run_sync(get_site_buckets, site_id, datetime.utcnow() - timedelta(hours=24)))
+    total_checks = stats["total_checks"]
+    uptime_percent = stats["uptime_percent"]
+    avg_latency = stats["avg_latency"]
     
     # Calcula dias até expiração do domínio
     domain_days_remaining = None
     if site.domain_expiration_date:
-        from datetime import datetime, timezone
         now = datetime.now(timezone.utc)
         
         # Garante que ambos os datetimes tenham timezone
@@ -986,28 +931,13 @@ async def site_logs(
         MonitorLog.site_id == site.id
     ).order_by(MonitorLog.checked_at.desc()).limit(50).all()
     
-    # Calcula média de latência dos últimos 24h
-    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
-    avg_latency = db.query(func.avg(MonitorLog.latency_ms)).filter(
-        MonitorLog.site_id == site.id,
-        MonitorLog.checked_at >= yesterday,
-        MonitorLog.latency_ms.isnot(None)
-    ).scalar()
-    
-    # Calcula uptime % dos últimos 7 dias
-    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-    total_checks = db.query(MonitorLog).filter(
-        MonitorLog.site_id == site.id,
-        MonitorLog.checked_at >= week_ago
-    ).count()
-    
-    online_checks = db.query(MonitorLog).filter(
-        MonitorLog.site_id == site.id,
-        MonitorLog.checked_at >= week_ago,
-        MonitorLog.status == "online"
-    ).count()
-    
-    uptime_percent = (online_checks / total_checks * 100) if total_checks > 0 else 0
+    # Calcula média de latência dos últimos 24h (rollups de 5 minutos)
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    avg_latency = summarize(get_site_buckets(db, site.id, yesterday))["avg_latency"]
+    
+    # Calcula uptime % dos últimos 7 dias (rollups de 1 hora)
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    uptime_percent = summarize(get_site_buckets(db, site.id, week_ago, resolution="1h"))["uptime_percent"]
     
     return templates.TemplateResponse("site_detail.html", {
         "request": request,
@@ -1051,7 +981,7 @@ async def edit_site(
     check_interval: int = Form(5),
     must_contain_keyword: str = Form(None),
     is_active: bool = Form(True),
-    user: User = Depends(get_current_user),
+    user: AuthUser = Depends(get_current_auth_user),
     db: Session = Depends(get_db)
 ):
     """Atualiza um site"""
@@ -1070,6 +1000,9 @@ async def edit_site(
             must_contain_keyword = None
     
     site.name = name or site.domain
+    if site.check_interval != check_interval:
+        # Reagenda no próximo ciclo do scheduler com o novo intervalo
+        site.next_check_at = None
     site.check_interval = check_interval
     site.must_contain_keyword = must_contain_keyword
     site.is_active = is_active
@@ -1082,7 +1015,7 @@ async def edit_site(
 @app.post("/sites/{site_id}/delete")
 async def delete_site(
     site_id: int,
-    user: User = Depends(get_current_user),
+    user: AuthUser = Depends(get_current_auth_user),
     db: Session = Depends(get_db)
 ):
     """Remove um site"""
@@ -1103,7 +1036,7 @@ async def delete_site(
 @app.post("/sites/{site_id}/scan")
 async def trigger_scan(
     site_id: int,
-    user: User = Depends(get_current_user),
+    user: AuthUser = Depends(get_current_auth_user),
     db: Session = Depends(get_db)
 ):
     """Dispara scan manual de um site"""
@@ -1123,7 +1056,7 @@ async def trigger_scan(
 
 @app.post("/api/scan-all")
 async def api_scan_all(
-    user: User = Depends(get_current_user)
+    user: AuthUser = Depends(get_current_auth_user)
 ):
     """Dispara scan de todos os sites do usuário"""
     scan_all_sites.delay()
@@ -1134,16 +1067,18 @@ async def api_scan_all(
 async def get_site_history(
     site_id: int,
     hours: int = 24,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: AuthUser = Depends(get_current_auth_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Retorna histórico de performance do site para gráficos.
     
     Otimizado para visualização com ApexCharts:
-    - Agrupa dados a cada 30 minutos para melhor performance
+    - Lê dos rollups (MonitorRollup); o trecho ainda não compactado é
+      agregado no banco (GROUP BY por intervalo), sem carregar logs brutos
+    - Agrupa dados a cada 30 minutos (24h), 1 hora (7 dias) ou 1 dia
     - Retorna latência média e status de disponibilidade
-    - Últimas 24 horas por padrão
+    - Últimas 24 horas por padrão (limitado à retenção do plano)
     
     Args:
         site_id: ID do site
@@ -1152,28 +1087,29 @@ async def get_site_history(
     Returns:
         JSON com dados otimizados para gráficos
     """
-    from datetime import datetime, timedelta, timezone
+    from datetime import datetime, timedelta
     
     # Verifica se o site pertence ao usuário
-    site = db.query(Site).filter(
+    site_exists = await db.scalar(select(Site.id).where(
         Site.id == site_id,
         Site.owner_id == user.id
-    ).first()
+    ))
     
-    if not site:
+    if not site_exists:
         raise HTTPException(status_code=404, detail="Site não encontrado")
     
-    # Calcula período
-    now = datetime.now(timezone.utc)
+    # Limita a janela à retenção do plano (logs além disso não são exibidos)
+    from plan_limits import get_log_retention_days
+    hours = max(1, min(hours, get_log_retention_days(user.plan_status) * 24))
+    
+    # Calcula período (UTC, mesmo padrão dos logs gravados pelos workers)
+    now = datetime.utcnow()
     start_time = now - timedelta(hours=hours)
     
-    # Busca logs do período
-    logs = db.query(MonitorLog).filter(
-        MonitorLog.site_id == site_id,
-        MonitorLog.checked_at >= start_time
-    ).order_by(MonitorLog.checked_at.asc()).all()
+    # Lê dos rollups (5m / 1h / 1d conforme a janela) + trecho ainda não compactado
+    buckets = await db.run_sync(get_site_buckets, site_id, start_time, now, resolution=pick_resolution(hours))
     
-    if not logs:
+    if not buckets:
         # Retorna dados vazios se não houver histórico
         return {
             "categories": [],
@@ -1185,115 +1121,183 @@ async def get_site_history(
             "uptime_percent": 0
         }
     
-    # Agrupa dados a cada 30 minutos para otimização
-    interval_minutes = 30
-    grouped_data = {}
-    
-    for log in logs:
-        # Arredonda para o intervalo mais próximo
-        log_time = log.checked_at
-        if log_time.tzinfo is None:
-            log_time = log_time.replace(tzinfo=timezone.utc)
-        
-        # Cria chave do intervalo (arredonda para 30 min)
-        interval_key = log_time.replace(
-            minute=(log_time.minute // interval_minutes) * interval_minutes,
-            second=0,
-            microsecond=0
-        )
-        
-        if interval_key not in grouped_data:
-            grouped_data[interval_key] = {
-                'latencies': [],
-                'statuses': [],
-                'count': 0
-            }
-        
-        grouped_data[interval_key]['count'] += 1
-        
-        if log.latency_ms is not None:
-            grouped_data[interval_key]['latencies'].append(log.latency_ms)
-        
-        # 1 = online, 0 = offline
-        grouped_data[interval_key]['statuses'].append(
-            1 if log.status == 'online' else 0
-        )
+    # Agrupa os pontos do gráfico (30 min em 24h, 1h até 7 dias, 1 dia acima disso)
+    if hours <= 24:
+        chart_interval, label_format = timedelta(minutes=30), '%H:%M'
+    elif hours <= 24 * 7:
+        chart_interval, label_format = timedelta(hours=1), '%d/%m %H:%M'
+    else:
+        chart_interval, label_format = timedelta(days=1), '%d/%m'
     
     # Prepara dados para o gráfico
     categories = []
     latency_data = []
     status_data = []
     
-    for interval_time in sorted(grouped_data.keys()):
-        data = grouped_data[interval_time]
+    for point in regroup(buckets, chart_interval):
+        categories.append(point.bucket_start.strftime(label_format))
         
-        # Formata horário (HH:MM)
-        categories.append(interval_time.strftime('%H:%M'))
+        # Latência média do intervalo (Null para offline)
+        latency_data.append(round(point.latency_avg, 2) if point.latency_avg is not None else None)
         
-        # Calcula latência média do intervalo
-        if data['latencies']:
-            avg_latency = sum(data['latencies']) / len(data['latencies'])
-            latency_data.append(round(avg_latency, 2))
-        else:
-            latency_data.append(None)  # Null para offline
-        
-        # Calcula status (1 = todos online, 0 = algum offline)
-        if data['statuses']:
-            avg_status = sum(data['statuses']) / len(data['statuses'])
-            status_data.append(round(avg_status, 2))
+        # Status (1 = todos online, 0 = algum offline)
+        if point.check_count:
+            status_data.append(round(point.online_count / point.check_count, 2))
         else:
             status_data.append(0)
     
-    # Calcula uptime por hora (para as barras)
+    # Calcula uptime por hora (para as barras); por dia em janelas longas
+    bar_interval = timedelta(hours=1) if hours <= 72 else timedelta(days=1)
+    bar_format = '%d/%m %H:00' if hours <= 72 else '%d/%m'
+    bars = {bar.bucket_start: bar for bar in regroup(buckets, bar_interval)}
+    
     uptime_hours = []
-    current_hour = start_time.replace(minute=0, second=0, microsecond=0)
+    current_bar = start_time.replace(minute=0, second=0, microsecond=0)
+    if bar_interval >= timedelta(days=1):
+        current_bar = current_bar.replace(hour=0)
     
-    while current_hour <= now:
-        next_hour = current_hour + timedelta(hours=1)
+    while current_bar <= now:
+        bar = bars.get(current_bar)
         
-        # Filtra logs dessa hora
-        hour_logs = [
-            log for log in logs
-            if current_hour <= (log.checked_at if log.checked_at.tzinfo else log.checked_at.replace(tzinfo=timezone.utc)) < next_hour
-        ]
-        
-        if hour_logs:
-            online_count = sum(1 for log in hour_logs if log.status == 'online')
-            hour_uptime = (online_count / len(hour_logs)) * 100
-            
+        if bar and bar.check_count:
             uptime_hours.append({
-                'hour': current_hour.strftime('%d/%m %H:00'),
-                'uptime': round(hour_uptime, 1),
-                'checks': len(hour_logs)
+                'hour': current_bar.strftime(bar_format),
+                'uptime': round(bar.online_count / bar.check_count * 100, 1),
+                'checks': bar.check_count
             })
         else:
             uptime_hours.append({
-                'hour': current_hour.strftime('%d/%m %H:00'),
+                'hour': current_bar.strftime(bar_format),
                 'uptime': None,
                 'checks': 0
             })
         
-        current_hour = next_hour
+        current_bar += bar_interval
     
     # Estatísticas gerais
-    total_checks = len(logs)
-    online_checks = sum(1 for log in logs if log.status == 'online')
-    uptime_percent = (online_checks / total_checks * 100) if total_checks > 0 else 0
-    
-    all_latencies = [log.latency_ms for log in logs if log.latency_ms is not None]
-    avg_latency = sum(all_latencies) / len(all_latencies) if all_latencies else 0
+    stats = summarize(buckets)
     
     return {
         "categories": categories,
         "latency": latency_data,
         "status": status_data,
         "uptime_hours": uptime_hours,
-        "total_checks": total_checks,
-        "avg_latency": round(avg_latency, 2),
-        "uptime_percent": round(uptime_percent, 2)
+        "total_checks": stats["total_checks"],
+        "avg_latency": round(stats["avg_latency"] or 0, 2),
+        "uptime_percent": round(stats["uptime_percent"], 2)
     }
 
 
+def _history_export_response(
+    user: AuthUser,
+    site_ids: list,
+    filename: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    resolution: str,
+    columns: Optional[str],
+    format: str
+) -> StreamingResponse:
+    """Valida os parâmetros da exportação e monta a resposta em streaming"""
+    from plan_limits import has_feature, get_log_retention_days
+    from rollups import ROLLUP_RETENTION, to_naive_utc
+    from history_export import ARROW_AVAILABLE, EXPORT_FORMATS, export_history, parse_columns
+    
+    if not has_feature(user, 'history_export'):
+        raise HTTPException(status_code=403, detail="Exportação de histórico está disponível no plano Agency")
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {format} (use ndjson ou arrow)")
+    
+    if format == "arrow" and not ARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Exportação Arrow indisponível (pyarrow não instalado)")
+    
+    try:
+        selected_columns = parse_columns(columns, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Período (UTC), limitado à retenção do plano
+    now = datetime.utcnow()
+    end_time = min(to_naive_utc(end), now) if end else now
+    horizon = now - timedelta(days=get_log_retention_days(user.plan_status))
+    if resolution in ROLLUP_RETENTION:
+        # Rollups mais antigos que a retenção da resolução já foram apagados
+        horizon = max(horizon, now - ROLLUP_RETENTION[resolution])
+    start_time = max(to_naive_utc(start), horizon) if start else horizon
+    
+    if start_time >= end_time:
+        raise HTTPException(status_code=400, detail="Período inválido: início deve ser anterior ao fim")
+    
+    extension = "arrows" if format == "arrow" else "ndjson"
+    
+    return StreamingResponse(
+        export_history(site_ids, start_time, end_time, resolution, selected_columns, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    )
+
+
+@app.get("/api/sites/{site_id}/export")
+async def export_site_history(
+    site_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: str = "raw",
+    columns: Optional[str] = None,
+    format: str = "ndjson",
+    user: AuthUser = Depends(get_current_auth_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Exporta o histórico de um site em streaming (NDJSON ou Arrow IPC).
+    
+    Args:
+        site_id: ID do site
+        start: Início do período (ISO 8601, padrão: início da retenção do plano)
+        end: Fim do período (ISO 8601, padrão: agora)
+        resolution: 'raw' (logs brutos) ou '5m', '1h', '1d' (rollups)
+        columns: Colunas separadas por vírgula (padrão depende da resolução)
+        format: 'ndjson' ou 'arrow'
+    """
+    site = db.query(Site.id).filter(
+        Site.id == site_id,
+        Site.owner_id == user.id
+    ).first()
+    
+    if not site:
+        raise HTTPException(status_code=404, detail="Site não encontrado")
+    
+    return _history_export_response(
+        user, [site_id], f"site-{site_id}-history-{resolution}",
+        start, end, resolution, columns, format
+    )
+
+
+@app.get("/api/export")
+async def export_account_history(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: str = "raw",
+    columns: Optional[str] = None,
+    format: str = "ndjson",
+    user: AuthUser = Depends(get_current_auth_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Exporta o histórico de todos os sites da conta em streaming.
+    
+    Mesmos parâmetros de /api/sites/{site_id}/export; as linhas vêm
+    ordenadas por site e por horário (use a coluna site_id para separar).
+    """
+    site_ids = [row.id for row in db.query(Site.id).filter(Site.owner_id == user.id).all()]
+    
+    return _history_export_response(
+        user, site_ids, f"account-{user.id}-history-{resolution}",
+        start, end, resolution, columns, format
+    )
+
+
 @app.put("/api/profile")
 async def update_profile(
     request: Request,
@@ -1316,6 +1320,7 @@ async def update_profile(
             
             user.cpf_cnpj = cpf_cnpj_clean
             db.commit()
+            invalidate_user(user.id)
             return {"message": "CPF/CNPJ atualizado com sucesso"}
         
         # Se veio dados completos de perfil
@@ -1348,11 +1353,14 @@ async def update_profile(
         if company_name:
             user.company_name = company_name
         if password:
-            user.hashed_password = get_password_hash(password)
+            user.hashed_password = await get_password_hash_async(password)
         
         db.commit()
+        invalidate_user(user.id)
         return {"message": "Perfil atualizado com sucesso"}
         
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         return JSONResponse(
             status_code=400, 
@@ -1414,7 +1422,8 @@ async def admin_panel(
     total_users = db.query(User).count()
     active_users = db.query(User).filter(User.is_active == True).count()
     total_sites = db.query(Site).count()
-    total_logs = db.query(MonitorLog).count()
+    # Estimativa pelas estatísticas do banco (COUNT(*) varre a tabela inteira)
+    total_logs = estimate_monitor_log_count(db)
     
     # Usuários recentes
     recent_users = db.query(User).order_by(User.created_at.desc()).limit(10).all()
@@ -1469,6 +1478,7 @@ async def admin_toggle_user(
     
     target_user.is_active = not target_user.is_active
     db.commit()
+    invalidate_user(target_user.id)
     
     return RedirectResponse(url="/admin/users", status_code=302)
 
@@ -1491,6 +1501,7 @@ async def admin_change_plan(
     
     target_user.plan_status = plan
     db.commit()
+    invalidate_user(target_user.id)
     
     return RedirectResponse(url="/admin/users", status_code=302)
 
@@ -0,0 +1,95 @@
+"""
+Migração: Cria a tabela de estado de alertas (alert_states)
+
+Adiciona:
+- alert_states: Estado por site × tipo de alerta (ver alert_state.py)
+- uq_alert_states_site_type: Um estado por site e tipo
+
+Sites que hoje já estão offline, em blacklist, desindexados ou com nota F
+de headers entram como alerta aberto ('firing'), para o dono não receber
+de novo, logo após o deploy, um alerta que já recebeu.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+# Tipo de alerta → condição (SQL sobre sites) de alerta já aberto
+OPEN_ALERTS = {
+    "down": "current_status = 'offline'",
+    "blacklist": "is_blacklisted = 1",
+    "seo_noindex": "seo_indexable = 0",
+    "security_headers": "security_headers_grade = 'F'",
+}
+
+
+def migrate():
+    """Executa a migração para criar a tabela alert_states"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Estado de alertas...")
+        
+        # 1. Cria a tabela
+        print("  ➕ Criando tabela: alert_states...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS alert_states (
+                id INTEGER PRIMARY KEY,
+                site_id INTEGER NOT NULL REFERENCES sites(id) ON DELETE CASCADE,
+                alert_type VARCHAR(30) NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'ok',
+                history VARCHAR(32) NOT NULL DEFAULT '',
+                fingerprint VARCHAR(64),
+                transitions TEXT,
+                flapping BOOLEAN DEFAULT 0,
+                opened_at DATETIME,
+                last_notified_at DATETIME,
+                notify_count INTEGER DEFAULT 0,
+                CONSTRAINT uq_alert_states_site_type UNIQUE (site_id, alert_type)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_alert_states_id ON alert_states (id)")
+        print("  ✅ alert_states criada")
+        
+        # 2. Registra os alertas que já estão abertos
+        cursor.execute("PRAGMA table_info(sites)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        for alert_type, condition in OPEN_ALERTS.items():
+            column = condition.split()[0]
+            if column not in columns:
+                print(f"  ⏭️  sites.{column} não existe, pulando {alert_type}")
+                continue
+            
+            cursor.execute(f"""
+                INSERT OR IGNORE INTO alert_states 
+                    (site_id, alert_type, status, history, flapping, opened_at, last_notified_at, notify_count)
+                SELECT id, ?, 'firing', '11', 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1
+                FROM sites 
+                WHERE is_active = 1 AND {condition}
+            """, (alert_type,))
+            print(f"  ✅ {cursor.rowcount} alerta(s) '{alert_type}' já abertos registrados")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("🔕 Alertas repetidos agora são deduplicados por site e tipo")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
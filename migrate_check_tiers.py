@@ -0,0 +1,67 @@
+"""
+Migração: Adiciona os timestamps dos checks lentos na tabela sites
+
+Adiciona:
+- last_whois_check (DATETIME): Última verificação Whois
+- last_blacklist_check (DATETIME): Última verificação RBL
+- last_wordpress_check (DATETIME): Última verificação WordPress
+
+SEO e Tech Scanner já possuem last_seo_check e last_tech_scan.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+NEW_COLUMNS = [
+    "last_whois_check",
+    "last_blacklist_check",
+    "last_wordpress_check",
+]
+
+
+def migrate():
+    """Executa a migração para adicionar os timestamps dos checks lentos"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Checks lentos com cadência própria...")
+        
+        # Verifica se as colunas já existem
+        cursor.execute("PRAGMA table_info(sites)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        for column in NEW_COLUMNS:
+            if column not in columns:
+                print(f"  ➕ Adicionando coluna: {column}...")
+                cursor.execute(f"""
+                    ALTER TABLE sites 
+                    ADD COLUMN {column} DATETIME
+                """)
+                print(f"  ✅ {column} adicionada")
+            else:
+                print(f"  ⏭️  {column} já existe")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("🐢 Whois, RBL, WordPress, SEO e Tech agora rodam fora do scan de uptime")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
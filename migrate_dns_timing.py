@@ -0,0 +1,59 @@
+"""
+Migração: Adiciona o tempo de resolução DNS aos logs de monitoramento
+
+Adiciona:
+- dns_ms (FLOAT): Tempo de resolução DNS do scan em ms
+  (0 quando o endereço veio do cache de DNS do worker, ver dns_cache.py)
+
+Logs antigos ficam com NULL (não medido).
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+
+def migrate():
+    """Executa a migração para adicionar o campo dns_ms"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Tempo de DNS nos logs...")
+        
+        # Verifica se a coluna já existe
+        cursor.execute("PRAGMA table_info(monitor_logs)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        if 'dns_ms' not in columns:
+            print("  ➕ Adicionando coluna: dns_ms...")
+            cursor.execute("""
+                ALTER TABLE monitor_logs 
+                ADD COLUMN dns_ms FLOAT
+            """)
+            print("  ✅ dns_ms adicionada")
+        else:
+            print("  ⏭️  dns_ms já existe")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("🌐 Cada scan agora registra o tempo de resolução DNS")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
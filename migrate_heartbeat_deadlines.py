@@ -0,0 +1,81 @@
+"""
+Migração: Adiciona o prazo indexado dos heartbeats
+
+Adiciona:
+- next_deadline (DATETIME): Próxima transição de status do heartbeat
+  (up → late em last_ping + expected_period, late → down após o grace_period)
+- ix_heartbeat_checks_next_deadline: Índice usado pelo check_heartbeats
+
+Heartbeats 'up' e 'late' recebem next_deadline = next_expected_ping; na
+primeira execução o check_heartbeats recalcula o prazo correto de cada um.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+
+def migrate():
+    """Executa a migração para adicionar o campo next_deadline"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Prazos indexados de heartbeat...")
+        
+        # Verifica se as colunas já existem
+        cursor.execute("PRAGMA table_info(heartbeat_checks)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        # 1. Adiciona coluna next_deadline
+        if 'next_deadline' not in columns:
+            print("  ➕ Adicionando coluna: next_deadline...")
+            cursor.execute("""
+                ALTER TABLE heartbeat_checks 
+                ADD COLUMN next_deadline DATETIME
+            """)
+            print("  ✅ next_deadline adicionada")
+        else:
+            print("  ⏭️  next_deadline já existe")
+        
+        # 2. Preenche os heartbeats que aguardam transição
+        print("  🔁 Preenchendo next_deadline dos heartbeats ativos...")
+        cursor.execute("""
+            UPDATE heartbeat_checks 
+            SET next_deadline = next_expected_ping 
+            WHERE next_deadline IS NULL 
+              AND status IN ('up', 'late') 
+              AND next_expected_ping IS NOT NULL
+        """)
+        print(f"  ✅ {cursor.rowcount} heartbeats atualizados")
+        
+        # 3. Cria índice para a busca de prazos vencidos
+        print("  ➕ Criando índice: ix_heartbeat_checks_next_deadline...")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_heartbeat_checks_next_deadline 
+            ON heartbeat_checks (next_deadline)
+        """)
+        print("  ✅ ix_heartbeat_checks_next_deadline criado")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("💓 O check_heartbeats agora só processa heartbeats com prazo vencido")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
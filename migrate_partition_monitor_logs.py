@@ -0,0 +1,138 @@
+"""
+Migração: Índice composto e particionamento de monitor_logs
+
+Adiciona:
+- ix_monitor_logs_site_id_checked_at: índice (site_id, checked_at DESC)
+  usado pelas consultas de histórico
+
+PostgreSQL (DATABASE_URL):
+- Converte monitor_logs em tabela particionada por mês (RANGE em checked_at)
+- Cria as partições do primeiro log até MONITOR_LOG_PARTITIONS_AHEAD meses à frente
+  (mais uma partição DEFAULT para datas fora do intervalo)
+- Copia os logs existentes e remove a tabela antiga
+
+A chave primária passa a ser (id, checked_at), exigência do PostgreSQL para
+tabelas particionadas. Rode com os workers parados: os logs gravados durante
+a cópia seriam perdidos.
+
+Depois da migração, a task maintain_monitor_logs (Celery Beat) cria as
+próximas partições e remove as expiradas (ver log_retention.py).
+"""
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import engine
+from log_retention import MONITOR_LOG_PARTITIONS_AHEAD, add_months, month_start, partition_name
+
+INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS ix_monitor_logs_site_id_checked_at
+    ON monitor_logs (site_id, checked_at DESC)
+"""
+
+
+def migrate_sqlite(conn):
+    """SQLite: apenas o índice composto (sem particionamento)"""
+    print("  ➕ Criando índice: ix_monitor_logs_site_id_checked_at...")
+    conn.execute(text(INDEX_SQL))
+    print("  ✅ Índice criado")
+
+
+def migrate_postgres(conn):
+    """PostgreSQL: converte monitor_logs em tabela particionada por mês"""
+    partitioned = conn.execute(text("""
+        SELECT EXISTS (
+            SELECT 1
+            FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = 'monitor_logs'
+        )
+    """)).scalar()
+
+    if partitioned:
+        print("  ⏭️  monitor_logs já é particionada")
+        conn.execute(text(INDEX_SQL))
+        return
+
+    # 1. Renomeia a tabela atual (e o que tem nome próprio) para *_legacy
+    print("  🔁 Renomeando monitor_logs → monitor_logs_legacy...")
+    conn.execute(text("ALTER TABLE monitor_logs RENAME TO monitor_logs_legacy"))
+    conn.execute(text("ALTER TABLE monitor_logs_legacy RENAME CONSTRAINT monitor_logs_pkey TO monitor_logs_legacy_pkey"))
+    conn.execute(text("ALTER INDEX IF EXISTS ix_monitor_logs_id RENAME TO ix_monitor_logs_legacy_id"))
+    conn.execute(text("ALTER INDEX IF EXISTS ix_monitor_logs_site_id_checked_at RENAME TO ix_monitor_logs_legacy_site_id_checked_at"))
+
+    # 2. Cria a tabela particionada com as mesmas colunas (e o mesmo DEFAULT do id)
+    print("  ➕ Criando monitor_logs particionada por mês...")
+    conn.execute(text("""
+        CREATE TABLE monitor_logs (LIKE monitor_logs_legacy INCLUDING DEFAULTS)
+        PARTITION BY RANGE (checked_at)
+    """))
+    conn.execute(text("ALTER TABLE monitor_logs ALTER COLUMN checked_at SET NOT NULL"))
+    conn.execute(text("ALTER TABLE monitor_logs ADD CONSTRAINT monitor_logs_pkey PRIMARY KEY (id, checked_at)"))
+    conn.execute(text("""
+        ALTER TABLE monitor_logs
+        ADD CONSTRAINT monitor_logs_site_id_fkey FOREIGN KEY (site_id) REFERENCES sites (id)
+    """))
+
+    # 3. Partições mensais do primeiro log até alguns meses à frente
+    first_log = conn.execute(text("SELECT MIN(checked_at) FROM monitor_logs_legacy")).scalar()
+    now = datetime.utcnow()
+    month = month_start(first_log or now)
+    last = add_months(month_start(now), MONITOR_LOG_PARTITIONS_AHEAD)
+
+    print("  ➕ Criando partições...")
+    count = 0
+    while month <= last:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF monitor_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}+00') TO ('{add_months(month, 1).isoformat()}+00')"
+        ))
+        month = add_months(month, 1)
+        count += 1
+    conn.execute(text("CREATE TABLE IF NOT EXISTS monitor_logs_default PARTITION OF monitor_logs DEFAULT"))
+    print(f"  ✅ {count} partições mensais criadas (+ default)")
+
+    # 4. Copia os dados
+    print("  📦 Copiando logs existentes...")
+    conn.execute(text("UPDATE monitor_logs_legacy SET checked_at = NOW() WHERE checked_at IS NULL"))
+    copied = conn.execute(text("INSERT INTO monitor_logs SELECT * FROM monitor_logs_legacy")).rowcount
+    print(f"  ✅ {copied} logs copiados")
+
+    # 5. Transfere a sequence do id e remove a tabela antiga
+    conn.execute(text("ALTER SEQUENCE IF EXISTS monitor_logs_id_seq OWNED BY monitor_logs.id"))
+    conn.execute(text("DROP TABLE monitor_logs_legacy"))
+
+    # 6. Índices (criados em cada partição automaticamente)
+    print("  ➕ Criando índices...")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_monitor_logs_id ON monitor_logs (id)"))
+    conn.execute(text(INDEX_SQL))
+    print("  ✅ Índices criados")
+
+
+def migrate():
+    """Executa a migração de índice/particionamento de monitor_logs"""
+
+    try:
+        print("🔧 Iniciando migração: Particionamento de monitor_logs...")
+
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                migrate_postgres(conn)
+            else:
+                migrate_sqlite(conn)
+
+        print("\n✨ Migração concluída com sucesso!")
+        print("🗄️ A retenção de logs agora é aplicada diariamente pelo Celery Beat")
+
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,78 @@
+"""
+Migração: Cria a tabela de rollups do MonitorLog
+
+Adiciona:
+- monitor_rollups: Agregados por site em intervalos de 5 minutos, 1 hora e 1 dia
+  (contagem, online, latência min/média/p95/max, histogramas)
+
+Depois da migração, a task compact_monitor_rollups (Celery Beat) faz o
+backfill do histórico existente aos poucos, ROLLUP_MAX_WINDOW_HOURS por execução.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+
+def migrate():
+    """Executa a migração para criar a tabela de rollups"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Rollups do MonitorLog...")
+        
+        # 1. Cria tabela monitor_rollups
+        print("  ➕ Criando tabela: monitor_rollups...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS monitor_rollups (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                site_id INTEGER NOT NULL,
+                resolution VARCHAR(5) NOT NULL,
+                bucket_start DATETIME NOT NULL,
+                check_count INTEGER NOT NULL DEFAULT 0,
+                online_count INTEGER NOT NULL DEFAULT 0,
+                latency_count INTEGER NOT NULL DEFAULT 0,
+                latency_sum REAL NOT NULL DEFAULT 0.0,
+                latency_min REAL,
+                latency_max REAL,
+                latency_p95 REAL,
+                latency_histogram TEXT,
+                status_codes TEXT,
+                FOREIGN KEY (site_id) REFERENCES sites (id) ON DELETE CASCADE,
+                CONSTRAINT uq_monitor_rollups_bucket UNIQUE (site_id, resolution, bucket_start)
+            )
+        """)
+        print("  ✅ monitor_rollups criada")
+        
+        # 2. Cria índices
+        print("  ➕ Criando índices...")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_monitor_rollups_id ON monitor_rollups (id)")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_monitor_rollups_resolution_bucket 
+            ON monitor_rollups (resolution, bucket_start)
+        """)
+        print("  ✅ Índices criados")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("📊 Os gráficos agora leem dos rollups (compactados pelo Celery Beat)")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,58 @@
+"""
+Migração: Adiciona as portas do port scan configuráveis por site
+
+Adiciona:
+- scan_ports (VARCHAR 255): Portas testadas no port scan do site, ex: "22,3306,8080"
+
+Sites existentes ficam com NULL (usam as portas do plano, ver plan_limits.py).
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+
+def migrate():
+    """Executa a migração para adicionar o campo scan_ports"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Portas do port scan por site...")
+        
+        # Verifica se a coluna já existe
+        cursor.execute("PRAGMA table_info(sites)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        if 'scan_ports' not in columns:
+            print("  ➕ Adicionando coluna: scan_ports...")
+            cursor.execute("""
+                ALTER TABLE sites 
+                ADD COLUMN scan_ports VARCHAR(255)
+            """)
+            print("  ✅ scan_ports adicionada")
+        else:
+            print("  ⏭️  scan_ports já existe")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("🔌 O port scan agora usa as portas do site ou do plano")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,69 @@
+"""
+Migração: Adiciona o agendamento por site (scheduler de uptime)
+
+Adiciona:
+- next_check_at (DATETIME): Próximo scan agendado do site
+- ix_sites_next_check_at: Índice usado pelo dispatch_due_sites
+
+Sites existentes ficam com next_check_at NULL e recebem uma fase
+aleatória dentro do próprio intervalo no primeiro tick do scheduler.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+
+def migrate():
+    """Executa a migração para adicionar o campo next_check_at"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Scheduler por check_interval...")
+        
+        # Verifica se as colunas já existem
+        cursor.execute("PRAGMA table_info(sites)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        # 1. Adiciona coluna next_check_at
+        if 'next_check_at' not in columns:
+            print("  ➕ Adicionando coluna: next_check_at...")
+            cursor.execute("""
+                ALTER TABLE sites 
+                ADD COLUMN next_check_at DATETIME
+            """)
+            print("  ✅ next_check_at adicionada")
+        else:
+            print("  ⏭️  next_check_at já existe")
+        
+        # 2. Cria índice para a busca de sites vencidos
+        print("  ➕ Criando índice: ix_sites_next_check_at...")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_sites_next_check_at 
+            ON sites (next_check_at)
+        """)
+        print("  ✅ ix_sites_next_check_at criado")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("⏱️ Os sites agora são escaneados conforme o próprio check_interval")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,71 @@
+"""
+Migração: Adiciona os detalhes do certificado SSL na tabela sites
+
+Adiciona:
+- ssl_fingerprint (VARCHAR 64): SHA-256 do certificado atual
+- ssl_expires_at (DATETIME): Validade do certificado
+- ssl_chain (TEXT): JSON com a cadeia enviada pelo servidor
+- ssl_ocsp_url (VARCHAR 500): Responder OCSP da CA
+- ssl_ocsp_status (VARCHAR 20): Último status OCSP (good, revoked, unknown)
+
+Os campos são preenchidos no próximo scan de cada site.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+NEW_COLUMNS = {
+    "ssl_fingerprint": "VARCHAR(64)",
+    "ssl_expires_at": "DATETIME",
+    "ssl_chain": "TEXT",
+    "ssl_ocsp_url": "VARCHAR(500)",
+    "ssl_ocsp_status": "VARCHAR(20)",
+}
+
+
+def migrate():
+    """Executa a migração para adicionar os detalhes do certificado"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Detalhes do certificado SSL...")
+        
+        # Verifica se as colunas já existem
+        cursor.execute("PRAGMA table_info(sites)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        for column, column_type in NEW_COLUMNS.items():
+            if column not in columns:
+                print(f"  ➕ Adicionando coluna: {column}...")
+                cursor.execute(f"""
+                    ALTER TABLE sites 
+                    ADD COLUMN {column} {column_type}
+                """)
+                print(f"  ✅ {column} adicionada")
+            else:
+                print(f"  ⏭️  {column} já existe")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("🔐 O scan agora registra cadeia, validade e OCSP do certificado")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
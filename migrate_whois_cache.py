@@ -0,0 +1,92 @@
+"""
+Migração: Adiciona o agendamento do Whois conforme a expiração do domínio
+
+Adiciona:
+- whois_next_check_at (DATETIME): Próximo refresh do Whois do site
+  (semanal longe da expiração, diário perto dela, ver whois_cache.py)
+- ix_sites_whois_next_check_at: Índice usado pelo dispatch_slow_checks
+
+Sites que já têm Whois recebem o próximo refresh a partir do último check,
+para o deploy não disparar o Whois de todos os sites de uma vez.
+"""
+
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from whois_cache import refresh_interval
+
+DB_PATH = Path(__file__).parent / "sentinelweb.db"
+
+
+def _parse(value):
+    """Datas do SQLite vêm como texto"""
+    return datetime.fromisoformat(value) if value else None
+
+
+def migrate():
+    """Executa a migração para adicionar o campo whois_next_check_at"""
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        print("🔧 Iniciando migração: Cache de Whois...")
+        
+        # Verifica se a coluna já existe
+        cursor.execute("PRAGMA table_info(sites)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        if 'whois_next_check_at' not in columns:
+            print("  ➕ Adicionando coluna: whois_next_check_at...")
+            cursor.execute("""
+                ALTER TABLE sites 
+                ADD COLUMN whois_next_check_at DATETIME
+            """)
+            print("  ✅ whois_next_check_at adicionada")
+        else:
+            print("  ⏭️  whois_next_check_at já existe")
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS ix_sites_whois_next_check_at
+            ON sites (whois_next_check_at)
+        """)
+        print("  ✅ Índice ix_sites_whois_next_check_at")
+        
+        # Agenda o próximo refresh dos sites que já foram verificados
+        cursor.execute("""
+            SELECT id, domain_expiration_date, last_whois_check
+            FROM sites
+            WHERE whois_next_check_at IS NULL AND last_whois_check IS NOT NULL
+        """)
+        rows = cursor.fetchall()
+        
+        for site_id, expiration, last_check in rows:
+            last_check = _parse(last_check)
+            next_check = last_check + refresh_interval(_parse(expiration), last_check)
+            cursor.execute(
+                "UPDATE sites SET whois_next_check_at = ? WHERE id = ?",
+                (next_check.strftime("%Y-%m-%d %H:%M:%S.%f"), site_id)
+            )
+        print(f"  📅 {len(rows)} site(s) com próximo Whois agendado")
+        
+        # Commit das mudanças
+        conn.commit()
+        print("\n✨ Migração concluída com sucesso!")
+        print("🗓️  O Whois agora é atualizado conforme a proximidade da expiração, na fila 'whois'")
+        
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Erro durante migração: {e}")
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -1,13 +1,13 @@
 """
 SentinelWeb - Modelos do Banco de Dados (ORM)
 =============================================
-Define as tabelas: User, Site e MonitorLog
+Define as tabelas: User, Site, MonitorLog e MonitorRollup
 Usando SQLAlchemy ORM para abstração do banco.
 """
 
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Float, 
-    ForeignKey, Text, Enum as SQLEnum
+    ForeignKey, Text, Enum as SQLEnum, UniqueConstraint, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -98,6 +98,7 @@ class Site(Base):
     name = Column(String(255), nullable=True)  # Nome amigável do site
     is_active = Column(Boolean, default=True)  # Monitoramento ativo?
     check_interval = Column(Integer, default=5)  # Intervalo em minutos
+    next_check_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Próximo scan agendado (dispatch_due_sites)
     
     # Status atual (atualizado pelo worker)
     current_status = Column(String(20), default="unknown")
@@ -105,7 +106,14 @@ class Site(Base):
     last_latency = Column(Float, nullable=True)  # Última latência em ms
     ssl_days_remaining = Column(Integer, nullable=True)  # Dias até expirar SSL
     ssl_valid = Column(Boolean, nullable=True)
+    ssl_fingerprint = Column(String(64), nullable=True)  # SHA-256 do certificado atual
+    ssl_expires_at = Column(DateTime(timezone=True), nullable=True)  # Validade do certificado
+    ssl_chain = Column(Text, nullable=True)  # JSON: cadeia enviada pelo servidor (subject, issuer, expires_at)
+    ssl_ocsp_url = Column(String(500), nullable=True)  # Responder OCSP da CA
+    ssl_ocsp_status = Column(String(20), nullable=True)  # good, revoked, unknown
     domain_expiration_date = Column(DateTime(timezone=True), nullable=True)  # Data de expiração do domínio (Whois)
+    last_whois_check = Column(DateTime(timezone=True), nullable=True)  # Última verificação Whois
+    whois_next_check_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Próximo refresh do Whois (conforme a expiração)
     
     # Verificação de Defacement (Desfiguração)
     must_contain_keyword = Column(String(255), nullable=True)  # Palavra-chave que deve existir no HTML (anti-defacement)
@@ -113,11 +121,13 @@ class Site(Base):
     # Verificação de Blacklist (RBL)
     is_blacklisted = Column(Boolean, default=False, nullable=False)  # Se o IP está em alguma blacklist
     blacklisted_in = Column(Text, nullable=True)  # Lista de RBLs onde foi encontrado (JSON string)
+    last_blacklist_check = Column(DateTime(timezone=True), nullable=True)  # Última verificação RBL
     
     # WordPress Security Scan
     is_wordpress = Column(Boolean, default=False, nullable=False)  # Se o site é WordPress
     wp_version = Column(String(50), nullable=True)  # Versão do WordPress detectada
     vulnerabilities_found = Column(Text, nullable=True)  # JSON com lista de vulnerabilidades encontradas
+    last_wordpress_check = Column(DateTime(timezone=True), nullable=True)  # Última verificação WordPress
     
     # Google PageSpeed Insights (Performance Audit)
     performance_score = Column(Integer, nullable=True)  # Score de Performance (0-100)
@@ -128,6 +138,7 @@ class Site(Base):
     
     # Alertas de portas abertas (JSON string para simplicidade no MVP)
     open_ports = Column(Text, nullable=True)  # ex: "21,22,3306"
+    scan_ports = Column(String(255), nullable=True)  # Portas do port scan, ex: "22,3306,8080" (vazio = plano)
     
     # Visual Regression Testing
     last_screenshot_path = Column(String(500), nullable=True)  # Caminho do screenshot atual
@@ -177,6 +188,7 @@ class MonitorLog(Base):
     status = Column(String(20), nullable=False)  # online/offline
     http_status_code = Column(Integer, nullable=True)  # 200, 404, 500, etc
     latency_ms = Column(Float, nullable=True)  # Tempo de resposta em ms
+    dns_ms = Column(Float, nullable=True)  # Tempo de resolução DNS em ms (0 = cache do worker)
     
     # Informações SSL
     ssl_valid = Column(Boolean, nullable=True)
@@ -199,6 +211,96 @@ class MonitorLog(Base):
         return f"<MonitorLog(site_id={self.site_id}, status={self.status}, checked_at={self.checked_at})>"
 
 
+# Índice composto usado por todas as consultas de histórico (site + período, mais recentes primeiro)
+Index("ix_monitor_logs_site_id_checked_at", MonitorLog.site_id, MonitorLog.checked_at.desc())
+
+
+class MonitorRollup(Base):
+    """
+    Tabela de Rollups do MonitorLog (séries temporais agregadas)
+    
+    Cada linha resume as verificações de um site em um intervalo
+    (5 minutos, 1 hora ou 1 dia). Mantida pela task compact_monitor_rollups
+    (ver rollups.py) e lida pelos gráficos e estatísticas de uptime.
+    """
+    __tablename__ = "monitor_rollups"
+    __table_args__ = (
+        UniqueConstraint("site_id", "resolution", "bucket_start", name="uq_monitor_rollups_bucket"),
+        Index("ix_monitor_rollups_resolution_bucket", "resolution", "bucket_start"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    site_id = Column(Integer, ForeignKey("sites.id", ondelete="CASCADE"), nullable=False)
+    resolution = Column(String(5), nullable=False)  # '5m', '1h', '1d'
+    bucket_start = Column(DateTime(timezone=True), nullable=False)  # Início do intervalo (UTC)
+    
+    # Contagens
+    check_count = Column(Integer, nullable=False, default=0)
+    online_count = Column(Integer, nullable=False, default=0)
+    
+    # Latência (ms) - latency_count conta só verificações com latência
+    latency_count = Column(Integer, nullable=False, default=0)
+    latency_sum = Column(Float, nullable=False, default=0.0)
+    latency_min = Column(Float, nullable=True)
+    latency_max = Column(Float, nullable=True)
+    latency_p95 = Column(Float, nullable=True)
+    latency_histogram = Column(Text, nullable=True)  # JSON: contagem por faixa de LATENCY_BUCKETS_MS
+    
+    # Histograma de status HTTP (JSON: {"200": 10, "503": 2})
+    status_codes = Column(Text, nullable=True)
+    
+    site = relationship("Site")
+    
+    @property
+    def latency_avg(self):
+        """Latência média do intervalo"""
+        return self.latency_sum / self.latency_count if self.latency_count else None
+    
+    def __repr__(self):
+        return f"<MonitorRollup(site_id={self.site_id}, resolution={self.resolution}, bucket_start={self.bucket_start})>"
+
+
+class AlertState(Base):
+    """
+    Estado de alerta por site e tipo (down, blacklist, cve, ...)
+    
+    Guarda o histórico recente do check (confirmação N-de-M e histerese),
+    a assinatura do problema atual (fingerprint) e quando o dono foi
+    avisado pela última vez, para não repetir o mesmo alerta a cada scan.
+    Mantida por alert_state.py.
+    """
+    __tablename__ = "alert_states"
+    __table_args__ = (
+        UniqueConstraint("site_id", "alert_type", name="uq_alert_states_site_type"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    site_id = Column(Integer, ForeignKey("sites.id", ondelete="CASCADE"), nullable=False)
+    alert_type = Column(String(30), nullable=False)  # 'down', 'blacklist', 'cve', ...
+    
+    # 'ok' ou 'firing' (alerta aberto)
+    status = Column(String(20), nullable=False, default='ok')
+    
+    # Últimos resultados, mais recente por último ('1' = falhou, '0' = ok)
+    history = Column(String(32), nullable=False, default='')
+    
+    # Assinatura do problema atual (ex: hash das RBLs listadas)
+    fingerprint = Column(String(64), nullable=True)
+    
+    # Flapping: aberturas/fechamentos recentes (JSON: lista de epochs)
+    transitions = Column(Text, nullable=True)
+    flapping = Column(Boolean, default=False)
+    
+    opened_at = Column(DateTime(timezone=True), nullable=True)
+    last_notified_at = Column(DateTime(timezone=True), nullable=True)
+    notify_count = Column(Integer, default=0)
+    
+    site = relationship("Site")
+    
+    def __repr__(self):
+        return f"<AlertState(site_id={self.site_id}, alert_type={self.alert_type}, status={self.status})>"
+
+
 class HeartbeatCheck(Base):
     """
     Tabela de Heartbeat Checks (Monitoramento de Cron Jobs)
@@ -222,6 +324,9 @@ class HeartbeatCheck(Base):
     status = Column(String(20), default='new')  # 'new', 'up', 'late', 'down'
     last_ping = Column(DateTime(timezone=True), nullable=True)
     next_expected_ping = Column(DateTime(timezone=True), nullable=True)
+    # Próxima transição de status (up → late ou late → down); NULL = nenhuma pendente.
+    # O check_heartbeats só busca as linhas com next_deadline vencido.
+    next_deadline = Column(DateTime(timezone=True), nullable=True, index=True)
     
     # Alertas
     alert_sent = Column(Boolean, default=False)
@@ -0,0 +1,100 @@
+"""
+SentinelWeb - Pool de Hash de Senhas
+====================================
+bcrypt custa ~250ms de CPU por operação. Rodando direto nas rotas async
+(login, cadastro, perfil), uma rajada de tentativas de login congela o
+event loop do worker do uvicorn para todos os usuários.
+
+Este módulo roda as operações de senha em um ThreadPoolExecutor
+dedicado e limitado (o bcrypt libera o GIL durante o hash, então threads
+bastam), com limite de fila:
+
+- PASSWORD_POOL_WORKERS operações em paralelo por processo
+- Até PASSWORD_POOL_MAX_PENDING operações em espera + execução; acima
+  disso falha na hora com PasswordPoolBusy (a rota responde 429), em vez
+  de acumular uma fila que só cresce durante um credential stuffing
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Operações bcrypt simultâneas por processo
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Operações aceitas (em execução + na fila) antes de recusar com 429
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "32"))
+
+# Sugestão de espera devolvida no Retry-After (segundos)
+PASSWORD_POOL_RETRY_AFTER = int(os.getenv("PASSWORD_POOL_RETRY_AFTER", "2"))
+
+
+class PasswordPoolBusy(Exception):
+    """O pool de senhas está saturado (PASSWORD_POOL_MAX_PENDING atingido)"""
+
+
+# ============================================
+# POOL DO PROCESSO
+# ============================================
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = 0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Executor do processo (recriado após fork)"""
+    global _pid, _executor, _pending
+
+    if _executor is None or _pid != os.getpid():
+        _pid = os.getpid()
+        _pending = 0
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, PASSWORD_POOL_WORKERS),
+            thread_name_prefix="password"
+        )
+
+    return _executor
+
+
+def pending() -> int:
+    """Operações em execução ou na fila neste processo"""
+    return _pending
+
+
+def _release(_future) -> None:
+    global _pending
+    with _lock:
+        _pending = max(0, _pending - 1)
+
+
+async def run_password_op(fn: Callable[..., T], *args) -> T:
+    """
+    Executa uma operação de senha no pool, sem bloquear o event loop.
+
+    A vaga só é liberada quando a thread termina (mesmo que a request seja
+    cancelada antes), então o limite reflete o trabalho real do pool.
+
+    Raises:
+        PasswordPoolBusy: Se já houver PASSWORD_POOL_MAX_PENDING operações pendentes
+    """
+    global _pending
+
+    with _lock:
+        executor = _get_executor()
+        if _pending >= PASSWORD_POOL_MAX_PENDING:
+            raise PasswordPoolBusy("Muitas operações de senha em andamento, tente novamente")
+        _pending += 1
+
+    future = executor.submit(fn, *args)
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
@@ -4,7 +4,7 @@ Plan Limits - Limites e Restrições por Plano
 Define os limites de cada plano e funções de validação.
 """
 
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from models import User, Site
 
@@ -16,6 +16,8 @@ PLAN_LIMITS = {
     'free': {
         'max_sites': 1,
         'check_interval_min': 10,  # minutos
+        'log_retention_days': 7,  # histórico de verificações
+        'scan_ports': None,  # None = portas padrão do scanner (DEFAULT_SCAN_PORTS)
         'features': ['basic_monitoring', 'ssl_check'],
         'name': 'Plano Free',
         'description': 'Teste o sistema com 1 site'
@@ -23,6 +25,8 @@ PLAN_LIMITS = {
     'pro': {
         'max_sites': 20,
         'check_interval_min': 1,  # minutos
+        'log_retention_days': 90,
+        'scan_ports': [21, 22, 23, 3306, 5432, 27017, 6379, 1433, 3389, 9200, 11211],
         'features': ['basic_monitoring', 'ssl_check', 'telegram_alerts', 'heartbeat', 'tech_scanner'],
         'name': 'Plano Pro',
         'description': 'Para profissionais com até 20 sites'
@@ -30,13 +34,25 @@ PLAN_LIMITS = {
     'agency': {
         'max_sites': 100,
         'check_interval_min': 0.5,  # minutos (30 segundos)
-        'features': ['basic_monitoring', 'ssl_check', 'telegram_alerts', 'heartbeat', 'tech_scanner', 'visual_regression', 'pagespeed'],
+        'log_retention_days': 365,
+        'scan_ports': [21, 22, 23, 445, 3306, 5432, 27017, 6379, 1433, 3389, 9200, 11211],
+        'features': ['basic_monitoring', 'ssl_check', 'telegram_alerts', 'heartbeat', 'tech_scanner', 'visual_regression', 'pagespeed', 'history_export'],
         'name': 'Plano Agency',
         'description': 'Para agências com até 100 sites'
     }
 }
 
 
+# Máximo de portas no port scan de um site (Site.scan_ports)
+MAX_SCAN_PORTS = 32
+
+
+# Retenção física de monitor_logs: maior retenção entre os planos.
+# Partições inteiras mais antigas que isso são removidas (log_retention.py);
+# a retenção de cada plano é aplicada como horizonte nas consultas.
+MAX_LOG_RETENTION_DAYS = max(limits['log_retention_days'] for limits in PLAN_LIMITS.values())
+
+
 # ============================================
 # FUNÇÕES DE VALIDAÇÃO
 # ============================================
@@ -127,6 +143,63 @@ def validate_check_interval(user: User, check_interval: int) -> tuple[bool, Opti
     return True, None
 
 
+def get_effective_check_interval(plan_status: str, check_interval: Optional[float]) -> float:
+    """
+    Retorna o intervalo de check (em minutos) que o scheduler deve usar.
+    
+    Respeita o intervalo configurado no site, mas nunca abaixo do mínimo
+    do plano atual (ex: usuário que fez downgrade de Agency para Free).
+    
+    Args:
+        plan_status: 'free', 'pro' ou 'agency'
+        check_interval: Intervalo configurado no site (minutos)
+    
+    Returns:
+        Intervalo efetivo em minutos
+    """
+    min_interval = get_plan_limits(plan_status)['check_interval_min']
+    return max(check_interval or 5, min_interval)
+
+
+def get_log_retention_days(plan_status: str) -> int:
+    """
+    Retorna por quantos dias o histórico de verificações fica visível no plano.
+    
+    Args:
+        plan_status: 'free', 'pro' ou 'agency'
+    
+    Returns:
+        Retenção em dias
+    """
+    return get_plan_limits(plan_status)['log_retention_days']
+
+
+def get_scan_ports(plan_status: str, site_ports: Optional[str] = None) -> Optional[List[int]]:
+    """
+    Retorna as portas do port scan de um site.
+    
+    As portas configuradas no site (Site.scan_ports, ex: "22,3306,8080")
+    têm prioridade; sem elas, vale a lista do plano.
+    
+    Args:
+        plan_status: 'free', 'pro' ou 'agency'
+        site_ports: Portas configuradas no site (separadas por vírgula)
+    
+    Returns:
+        Lista de portas, ou None para as portas padrão do scanner
+    """
+    if site_ports:
+        ports = []
+        for value in site_ports.split(","):
+            value = value.strip()
+            if value.isdigit() and 0 < int(value) < 65536 and int(value) not in ports:
+                ports.append(int(value))
+        if ports:
+            return ports[:MAX_SCAN_PORTS]
+    
+    return get_plan_limits(plan_status)['scan_ports']
+
+
 def has_feature(user: User, feature: str) -> bool:
     """
     Verifica se o usuário tem acesso a uma feature específica.
@@ -0,0 +1,141 @@
+"""
+SentinelWeb - Port Scan Assíncrono
+==================================
+Probes TCP (connect) das portas críticas, todas em paralelo, com:
+
+- Limite global de conexões em voo no processo (PORT_SCAN_CONCURRENCY),
+  somando todos os sites do lote, para um lote grande não esgotar
+  file descriptors nem parecer um scan agressivo vindo do worker
+- Cache por (IP, porta) durante a janela de scan (PORT_SCAN_CACHE_TTL):
+  sites da mesma hospedagem compartilham o IP, então cada porta do
+  servidor é testada uma única vez por janela. Probes simultâneas da
+  mesma (IP, porta) também compartilham a conexão em andamento.
+
+Roda no event loop persistente do http_pool (run_async), como o
+dns_cache.py e o dnsbl.py.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Conexões de port scan em voo ao mesmo tempo no processo
+PORT_SCAN_CONCURRENCY = int(os.getenv("PORT_SCAN_CONCURRENCY", "256"))
+
+# Validade do resultado de uma (IP, porta) — a "janela de scan" (segundos)
+PORT_SCAN_CACHE_TTL = float(os.getenv("PORT_SCAN_CACHE_TTL", "300"))
+PORT_SCAN_CACHE_MAX_ENTRIES = int(os.getenv("PORT_SCAN_CACHE_MAX_ENTRIES", "50000"))
+
+
+async def async_check_port(host: str, port: int, timeout: float = 5) -> bool:
+    """
+    Versão assíncrona do check_port (connect TCP, sem cache).
+
+    Returns:
+        True se a porta está aberta, False caso contrário
+    """
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+    except Exception:
+        # Timeout, conexão recusada ou host inalcançável = porta fechada
+        return False
+
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+    return True
+
+
+class PortScanCache:
+    """
+    Cache LRU (IP, porta) → aberta? com expiração, mais o limite global de
+    probes em voo. Não é thread-safe: usar sempre no mesmo event loop.
+    """
+
+    def __init__(self, ttl: float = PORT_SCAN_CACHE_TTL, max_entries: int = PORT_SCAN_CACHE_MAX_ENTRIES,
+                 concurrency: int = PORT_SCAN_CONCURRENCY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, bool]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, ip: str, port: int) -> Optional[bool]:
+        entry = self._entries.get((ip, port))
+        if entry is None:
+            return None
+
+        expires, is_open = entry
+        if expires <= time.monotonic():
+            del self._entries[(ip, port)]
+            return None
+
+        self._entries.move_to_end((ip, port))
+        return is_open
+
+    def put(self, ip: str, port: int, is_open: bool) -> None:
+        self._entries[(ip, port)] = (time.monotonic() + self.ttl, is_open)
+        self._entries.move_to_end((ip, port))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def _probe_and_store(self, ip: str, port: int, timeout: float) -> bool:
+        async with self._semaphore:
+            is_open = await async_check_port(ip, port, timeout)
+        if self.ttl > 0:
+            self.put(ip, port, is_open)
+        return is_open
+
+    async def check(self, ip: str, port: int, timeout: float) -> bool:
+        """Porta aberta? (cache → probe em andamento → nova conexão)"""
+        cached = self.get(ip, port)
+        if cached is not None:
+            return cached
+
+        key = (ip, port)
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._probe_and_store(ip, port, timeout))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield: um scan cancelado não derruba a probe dos outros sites no mesmo IP
+        return await asyncio.shield(inflight)
+
+    async def scan(self, ip: str, ports: List[int], timeout: float) -> List[int]:
+        """Testa todas as portas ao mesmo tempo e devolve as abertas"""
+        results = await asyncio.gather(*(self.check(ip, port, timeout) for port in ports))
+        return [port for port, is_open in zip(ports, results) if is_open]
+
+
+# ============================================
+# CACHE DO PROCESSO
+# ============================================
+
+_pid: Optional[int] = None
+_cache: Optional[PortScanCache] = None
+
+
+def get_port_scan_cache() -> PortScanCache:
+    """Cache do processo (recriado após fork)"""
+    global _pid, _cache
+
+    if _cache is None or _pid != os.getpid():
+        _pid = os.getpid()
+        _cache = PortScanCache()
+
+    return _cache
@@ -0,0 +1,97 @@
+"""
+SentinelWeb - Pool de Conexões Redis
+====================================
+Clientes Redis compartilhados pelo processo (web e workers), no mesmo
+espírito do http_pool.py: um ConnectionPool por processo, criado sob
+demanda e recriado se o PID mudar (Celery prefork / gunicorn).
+
+- get_redis(): cliente síncrono (tasks do Celery, rotas síncronas)
+- get_async_redis(): cliente redis.asyncio (rotas async do FastAPI)
+"""
+
+import os
+import threading
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+
+
+# ============================================
+# REGISTRO DE CLIENTES (por processo)
+# ============================================
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_client: Optional[redis.Redis] = None
+_async_client: Optional[aioredis.Redis] = None
+
+
+def _reset_if_forked() -> None:
+    """Descarta clientes herdados do processo pai. Chamar com _lock adquirido."""
+    global _pid, _client, _async_client
+
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _client = None
+        _async_client = None
+
+
+def _pool_kwargs() -> dict:
+    return {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        "decode_responses": True,
+    }
+
+
+def get_redis() -> redis.Redis:
+    """
+    Retorna o cliente Redis síncrono compartilhado do processo.
+
+    Returns:
+        redis.Redis com decode_responses=True (não feche; é reaproveitado)
+    """
+    global _client
+
+    with _lock:
+        _reset_if_forked()
+
+        if _client is None:
+            _client = redis.Redis(
+                connection_pool=redis.ConnectionPool.from_url(REDIS_URL, **_pool_kwargs())
+            )
+
+        return _client
+
+
+def get_async_redis() -> aioredis.Redis:
+    """
+    Retorna o cliente redis.asyncio compartilhado do processo.
+
+    Deve ser usado sempre no mesmo event loop (o do uvicorn).
+
+    Returns:
+        redis.asyncio.Redis com decode_responses=True
+    """
+    global _async_client
+
+    with _lock:
+        _reset_if_forked()
+
+        if _async_client is None:
+            _async_client = aioredis.Redis(
+                connection_pool=aioredis.ConnectionPool.from_url(REDIS_URL, **_pool_kwargs())
+            )
+
+        return _async_client
@@ -0,0 +1,652 @@
+"""
+SentinelWeb - Rollups de MonitorLog (Séries Temporais)
+======================================================
+Agrega os logs brutos de verificação em intervalos fixos:
+
+    monitor_logs (1 linha por check) → 5 minutos → 1 hora → 1 dia
+
+Cada rollup guarda contagem de checks, checks online, latência
+min/média/p95/max, histograma de latência e histograma de status HTTP.
+
+A compactação (compact_all) roda periodicamente via Celery Beat e é
+idempotente: o último intervalo de cada resolução é sempre recalculado
+(pode ter sido gravado parcialmente na execução anterior), junto com os
+intervalos dos últimos ROLLUP_LOOKBACK_MINUTES: o checked_at do log é o
+início da transação, e o scan_site / scan_site_batch só fazem commit no
+fim, então logs aparecem com horário dentro de intervalos já compactados.
+
+Cada resolução tem sua retenção (ROLLUP_RETENTION): 5m por poucos dias,
+1h por ~90 dias e 1d pela retenção máxima dos planos. prune_rollups roda
+no fim do compact_all.
+
+Os gráficos e estatísticas de uptime leem daqui (get_site_buckets),
+completando o trecho ainda não compactado com os logs brutos, agregados
+no próprio banco (GROUP BY por intervalo, sem carregar linhas no Python).
+"""
+
+import json
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, and_, case, cast, func, literal_column
+from sqlalchemy.orm import Session
+
+from models import MonitorLog, MonitorRollup
+from plan_limits import MAX_LOG_RETENTION_DAYS
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Resoluções, em ordem (cada uma é compactada a partir da anterior)
+RESOLUTIONS = {
+    "5m": timedelta(minutes=5),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+# Fonte de cada resolução (None = logs brutos)
+ROLLUP_SOURCE = {
+    "5m": None,
+    "1h": "5m",
+    "1d": "1h",
+}
+
+# Máximo de tempo processado por execução (limita o backfill inicial)
+ROLLUP_MAX_WINDOW = {
+    "5m": timedelta(hours=int(os.getenv("ROLLUP_MAX_WINDOW_HOURS", "6"))),
+    "1h": timedelta(days=7),
+    "1d": timedelta(days=90),
+}
+
+# Quanto recalcular para trás a cada execução (logs que ficam visíveis com atraso)
+ROLLUP_LOOKBACK = timedelta(minutes=int(os.getenv("ROLLUP_LOOKBACK_MINUTES", "30")))
+
+# Retenção de cada resolução (rollups mais antigos são apagados por prune_rollups)
+ROLLUP_RETENTION = {
+    "5m": timedelta(days=int(os.getenv("ROLLUP_5M_RETENTION_DAYS", "3"))),
+    "1h": timedelta(days=int(os.getenv("ROLLUP_1H_RETENTION_DAYS", "90"))),
+    "1d": timedelta(days=MAX_LOG_RETENTION_DAYS),
+}
+
+# Limites superiores (ms) das faixas do histograma de latência; a última é "acima de"
+LATENCY_BUCKETS_MS = [50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000]
+
+
+# ============================================
+# HELPERS DE TEMPO
+# ============================================
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Normaliza datetimes (com ou sem timezone) para UTC sem tzinfo"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def floor_time(value: datetime, resolution: str) -> datetime:
+    """Arredonda para baixo até o início do intervalo da resolução"""
+    value = to_naive_utc(value)
+    step = int(RESOLUTIONS[resolution].total_seconds())
+    epoch = datetime(1970, 1, 1)
+    seconds = int((value - epoch).total_seconds())
+    return epoch + timedelta(seconds=seconds - seconds % step)
+
+
+def bucket_expression(db: Session, column, resolution: str):
+    """
+    Expressão SQL com o início do intervalo de cada linha (para GROUP BY).
+
+    PostgreSQL usa date_bin (retorna timestamptz); SQLite calcula pelos
+    segundos desde 1970 (retorna inteiro). Use bucket_from_sql para converter.
+    Os valores vão como literais para a mesma expressão poder aparecer no
+    SELECT e no GROUP BY.
+    """
+    step = int(RESOLUTIONS[resolution].total_seconds())
+
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_bin(
+            literal_column(f"interval '{step} seconds'"),
+            column,
+            literal_column("timestamptz '1970-01-01 00:00:00+00'"),
+        )
+
+    step_literal = literal_column(str(step), Integer)
+    return cast(func.strftime(literal_column("'%s'"), column), Integer) // step_literal * step_literal
+
+
+def bucket_from_sql(value) -> datetime:
+    """Converte o resultado de bucket_expression em datetime UTC sem tzinfo"""
+    if isinstance(value, datetime):
+        return to_naive_utc(value)
+    return datetime(1970, 1, 1) + timedelta(seconds=int(value))
+
+
+# ============================================
+# AGREGADOR
+# ============================================
+
+class BucketAggregate:
+    """
+    Acumula as verificações de um intervalo.
+
+    Aceita logs brutos (add_log) ou rollups de resolução menor (add_rollup).
+    O p95 é exato quando há latências brutas; caso contrário é estimado
+    pelo histograma (interpolação linear dentro da faixa).
+    """
+
+    def __init__(self, bucket_start: datetime):
+        self.bucket_start = bucket_start
+        self.check_count = 0
+        self.online_count = 0
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_min: Optional[float] = None
+        self.latency_max: Optional[float] = None
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.status_codes: Dict[str, int] = {}
+        self._raw_latencies: Optional[List[float]] = []
+
+    def _add_latency_range(self, count: int, total: float, minimum: Optional[float], maximum: Optional[float]) -> None:
+        self.latency_count += count
+        self.latency_sum += total
+        if minimum is not None:
+            self.latency_min = minimum if self.latency_min is None else min(self.latency_min, minimum)
+        if maximum is not None:
+            self.latency_max = maximum if self.latency_max is None else max(self.latency_max, maximum)
+
+    def add_log(self, status: str, latency_ms: Optional[float], http_status_code: Optional[int]) -> None:
+        """Adiciona uma verificação bruta (MonitorLog)"""
+        self.check_count += 1
+        if status == "online":
+            self.online_count += 1
+
+        if latency_ms is not None:
+            self._add_latency_range(1, latency_ms, latency_ms, latency_ms)
+            self.histogram[_histogram_index(latency_ms)] += 1
+            if self._raw_latencies is not None:
+                self._raw_latencies.append(latency_ms)
+
+        if http_status_code is not None:
+            key = str(http_status_code)
+            self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+    def add_rollup(self, rollup: MonitorRollup) -> None:
+        """Adiciona um rollup de resolução menor"""
+        self.check_count += rollup.check_count
+        self.online_count += rollup.online_count
+        self._add_latency_range(rollup.latency_count, rollup.latency_sum, rollup.latency_min, rollup.latency_max)
+
+        if rollup.latency_histogram:
+            for index, count in enumerate(json.loads(rollup.latency_histogram)):
+                if index < len(self.histogram):
+                    self.histogram[index] += count
+
+        if rollup.status_codes:
+            for code, count in json.loads(rollup.status_codes).items():
+                self.status_codes[code] = self.status_codes.get(code, 0) + count
+
+        # A partir daqui o p95 passa a ser estimado pelo histograma
+        self._raw_latencies = None
+
+    def add_totals(self, check_count: int, online_count: int, latency_count: int, latency_sum: float,
+                   latency_min: Optional[float], latency_max: Optional[float], histogram: List[int]) -> None:
+        """Adiciona totais já agregados pelo banco (ver aggregate_logs)"""
+        self.check_count += check_count
+        self.online_count += online_count
+        self._add_latency_range(latency_count, latency_sum, latency_min, latency_max)
+        self.histogram = [a + (b or 0) for a, b in zip(self.histogram, histogram)]
+
+        # Sem as latências brutas, o p95 é estimado pelo histograma
+        self._raw_latencies = None
+
+    def add_bucket(self, other: "BucketAggregate") -> None:
+        """Junta outro agregado (usado para reagrupar intervalos na exibição)"""
+        self.check_count += other.check_count
+        self.online_count += other.online_count
+        self._add_latency_range(other.latency_count, other.latency_sum, other.latency_min, other.latency_max)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        for code, count in other.status_codes.items():
+            self.status_codes[code] = self.status_codes.get(code, 0) + count
+
+        if self._raw_latencies is not None and other._raw_latencies is not None:
+            self._raw_latencies.extend(other._raw_latencies)
+        else:
+            self._raw_latencies = None
+
+    @property
+    def latency_avg(self) -> Optional[float]:
+        return self.latency_sum / self.latency_count if self.latency_count else None
+
+    @property
+    def latency_p95(self) -> Optional[float]:
+        if not self.latency_count:
+            return None
+
+        if self._raw_latencies:
+            ordered = sorted(self._raw_latencies)
+            return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+        return _histogram_percentile(self.histogram, 0.95, self.latency_min, self.latency_max)
+
+    def to_rollup(self, site_id: int, resolution: str) -> MonitorRollup:
+        return MonitorRollup(
+            site_id=site_id,
+            resolution=resolution,
+            bucket_start=self.bucket_start,
+            check_count=self.check_count,
+            online_count=self.online_count,
+            latency_count=self.latency_count,
+            latency_sum=self.latency_sum,
+            latency_min=self.latency_min,
+            latency_max=self.latency_max,
+            latency_p95=self.latency_p95,
+            latency_histogram=json.dumps(self.histogram),
+            status_codes=json.dumps(self.status_codes) if self.status_codes else None,
+        )
+
+
+def _histogram_index(latency_ms: float) -> int:
+    for index, upper in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= upper:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _histogram_percentile(histogram: List[int], percentile: float, minimum: Optional[float], maximum: Optional[float]) -> Optional[float]:
+    """Estima um percentil a partir do histograma de latência"""
+    total = sum(histogram)
+    if not total:
+        return None
+
+    target = percentile * total
+    seen = 0
+
+    for index, count in enumerate(histogram):
+        if not count:
+            continue
+
+        if seen + count >= target:
+            lower = LATENCY_BUCKETS_MS[index - 1] if index > 0 else 0.0
+            upper = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else (maximum or lower)
+
+            # Restringe a faixa ao min/max observados
+            if minimum is not None:
+                lower = max(lower, minimum)
+            if maximum is not None:
+                upper = min(upper, maximum)
+
+            fraction = (target - seen) / count
+            return round(lower + (upper - lower) * fraction, 2)
+
+        seen += count
+
+    return maximum
+
+
+def _aggregate_rollup(rollup: MonitorRollup) -> BucketAggregate:
+    """Converte uma linha de MonitorRollup em agregado"""
+    aggregate = BucketAggregate(to_naive_utc(rollup.bucket_start))
+    aggregate.add_rollup(rollup)
+    return aggregate
+
+
+def aggregate_logs(db: Session, site_id: int, start: datetime, end: datetime, resolution: str) -> List[BucketAggregate]:
+    """
+    Agrega os logs brutos de um site no intervalo [start, end) direto no banco.
+
+    Duas consultas GROUP BY (totais + histograma por intervalo, e contagem
+    por status HTTP); nenhuma linha de MonitorLog é carregada no Python.
+
+    Returns:
+        Lista de BucketAggregate em ordem cronológica
+    """
+    bucket = bucket_expression(db, MonitorLog.checked_at, resolution).label("bucket")
+    latency = MonitorLog.latency_ms
+    window = and_(
+        MonitorLog.site_id == site_id,
+        MonitorLog.checked_at >= start,
+        MonitorLog.checked_at < end,
+    )
+
+    # Faixas do histograma: (limite anterior, limite] — a última é "acima de"
+    ranges = []
+    lower = None
+    for upper in LATENCY_BUCKETS_MS + [None]:
+        conditions = [latency.isnot(None)]
+        if lower is not None:
+            conditions.append(latency > lower)
+        if upper is not None:
+            conditions.append(latency <= upper)
+        ranges.append(func.sum(case((and_(*conditions), 1), else_=0)))
+        lower = upper
+
+    rows = db.query(
+        bucket,
+        func.count(),
+        func.sum(case((MonitorLog.status == "online", 1), else_=0)),
+        func.count(latency),
+        func.sum(latency),
+        func.min(latency),
+        func.max(latency),
+        *ranges,
+    ).filter(window).group_by(bucket).all()
+
+    buckets: Dict[datetime, BucketAggregate] = {}
+    for row in rows:
+        bucket_start = bucket_from_sql(row[0])
+        aggregate = buckets.setdefault(bucket_start, BucketAggregate(bucket_start))
+        aggregate.add_totals(
+            check_count=row[1],
+            online_count=row[2] or 0,
+            latency_count=row[3] or 0,
+            latency_sum=float(row[4] or 0.0),
+            latency_min=row[5],
+            latency_max=row[6],
+            histogram=list(row[7:]),
+        )
+
+    status_rows = db.query(
+        bucket,
+        MonitorLog.http_status_code,
+        func.count(),
+    ).filter(
+        window,
+        MonitorLog.http_status_code.isnot(None),
+    ).group_by(bucket, MonitorLog.http_status_code).all()
+
+    for value, code, count in status_rows:
+        aggregate = buckets.get(bucket_from_sql(value))
+        if aggregate is not None:
+            key = str(code)
+            aggregate.status_codes[key] = aggregate.status_codes.get(key, 0) + count
+
+    return [buckets[key] for key in sorted(buckets)]
+
+
+# ============================================
+# COMPACTAÇÃO
+# ============================================
+
+def _source_min_time(db: Session, resolution: str, after: Optional[datetime] = None) -> Optional[datetime]:
+    """Primeiro timestamp da fonte de uma resolução (opcionalmente a partir de `after`)"""
+    source = ROLLUP_SOURCE[resolution]
+
+    if source is None:
+        query = db.query(func.min(MonitorLog.checked_at))
+        if after is not None:
+            query = query.filter(MonitorLog.checked_at >= after)
+    else:
+        query = db.query(func.min(MonitorRollup.bucket_start)).filter(MonitorRollup.resolution == source)
+        if after is not None:
+            query = query.filter(MonitorRollup.bucket_start >= after)
+
+    value = query.scalar()
+    return to_naive_utc(value) if value is not None else None
+
+
+def _aggregate_source(db: Session, resolution: str, start: datetime, end: datetime, site_id: Optional[int] = None) -> Dict[tuple, BucketAggregate]:
+    """Agrega a fonte de uma resolução no intervalo [start, end) por (site_id, bucket)"""
+    source = ROLLUP_SOURCE[resolution]
+    buckets: Dict[tuple, BucketAggregate] = {}
+
+    if source is None:
+        query = db.query(
+            MonitorLog.site_id,
+            MonitorLog.checked_at,
+            MonitorLog.status,
+            MonitorLog.latency_ms,
+            MonitorLog.http_status_code,
+        ).filter(
+            MonitorLog.checked_at >= start,
+            MonitorLog.checked_at < end,
+        )
+        if site_id is not None:
+            query = query.filter(MonitorLog.site_id == site_id)
+
+        for row in query.yield_per(5000):
+            bucket_start = floor_time(row.checked_at, resolution)
+            key = (row.site_id, bucket_start)
+            if key not in buckets:
+                buckets[key] = BucketAggregate(bucket_start)
+            buckets[key].add_log(row.status, row.latency_ms, row.http_status_code)
+    else:
+        query = db.query(MonitorRollup).filter(
+            MonitorRollup.resolution == source,
+            MonitorRollup.bucket_start >= start,
+            MonitorRollup.bucket_start < end,
+        )
+        if site_id is not None:
+            query = query.filter(MonitorRollup.site_id == site_id)
+
+        for rollup in query.yield_per(5000):
+            bucket_start = floor_time(rollup.bucket_start, resolution)
+            key = (rollup.site_id, bucket_start)
+            if key not in buckets:
+                buckets[key] = BucketAggregate(bucket_start)
+            buckets[key].add_rollup(rollup)
+
+    return buckets
+
+
+def _recompute_start(last: datetime, resolution: str) -> datetime:
+    """
+    Primeiro intervalo recalculado pela próxima compactação da resolução:
+    o último gravado menos ROLLUP_LOOKBACK (no mínimo um intervalo inteiro,
+    para 1h / 1d pegarem as correções da fonte no intervalo anterior).
+    """
+    last = floor_time(last, resolution)
+    return floor_time(last - max(ROLLUP_LOOKBACK, RESOLUTIONS[resolution]), resolution)
+
+
+def compact_resolution(db: Session, resolution: str, now: Optional[datetime] = None) -> int:
+    """
+    Recalcula os rollups de uma resolução desde o último intervalo gravado
+    (menos o lookback, ver _recompute_start).
+
+    O intervalo [start, end) é apagado e regravado (idempotente). Não faz
+    commit; quem chama controla a transação.
+
+    Args:
+        db: Sessão do banco
+        resolution: '5m', '1h' ou '1d'
+        now: Horário de referência (UTC, padrão: agora)
+
+    Returns:
+        Quantidade de rollups gravados
+    """
+    now = to_naive_utc(now or datetime.utcnow())
+    width = RESOLUTIONS[resolution]
+
+    last = db.query(func.max(MonitorRollup.bucket_start)).filter(
+        MonitorRollup.resolution == resolution
+    ).scalar()
+
+    if last is None:
+        first = _source_min_time(db, resolution)
+        if first is None:
+            return 0
+        start = floor_time(first, resolution)
+        window_from = start
+    else:
+        # Recalcula o último intervalo (pode estar parcial) mais o lookback
+        # (logs atrasados) e pula buracos sem dados
+        last_bucket = floor_time(last, resolution)
+        start = _recompute_start(last, resolution)
+        pending = _source_min_time(db, resolution, after=last_bucket + width)
+        window_from = floor_time(pending, resolution) if pending else last_bucket
+
+    end = min(now, window_from + ROLLUP_MAX_WINDOW[resolution])
+    if end <= start:
+        return 0
+
+    buckets = _aggregate_source(db, resolution, start, end)
+
+    db.query(MonitorRollup).filter(
+        MonitorRollup.resolution == resolution,
+        MonitorRollup.bucket_start >= start,
+        MonitorRollup.bucket_start < end,
+    ).delete(synchronize_session=False)
+
+    db.add_all([
+        aggregate.to_rollup(site_id, resolution)
+        for (site_id, _), aggregate in buckets.items()
+    ])
+    db.flush()
+
+    return len(buckets)
+
+
+def prune_rollups(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Apaga os rollups além da retenção de cada resolução (ROLLUP_RETENTION).
+
+    Uma resolução que é fonte de outra (5m → 1h, 1h → 1d) só é apagada até
+    o ponto que a consumidora já compactou, para o backfill e o recálculo
+    da consumidora nunca lerem uma fonte já apagada. Não faz commit.
+
+    Returns:
+        Dict com quantidade de rollups apagados por resolução
+    """
+    now = to_naive_utc(now or datetime.utcnow())
+    deleted = {}
+
+    for resolution, retention in ROLLUP_RETENTION.items():
+        horizon = floor_time(now - retention, resolution)
+
+        consumer = next((r for r, source in ROLLUP_SOURCE.items() if source == resolution), None)
+        if consumer is not None:
+            consumer_last = db.query(func.max(MonitorRollup.bucket_start)).filter(
+                MonitorRollup.resolution == consumer
+            ).scalar()
+            if consumer_last is None:
+                deleted[resolution] = 0
+                continue
+            horizon = min(horizon, _recompute_start(consumer_last, consumer))
+
+        deleted[resolution] = db.query(MonitorRollup).filter(
+            MonitorRollup.resolution == resolution,
+            MonitorRollup.bucket_start < horizon,
+        ).delete(synchronize_session=False)
+
+    return deleted
+
+
+def compact_all(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Compacta todas as resoluções em ordem (5m → 1h → 1d), aplica a
+    retenção dos rollups e faz commit.
+
+    Returns:
+        Dict com quantidade de rollups gravados por resolução
+    """
+    written = {}
+    for resolution in RESOLUTIONS:
+        written[resolution] = compact_resolution(db, resolution, now=now)
+    prune_rollups(db, now=now)
+    db.commit()
+    return written
+
+
+# ============================================
+# LEITURA (gráficos e estatísticas)
+# ============================================
+
+def pick_resolution(hours: float) -> str:
+    """
+    Escolhe a resolução de leitura para uma janela de `hours` horas.
+
+    Nunca escolhe uma resolução cuja retenção seja menor que a janela
+    (passa para a próxima mais grossa).
+    """
+    if hours <= 48:
+        preferred = "5m"
+    elif hours <= 24 * 31:
+        preferred = "1h"
+    else:
+        preferred = "1d"
+
+    resolutions = list(RESOLUTIONS)
+    for resolution in resolutions[resolutions.index(preferred):]:
+        if timedelta(hours=hours) <= ROLLUP_RETENTION[resolution]:
+            return resolution
+    return resolutions[-1]
+
+
+def get_site_buckets(db: Session, site_id: int, start: datetime, end: Optional[datetime] = None, resolution: str = "5m") -> List[BucketAggregate]:
+    """
+    Retorna os intervalos de um site entre start e end, em ordem cronológica.
+
+    Lê os rollups da resolução pedida e completa o final (último intervalo
+    compactado, possivelmente parcial, e o que ainda não foi compactado)
+    com os logs brutos agregados no banco (aggregate_logs). Sem rollups
+    (backfill ainda em andamento), a janela inteira vem de aggregate_logs.
+
+    Args:
+        db: Sessão do banco
+        site_id: ID do site
+        start: Início da janela
+        end: Fim da janela (padrão: agora)
+        resolution: '5m', '1h' ou '1d'
+
+    Returns:
+        Lista de BucketAggregate
+    """
+    start = to_naive_utc(start)
+    end = to_naive_utc(end or datetime.utcnow())
+    first_bucket = floor_time(start, resolution)
+
+    rollups = db.query(MonitorRollup).filter(
+        MonitorRollup.site_id == site_id,
+        MonitorRollup.resolution == resolution,
+        MonitorRollup.bucket_start >= first_bucket,
+        MonitorRollup.bucket_start < end,
+    ).order_by(MonitorRollup.bucket_start.asc()).all()
+
+    buckets = [_aggregate_rollup(rollup) for rollup in rollups]
+
+    # O último rollup pode estar parcial: recalcula ele e o restante pelos logs brutos
+    tail_from = buckets.pop().bucket_start if buckets else first_bucket
+    tail_from = max(tail_from, start)
+
+    buckets.extend(aggregate_logs(db, site_id, tail_from, end, resolution))
+    return buckets
+
+
+def regroup(buckets: Iterable[BucketAggregate], width: timedelta) -> List[BucketAggregate]:
+    """Reagrupa intervalos em janelas maiores (ex: 5m → 30m para o gráfico)"""
+    step = int(width.total_seconds())
+    epoch = datetime(1970, 1, 1)
+    grouped: Dict[datetime, BucketAggregate] = {}
+
+    for bucket in buckets:
+        seconds = int((bucket.bucket_start - epoch).total_seconds())
+        key = epoch + timedelta(seconds=seconds - seconds % step)
+        if key not in grouped:
+            grouped[key] = BucketAggregate(key)
+        grouped[key].add_bucket(bucket)
+
+    return [grouped[key] for key in sorted(grouped)]
+
+
+def summarize(buckets: Iterable[BucketAggregate]) -> Dict[str, Any]:
+    """Totais de uma lista de intervalos (checks, uptime % e latência média)"""
+    total_checks = 0
+    online_checks = 0
+    latency_count = 0
+    latency_sum = 0.0
+
+    for bucket in buckets:
+        total_checks += bucket.check_count
+        online_checks += bucket.online_count
+        latency_count += bucket.latency_count
+        latency_sum += bucket.latency_sum
+
+    return {
+        "total_checks": total_checks,
+        "online_checks": online_checks,
+        "uptime_percent": (online_checks / total_checks * 100) if total_checks > 0 else 0,
+        "avg_latency": (latency_sum / latency_count) if latency_count else None,
+    }
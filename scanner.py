@@ -17,18 +17,37 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
 from dataclasses import dataclass
 import httpx
-from OpenSSL import crypto
+from http_pool import get_http_client, get_async_http_client, get_async_probe_client, run_async
+from dns_cache import resolve_host
+from dnsbl import async_check_blacklist_many
+from ssl_cert import certificate_result, get_certificate_cache, peer_certificate, peer_chain
+from port_scan import get_port_scan_cache
 import asyncio
 import os
-import requests
 import whois
 import re
-import dns.resolver  # Para verificação de blacklist (RBL)
+import dns.resolver
+import dns.asyncresolver
+import dns.exception
 
 
 # Timeout padrão para todas as operações de rede (em segundos)
 DEFAULT_TIMEOUT = 5
 
+# Máximo de domínios escaneados simultaneamente pela engine assíncrona
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "200"))
+
+# Confirmação de queda: quando o uptime falha, OFFLINE_CONFIRM_PROBES sondas
+# concorrentes (escalonadas, por rotas diferentes) re-testam o site e ele só
+# é marcado offline se OFFLINE_CONFIRM_QUORUM delas também falharem.
+# Rotas: ipv4, ipv6 (resolvedor do sistema) e resolver (OFFLINE_CONFIRM_RESOLVERS)
+OFFLINE_CONFIRM_PROBES = int(os.getenv("OFFLINE_CONFIRM_PROBES", "3"))
+OFFLINE_CONFIRM_QUORUM = int(os.getenv("OFFLINE_CONFIRM_QUORUM", "2"))
+OFFLINE_CONFIRM_STAGGER_MS = float(os.getenv("OFFLINE_CONFIRM_STAGGER_MS", "200"))
+OFFLINE_CONFIRM_TIMEOUT = float(os.getenv("OFFLINE_CONFIRM_TIMEOUT", str(DEFAULT_TIMEOUT)))
+OFFLINE_CONFIRM_ROUTES = [r.strip() for r in os.getenv("OFFLINE_CONFIRM_ROUTES", "ipv4,ipv6,resolver").split(",") if r.strip()]
+OFFLINE_CONFIRM_RESOLVERS = [r.strip() for r in os.getenv("OFFLINE_CONFIRM_RESOLVERS", "1.1.1.1,8.8.8.8").split(",") if r.strip()]
+
 # Token do Bot do Telegram (configurado via variável de ambiente)
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 
@@ -42,8 +61,23 @@ CRITICAL_PORTS = {
     5432: "PostgreSQL",  # Banco de dados PostgreSQL exposto - risco crítico
     27017: "MongoDB",    # Banco de dados MongoDB exposto - risco crítico
     6379: "Redis",       # Redis exposto - risco crítico
+    # Opcionais: entram no scan conforme o plano (plan_limits) ou o site (Site.scan_ports)
+    445: "SMB",          # Compartilhamento de arquivos Windows
+    1433: "SQL Server",  # Banco de dados SQL Server exposto
+    3389: "RDP",         # Área de trabalho remota do Windows
+    9200: "Elasticsearch",  # Elasticsearch sem autenticação
+    11211: "Memcached",  # Memcached exposto (amplificação DDoS)
 }
 
+# Portas escaneadas quando o site/plano não define outras
+DEFAULT_SCAN_PORTS = [
+    int(port) for port in os.getenv("PORT_SCAN_DEFAULT_PORTS", "21,22,23,3306,5432,27017,6379").split(",")
+    if port.strip()
+]
+
+# Tempo máximo do connect de cada porta no port scan
+PORT_SCAN_TIMEOUT = float(os.getenv("PORT_SCAN_TIMEOUT", "2"))
+
 
 @dataclass
 class ScanResult:
@@ -56,18 +90,32 @@ class ScanResult:
     http_status_code: Optional[int] = None
     latency_ms: Optional[float] = None
     
+    # Resolução DNS do domínio (0 quando veio do cache do worker)
+    dns_ms: Optional[float] = None
+    
     # SSL Check
     ssl_valid: Optional[bool] = None
     ssl_days_remaining: Optional[int] = None
     ssl_issuer: Optional[str] = None
     ssl_error: Optional[str] = None
     
+    # Certificado (ver ssl_cert.py): cadeia e OCSP vêm do cache por fingerprint
+    ssl_fingerprint: Optional[str] = None
+    ssl_expires_at: Optional[datetime] = None
+    ssl_chain: Optional[List[Dict[str, Any]]] = None
+    ssl_ocsp_url: Optional[str] = None
+    ssl_ocsp_status: Optional[str] = None
+    
     # Port Scan
     open_ports: List[int] = None
     
     # Erro geral
     error_message: Optional[str] = None
     
+    # Confirmação de queda (sondas enviadas / que também falharam)
+    probes_sent: int = 0
+    probes_failed: int = 0
+    
     def __post_init__(self):
         if self.open_ports is None:
             self.open_ports = []
@@ -78,15 +126,97 @@ class ScanResult:
             "is_online": self.is_online,
             "http_status_code": self.http_status_code,
             "latency_ms": self.latency_ms,
+            "dns_ms": self.dns_ms,
             "ssl_valid": self.ssl_valid,
             "ssl_days_remaining": self.ssl_days_remaining,
             "ssl_issuer": self.ssl_issuer,
             "ssl_error": self.ssl_error,
+            "ssl_fingerprint": self.ssl_fingerprint,
+            "ssl_expires_at": self.ssl_expires_at.isoformat() if self.ssl_expires_at else None,
+            "ssl_chain": self.ssl_chain,
+            "ssl_ocsp_url": self.ssl_ocsp_url,
+            "ssl_ocsp_status": self.ssl_ocsp_status,
             "open_ports": self.open_ports,
             "error_message": self.error_message,
+            "probes_sent": self.probes_sent,
+            "probes_failed": self.probes_failed,
         }
 
 
+@dataclass
+class PageSnapshot:
+    """
+    Homepage baixada uma única vez por scan e compartilhada entre os analisadores
+    (SEO, WordPress, Security Headers e Wappalyzer).
+    """
+    base_url: str  # Protocolo + domínio que respondeu (ex: https://example.com)
+    url: str  # URL final, após redirects
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    encoding: Optional[str] = None
+    elapsed_ms: Optional[float] = None
+    
+    @property
+    def text(self) -> str:
+        """Corpo decodificado (mesma regra de fallback do httpx)"""
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+    
+    @classmethod
+    def from_response(cls, base_url: str, response: httpx.Response, elapsed_ms: Optional[float] = None) -> "PageSnapshot":
+        return cls(
+            base_url=base_url,
+            url=str(response.url),
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content=response.content,
+            encoding=response.encoding,
+            elapsed_ms=elapsed_ms,
+        )
+
+
+def fetch_page(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Optional[PageSnapshot]:
+    """
+    Baixa a homepage do domínio uma vez (HTTPS, com fallback para HTTP).
+    
+    Mesma regra de conexão do check_wordpress_health: usa o primeiro protocolo
+    que responder com status < 400. Se nenhum responder bem, devolve a resposta
+    HTTPS (com o status de erro) para os analisadores decidirem.
+    
+    Args:
+        domain: Domínio (com ou sem protocolo)
+        timeout: Timeout da requisição em segundos
+    
+    Returns:
+        PageSnapshot ou None se não foi possível conectar
+    """
+    clean_domain = re.sub(r'^https?://', '', domain).split('/')[0]
+    client = get_http_client(verify=False)
+    headers = {
+        'User-Agent': 'SentinelWeb-SecurityScanner/1.0',
+        'Accept': 'text/html,application/json,*/*',
+        'Accept-Language': 'en-US,en;q=0.9',
+    }
+    
+    fallback = None
+    for protocol in ('https', 'http'):
+        base_url = f"{protocol}://{clean_domain}"
+        try:
+            start_time = time.time()
+            response = client.get(base_url, headers=headers, timeout=timeout, follow_redirects=True)
+            elapsed_ms = round((time.time() - start_time) * 1000, 2)
+        except Exception:
+            continue
+        
+        snapshot = PageSnapshot.from_response(base_url, response, elapsed_ms)
+        if response.status_code < 400:
+            return snapshot
+        if fallback is None:
+            fallback = snapshot
+    
+    return fallback
+
+
 def send_telegram_alert(message: str, chat_id: str) -> bool:
     """
     Envia um alerta via Telegram Bot API.
@@ -120,7 +250,7 @@ def send_telegram_alert(message: str, chat_id: str) -> bool:
     }
     
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = get_http_client().post(url, json=payload, timeout=10)
         
         if response.status_code == 200:
             print(f"✅ Alerta Telegram enviado para chat_id {chat_id}")
@@ -129,7 +259,7 @@ def send_telegram_alert(message: str, chat_id: str) -> bool:
             print(f"❌ Erro ao enviar alerta Telegram: {response.status_code} - {response.text}")
             return False
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Exceção ao enviar alerta Telegram: {e}")
         return False
 
@@ -219,27 +349,27 @@ def check_domain_expiration(domain: str) -> Optional[datetime]:
         return None
 
 
-def check_blacklist(domain: str, timeout: float = 2.0) -> Tuple[bool, List[str]]:
+def check_blacklist(domain: str) -> Tuple[bool, List[str]]:
     """
     Verifica se o domínio está listado em blacklists (RBL - Real-time Blackhole List).
     
     Como funciona:
-    1. Resolve o IP do domínio
+    1. Resolve o IP do domínio (cache de DNS do worker)
     2. Inverte o IP (ex: 1.2.3.4 vira 4.3.2.1)
-    3. Consulta o IP invertido em listas RBL conhecidas
+    3. Consulta o IP invertido em todas as RBLs ao mesmo tempo (dnsbl.py)
     4. Se houver resposta DNS, o IP está listado
     
     Args:
         domain: Domínio a verificar (sem protocolo, ex: "google.com")
-        timeout: Timeout para cada consulta DNS (padrão: 2 segundos)
     
     Returns:
         Tuple[bool, List[str]]: (is_blacklisted, lista_de_blacklists_onde_foi_encontrado)
     
     Security Notes:
-        - Usa timeout curto (2s) para não travar o worker
-        - Verifica múltiplas blacklists populares
-        - Remove protocolo e paths da URL
+        - Consultas em paralelo com timeout curto (RBL_QUERY_TIMEOUT): uma RBL
+          lenta custa ~1 timeout, não a soma de todas
+        - Resultado guardado por (IP, RBL) com o TTL da resposta
+        - RBLs configuráveis por RBL_PROVIDERS
         - Retorna lista vazia se não estiver em nenhuma blacklist
     
     Example:
@@ -249,82 +379,21 @@ def check_blacklist(domain: str, timeout: float = 2.0) -> Tuple[bool, List[str]]
         >>> check_blacklist("google.com")
         (False, [])
     """
-    # Lista de RBLs populares para verificar
-    RBL_PROVIDERS = [
-        "zen.spamhaus.org",      # Spamhaus (mais popular)
-        "bl.spamcop.net",        # SpamCop
-        "b.barracudacentral.org", # Barracuda
-        "dnsbl.sorbs.net",       # SORBS
-        "cbl.abuseat.org",       # Composite Blocking List
-    ]
-    
-    # Remove protocolo e paths da URL
-    clean_domain = re.sub(r'^https?://', '', domain)
-    clean_domain = re.sub(r'^www\.', '', clean_domain)
-    clean_domain = clean_domain.split('/')[0]
-    
-    blacklisted_in = []
+    return check_blacklist_many([domain])[0]
+
+
+def check_blacklist_many(domains: List[str]) -> List[Tuple[bool, List[str]]]:
+    """
+    Verifica vários domínios de uma vez (lotes do run_slow_check_batch).
+    Domínios no mesmo IP de hospedagem são consultados uma única vez.
     
-    try:
-        # 1. Resolve o IP do domínio
-        ip_address = socket.gethostbyname(clean_domain)
-        print(f"🔍 IP resolvido para {clean_domain}: {ip_address}")
-        
-        # 2. Inverte o IP (1.2.3.4 -> 4.3.2.1)
-        octets = ip_address.split('.')
-        reversed_ip = '.'.join(reversed(octets))
-        
-        # 3. Verifica em cada RBL
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = timeout
-        resolver.lifetime = timeout
-        
-        for rbl in RBL_PROVIDERS:
-            query = f"{reversed_ip}.{rbl}"
-            
-            try:
-                # Se a consulta retornar resultado, o IP está listado
-                answers = resolver.resolve(query, 'A')
-                
-                if answers:
-                    print(f"⚠️  BLACKLIST DETECTADA: {clean_domain} ({ip_address}) listado em {rbl}")
-                    blacklisted_in.append(rbl)
-                    
-            except dns.resolver.NXDOMAIN:
-                # NXDOMAIN significa que NÃO está listado (resposta esperada)
-                pass
-            except dns.resolver.NoAnswer:
-                # Sem resposta, também significa que não está listado
-                pass
-            except dns.resolver.Timeout:
-                # Timeout na consulta, ignora este RBL
-                print(f"⏱️  Timeout ao consultar {rbl} para {clean_domain}")
-                pass
-            except Exception as e:
-                # Outros erros, ignora este RBL
-                print(f"⚠️  Erro ao consultar {rbl}: {e}")
-                pass
-        
-        # Resultado final
-        is_blacklisted = len(blacklisted_in) > 0
-        
-        if is_blacklisted:
-            print(f"🚨 ALERTA: {clean_domain} está em {len(blacklisted_in)} blacklist(s): {', '.join(blacklisted_in)}")
-        else:
-            print(f"✅ {clean_domain} não está em nenhuma blacklist verificada")
-        
-        return is_blacklisted, blacklisted_in
-        
-    except socket.gaierror:
-        # Não conseguiu resolver o domínio (pode estar offline ou inválido)
-        print(f"⚠️  Não foi possível resolver IP para {clean_domain}")
-        return False, []
-    except Exception as e:
-        print(f"❌ Erro inesperado ao verificar blacklist para {domain}: {e}")
-        return False, []
+    Returns:
+        Lista de (is_blacklisted, rbls) na mesma ordem de domains
+    """
+    return run_async(async_check_blacklist_many(domains))
 
 
-def check_seo_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, Any]:
+def check_seo_health(domain: str, timeout: int = DEFAULT_TIMEOUT, page: Optional[PageSnapshot] = None) -> Dict[str, Any]:
     """
     Verifica se o site está bloqueando motores de busca (Google/Bing).
     
@@ -336,6 +405,7 @@ def check_seo_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, A
     Args:
         domain: Domínio a verificar (sem protocolo, ex: "example.com")
         timeout: Timeout para cada requisição (padrão: 5 segundos)
+        page: Homepage já baixada (fetch_page); se omitida, é baixada aqui
     
     Returns:
         Dict com:
@@ -368,16 +438,18 @@ def check_seo_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, A
         print(f"🔍 Verificando meta tags SEO em {domain}...")
         
         try:
-            response = httpx.get(
-                url,
-                timeout=timeout,
-                follow_redirects=True,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (compatible; SentinelWeb SEO Checker/1.0)'
-                }
-            )
+            if page is None:
+                response = get_http_client().get(
+                    url,
+                    timeout=timeout,
+                    follow_redirects=True,
+                    headers={
+                        'User-Agent': 'Mozilla/5.0 (compatible; SentinelWeb SEO Checker/1.0)'
+                    }
+                )
+                page = PageSnapshot.from_response(url, response)
             
-            html_content = response.text.lower()
+            html_content = page.text.lower()
             
             # Regex para encontrar meta tags robots/googlebot com noindex
             # Exemplos que devem pegar:
@@ -400,7 +472,7 @@ def check_seo_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, A
             # ============================================
             print(f"🔍 Verificando HTTP headers...")
             
-            x_robots_tag = response.headers.get('X-Robots-Tag', '').lower()
+            x_robots_tag = httpx.Headers(page.headers).get('X-Robots-Tag', '').lower()
             
             if 'noindex' in x_robots_tag:
                 result['indexable'] = False
@@ -420,7 +492,7 @@ def check_seo_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, A
         
         try:
             robots_url = f"{url}/robots.txt"
-            robots_response = httpx.get(
+            robots_response = get_http_client().get(
                 robots_url,
                 timeout=timeout,
                 follow_redirects=False,
@@ -497,7 +569,7 @@ def check_seo_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, A
         return result
 
 
-def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, Any]:
+def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT, page: Optional[PageSnapshot] = None) -> Dict[str, Any]:
     """
     Verifica se o site é WordPress e realiza scan de segurança.
     
@@ -510,6 +582,7 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
     Args:
         domain: Domínio a verificar (sem protocolo, ex: "example.com")
         timeout: Timeout para cada requisição (padrão: 5 segundos)
+        page: Homepage já baixada (fetch_page); se omitida, é baixada aqui
     
     Returns:
         Dict com:
@@ -541,9 +614,6 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
     clean_domain = re.sub(r'^www\.', '', clean_domain)
     clean_domain = clean_domain.split('/')[0]
     
-    # Tenta HTTPS primeiro, depois HTTP
-    protocols = ['https', 'http']
-    
     result = {
         'is_wordpress': False,
         'wp_version': None,
@@ -560,22 +630,23 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
     
     base_url = None
     
-    # Tenta conectar com HTTPS, depois HTTP
-    for protocol in protocols:
-        try:
-            test_url = f"{protocol}://{clean_domain}"
-            response = requests.get(test_url, headers=headers, timeout=timeout, allow_redirects=True, verify=False)
-            
-            if response.status_code < 400:
-                base_url = test_url
-                break
-        except Exception:
-            continue
+    # Cliente compartilhado: todas as requisições abaixo vão para o mesmo host
+    # e reaproveitam a conexão (keep-alive)
+    client = get_http_client(verify=False)
+    
+    # Homepage baixada uma única vez (HTTPS, depois HTTP)
+    if page is None:
+        page = fetch_page(clean_domain, timeout=timeout)
+    
+    if page is not None and page.status_code < 400:
+        base_url = page.base_url
     
     if not base_url:
         result['error'] = "Não foi possível conectar ao site"
         return result
     
+    html_content = ""
+    
     try:
         # ========================================
         # TESTE 1: Detecção de WordPress e Versão
@@ -583,8 +654,7 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
         
         # 1.1 - Verifica meta generator no HTML principal
         try:
-            response = requests.get(base_url, headers=headers, timeout=timeout, allow_redirects=True, verify=False)
-            html_content = response.text.lower()
+            html_content = page.text.lower()
             
             # Procura por indicadores de WordPress
             wp_indicators = [
@@ -613,7 +683,7 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
         if not result['wp_version']:
             try:
                 readme_url = f"{base_url}/readme.html"
-                response = requests.get(readme_url, headers=headers, timeout=timeout, verify=False)
+                response = client.get(readme_url, headers=headers, timeout=timeout, follow_redirects=True)
                 
                 if response.status_code == 200:
                     result['is_wordpress'] = True
@@ -677,11 +747,11 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
         for file_info in sensitive_files:
             try:
                 file_url = f"{base_url}{file_info['path']}"
-                response = requests.head(file_url, headers=headers, timeout=timeout, allow_redirects=False, verify=False)
+                response = client.head(file_url, headers=headers, timeout=timeout, follow_redirects=False)
                 
                 # Se não tem HEAD, tenta GET
                 if response.status_code == 405 or response.status_code == 404:
-                    response = requests.get(file_url, headers=headers, timeout=timeout, allow_redirects=False, verify=False)
+                    response = client.get(file_url, headers=headers, timeout=timeout, follow_redirects=False)
                 
                 if response.status_code == 200:
                     vulnerability = {
@@ -705,7 +775,7 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
         
         try:
             users_api_url = f"{base_url}/wp-json/wp/v2/users"
-            response = requests.get(users_api_url, headers=headers, timeout=timeout, verify=False)
+            response = client.get(users_api_url, headers=headers, timeout=timeout, follow_redirects=True)
             
             if response.status_code == 200:
                 try:
@@ -744,7 +814,7 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
         
         try:
             uploads_url = f"{base_url}/wp-content/uploads/"
-            response = requests.get(uploads_url, headers=headers, timeout=timeout, verify=False)
+            response = client.get(uploads_url, headers=headers, timeout=timeout, follow_redirects=True)
             
             if response.status_code == 200 and 'index of' in response.text.lower():
                 vulnerability = {
@@ -772,9 +842,8 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
             plugins = extract_plugins_from_html(html_content)
             
             if plugins:
-                # Verifica CVEs em paralelo usando asyncio
-                import asyncio
-                plugins_with_cves = asyncio.run(scan_plugins_vulnerabilities(plugins))
+                # Verifica CVEs em paralelo no event loop do pool HTTP
+                plugins_with_cves = run_async(scan_plugins_vulnerabilities(plugins))
                 
                 # Adiciona vulnerabilidades de plugins ao resultado
                 for plugin in plugins_with_cves:
@@ -818,6 +887,25 @@ def check_wordpress_health(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[
         return result
 
 
+def _uptime_from_response(domain: str, response: httpx.Response, latency_ms: float, must_contain_keyword: Optional[str]) -> Tuple[bool, Optional[int], Optional[float], Optional[str]]:
+    """Interpreta a resposta HTTP do uptime check (status + anti-defacement)"""
+    error_message = None
+    
+    # Considera online se status for 2xx ou 3xx
+    is_online = 200 <= response.status_code < 400
+    
+    # 🔍 VERIFICAÇÃO ANTI-DEFACEMENT
+    if is_online and must_contain_keyword:
+        keyword_found = must_contain_keyword.lower() in response.text.lower()
+        
+        if not keyword_found:
+            is_online = False
+            error_message = f"⚠️ POSSÍVEL INVASÃO/DEFACEMENT: Palavra-chave '{must_contain_keyword}' não encontrada no HTML"
+            print(f"🚨 ALERTA DE DEFACEMENT: {domain} - Keyword '{must_contain_keyword}' ausente!")
+    
+    return is_online, response.status_code, latency_ms, error_message
+
+
 def check_uptime(domain: str, timeout: int = DEFAULT_TIMEOUT, must_contain_keyword: Optional[str] = None) -> Tuple[bool, Optional[int], Optional[float], Optional[str]]:
     """
     Verifica se o site está online (HTTP 200) e opcionalmente se contém uma palavra-chave.
@@ -842,59 +930,27 @@ def check_uptime(domain: str, timeout: int = DEFAULT_TIMEOUT, must_contain_keywo
         - Verifica SSL por padrão (verify=True)
         - Verificação de keyword detecta possíveis invasões/defacement
     """
-    url = f"https://{domain}"
-    error_message = None
-    
     try:
         start_time = time.time()
         
-        # Usa httpx para requisições HTTP modernas
+        # Usa o cliente httpx compartilhado (keep-alive)
         # verify=False temporariamente para sites com SSL inválido não falharem no uptime check
-        with httpx.Client(timeout=timeout, follow_redirects=True, verify=False) as client:
-            response = client.get(url)
-        
-        end_time = time.time()
-        latency_ms = round((end_time - start_time) * 1000, 2)
-        
-        # Considera online se status for 2xx ou 3xx
-        is_online = 200 <= response.status_code < 400
-        
-        # 🔍 VERIFICAÇÃO ANTI-DEFACEMENT
-        if is_online and must_contain_keyword:
-            keyword_found = must_contain_keyword.lower() in response.text.lower()
-            
-            if not keyword_found:
-                # Site retornou 200, mas sem a palavra-chave esperada
-                # Possível invasão/defacement!
-                is_online = False
-                error_message = f"⚠️ POSSÍVEL INVASÃO/DEFACEMENT: Palavra-chave '{must_contain_keyword}' não encontrada no HTML"
-                print(f"🚨 ALERTA DE DEFACEMENT: {domain} - Keyword '{must_contain_keyword}' ausente!")
+        response = get_http_client(verify=False).get(f"https://{domain}", timeout=timeout)
         
-        return is_online, response.status_code, latency_ms, error_message
+        latency_ms = round((time.time() - start_time) * 1000, 2)
+        return _uptime_from_response(domain, response, latency_ms, must_contain_keyword)
         
     except httpx.TimeoutException:
         return False, None, None, "Timeout na conexão"
     except httpx.ConnectError:
         # Tenta HTTP se HTTPS falhar
         try:
-            url = f"http://{domain}"
             start_time = time.time()
-            with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-                response = client.get(url)
-            end_time = time.time()
-            latency_ms = round((end_time - start_time) * 1000, 2)
-            is_online = 200 <= response.status_code < 400
+            response = get_http_client().get(f"http://{domain}", timeout=timeout)
+            latency_ms = round((time.time() - start_time) * 1000, 2)
             
             # 🔍 VERIFICAÇÃO ANTI-DEFACEMENT (também no HTTP)
-            if is_online and must_contain_keyword:
-                keyword_found = must_contain_keyword.lower() in response.text.lower()
-                
-                if not keyword_found:
-                    is_online = False
-                    error_message = f"⚠️ POSSÍVEL INVASÃO/DEFACEMENT: Palavra-chave '{must_contain_keyword}' não encontrada no HTML"
-                    print(f"🚨 ALERTA DE DEFACEMENT: {domain} - Keyword '{must_contain_keyword}' ausente!")
-            
-            return is_online, response.status_code, latency_ms, error_message
+            return _uptime_from_response(domain, response, latency_ms, must_contain_keyword)
         except:
             return False, None, None, "Erro na conexão HTTP"
     except Exception as e:
@@ -908,7 +964,8 @@ def check_ssl_certificate(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[s
     Como funciona:
     1. Estabelece conexão SSL com o servidor
     2. Obtém o certificado
-    3. Verifica data de expiração
+    3. Verifica data de expiração, cadeia completa, domínio e OCSP
+       (análise em cache por fingerprint, ver ssl_cert.py)
     4. Extrai informações do emissor (CA)
     
     Args:
@@ -916,62 +973,19 @@ def check_ssl_certificate(domain: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[s
         timeout: Tempo máximo de espera
     
     Returns:
-        Dict com: valid, days_remaining, issuer, error
+        Dict com: valid, days_remaining, issuer, error, fingerprint,
+        expires_at, chain, ocsp_url, ocsp_status
     
     Security Notes:
         - Certificados expirados ou inválidos são riscos de segurança
         - Alerta se faltar menos de 30 dias para expirar
-        - Verifica apenas o certificado, não a cadeia completa (MVP)
-    """
-    result = {
-        "valid": None,
-        "days_remaining": None,
-        "issuer": None,
-        "error": None
-    }
+        - Certificado revogado (OCSP) conta como inválido
     
-    try:
-        # Cria contexto SSL que aceita qualquer certificado (para inspeção)
-        context = ssl.create_default_context()
-        
-        # Conecta ao servidor na porta 443 (HTTPS)
-        with socket.create_connection((domain, 443), timeout=timeout) as sock:
-            with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                # Obtém o certificado em formato binário (DER)
-                cert_der = ssock.getpeercert(binary_form=True)
-                
-                # Converte para objeto X509 para análise
-                cert = crypto.load_certificate(crypto.FILETYPE_ASN1, cert_der)
-                
-                # Data de expiração
-                not_after = cert.get_notAfter().decode('utf-8')
-                # Formato: YYYYMMDDhhmmssZ
-                expiry_date = datetime.strptime(not_after, '%Y%m%d%H%M%SZ')
-                
-                # Calcula dias restantes
-                days_remaining = (expiry_date - datetime.utcnow()).days
-                
-                # Extrai informações do emissor (CA)
-                issuer = cert.get_issuer()
-                issuer_str = issuer.CN if issuer.CN else str(issuer)
-                
-                result["valid"] = days_remaining > 0
-                result["days_remaining"] = days_remaining
-                result["issuer"] = issuer_str
-                
-    except ssl.SSLCertVerificationError as e:
-        result["valid"] = False
-        result["error"] = f"Certificado inválido: {str(e)}"
-    except socket.timeout:
-        result["error"] = "Timeout ao verificar SSL"
-    except socket.gaierror:
-        result["error"] = "Não foi possível resolver o domínio"
-    except ConnectionRefusedError:
-        result["error"] = "Conexão recusada na porta 443"
-    except Exception as e:
-        result["error"] = f"Erro ao verificar SSL: {str(e)}"
-    
-    return result
+    Note:
+        Wrapper síncrono de async_check_ssl_certificate. No full_scan o
+        certificado vem da própria conexão do uptime, sem novo handshake.
+    """
+    return run_async(async_check_ssl_certificate(domain, timeout=timeout))
 
 
 def check_port(host: str, port: int, timeout: int = DEFAULT_TIMEOUT) -> bool:
@@ -1014,13 +1028,14 @@ def check_port(host: str, port: int, timeout: int = DEFAULT_TIMEOUT) -> bool:
         return False
 
 
-def scan_critical_ports(domain: str, timeout: int = 2) -> List[int]:
+def scan_critical_ports(domain: str, timeout: float = PORT_SCAN_TIMEOUT, ports: Optional[List[int]] = None) -> List[int]:
     """
     Escaneia portas críticas que podem representar riscos de segurança.
     
     Args:
         domain: O domínio a escanear
         timeout: Tempo máximo por porta (menor para não demorar)
+        ports: Portas a testar (padrão: DEFAULT_SCAN_PORTS)
     
     Returns:
         Lista de portas abertas encontradas
@@ -1030,28 +1045,16 @@ def scan_critical_ports(domain: str, timeout: int = 2) -> List[int]:
         - Portas abertas não significam necessariamente vulnerabilidade
         - Mas exposição desnecessária aumenta superfície de ataque
     """
-    open_ports = []
-    
-    # Resolve o domínio para IP primeiro
-    try:
-        ip = socket.gethostbyname(domain)
-    except socket.gaierror:
-        return open_ports  # Retorna vazio se não resolver
-    
-    # Verifica cada porta crítica
-    for port in CRITICAL_PORTS.keys():
-        if check_port(ip, port, timeout):
-            open_ports.append(port)
-    
-    return open_ports
+    # Todas as portas em paralelo, com cache por IP (ver async_scan_critical_ports)
+    return run_async(async_scan_critical_ports(domain, timeout=timeout, ports=ports))
 
 
-def full_scan(domain: str, must_contain_keyword: Optional[str] = None) -> ScanResult:
+def full_scan(domain: str, must_contain_keyword: Optional[str] = None, ports: Optional[List[int]] = None) -> ScanResult:
     """
     Executa uma verificação completa do domínio.
     
     Esta é a função principal chamada pelo Celery worker.
-    Executa todos os checks em sequência:
+    Executa todos os checks (via engine assíncrona, em paralelo):
     1. Uptime Check (HTTP) + Verificação Anti-Defacement
     2. SSL Check (Certificado)
     3. Port Scan (Portas Críticas)
@@ -1059,58 +1062,484 @@ def full_scan(domain: str, must_contain_keyword: Optional[str] = None) -> ScanRe
     Args:
         domain: O domínio a verificar
         must_contain_keyword: Palavra-chave que deve existir no HTML (anti-defacement)
+        ports: Portas do port scan (padrão: DEFAULT_SCAN_PORTS)
     
     Returns:
         ScanResult com todos os dados coletados
     
     Note:
-        Usa try/except em cada check para garantir que
-        uma falha em um não afete os outros.
+        Wrapper síncrono de async_full_scan para os workers Celery (prefork).
+        Roda no event loop persistente do http_pool, reaproveitando o AsyncClient.
     """
-    result = ScanResult()
+    return run_async(async_full_scan(domain, must_contain_keyword=must_contain_keyword, ports=ports))
+
+
+def full_scan_many(targets: List[Tuple], concurrency: int = SCAN_CONCURRENCY) -> List[ScanResult]:
+    """
+    Escaneia vários domínios de uma vez dentro de um único event loop.
+    
+    Args:
+        targets: Lista de (domain, must_contain_keyword) ou (domain, must_contain_keyword, ports)
+        concurrency: Máximo de domínios sendo escaneados simultaneamente
+    
+    Returns:
+        Lista de ScanResult na mesma ordem de targets
+    """
+    return run_async(async_full_scan_many(targets, concurrency=concurrency))
+
+
+# ============================================
+# ENGINE ASSÍNCRONA (asyncio nativo)
+# ============================================
+
+async def async_check_uptime(
+    domain: str,
+    timeout: int = DEFAULT_TIMEOUT,
+    must_contain_keyword: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> Tuple[bool, Optional[int], Optional[float], Optional[str]]:
+    """
+    Versão assíncrona do check_uptime (mesma semântica e mesmo retorno).
+    
+    Args:
+        domain: O domínio a verificar (sem protocolo)
+        timeout: Tempo máximo de espera em segundos
+        must_contain_keyword: Palavra-chave que deve existir no HTML (anti-defacement)
+        client: AsyncClient a usar (padrão: o cliente compartilhado do http_pool)
+    
+    Returns:
+        Tuple[is_online, status_code, latency_ms, error_message]
+    """
+    uptime, _, _ = await _async_uptime_with_certificate(domain, timeout, must_contain_keyword, client)
+    return uptime
+
+
+async def _async_uptime_with_certificate(
+    domain: str,
+    timeout: int = DEFAULT_TIMEOUT,
+    must_contain_keyword: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> Tuple[Tuple[bool, Optional[int], Optional[float], Optional[str]], Optional[bytes], Optional[List[bytes]]]:
+    """
+    Uptime check que também devolve o certificado (DER) e a cadeia da
+    conexão HTTPS, para o check de SSL não precisar de outro handshake.
+    
+    Returns:
+        (resultado do async_check_uptime, certificado ou None, cadeia ou None)
+    """
+    if client is None:
+        client = get_async_http_client(verify=False)
     
-    # 1. Verifica Uptime + Anti-Defacement
     try:
-        is_online, status_code, latency, error_msg = check_uptime(domain, must_contain_keyword=must_contain_keyword)
+        start_time = time.time()
+        response = await client.get(f"https://{domain}", timeout=timeout)
+        latency_ms = round((time.time() - start_time) * 1000, 2)
+        return (
+            _uptime_from_response(domain, response, latency_ms, must_contain_keyword),
+            peer_certificate(response),
+            peer_chain(response)
+        )
+        
+    except httpx.TimeoutException:
+        return (False, None, None, "Timeout na conexão"), None, None
+    except httpx.ConnectError:
+        # Tenta HTTP se HTTPS falhar
+        try:
+            start_time = time.time()
+            response = await client.get(f"http://{domain}", timeout=timeout)
+            latency_ms = round((time.time() - start_time) * 1000, 2)
+            return _uptime_from_response(domain, response, latency_ms, must_contain_keyword), None, None
+        except Exception:
+            return (False, None, None, "Erro na conexão HTTP"), None, None
+    except Exception as e:
+        return (False, None, None, f"Erro inesperado: {str(e)}"), None, None
+
+
+async def async_check_ssl_certificate(
+    domain: str,
+    timeout: int = DEFAULT_TIMEOUT,
+    ip: Optional[str] = None,
+    cert_der: Optional[bytes] = None,
+    chain_der: Optional[List[bytes]] = None
+) -> Dict[str, Any]:
+    """
+    Versão assíncrona do check_ssl_certificate.
+    
+    Usa o certificado já obtido pelo uptime (cert_der) quando houver; senão
+    faz o handshake TLS com asyncio.open_connection (sem bloquear o loop).
+    A validação (cadeia, OCSP) não depende do handshake: vem do cache por
+    fingerprint do ssl_cert.py.
+    
+    Args:
+        domain: O domínio a verificar (SNI e validação do certificado)
+        timeout: Tempo máximo de espera
+        ip: Endereço já resolvido (padrão: resolve pelo cache de DNS)
+        cert_der: Certificado da conexão do uptime (ssl_cert.peer_certificate)
+        chain_der: Cadeia da conexão do uptime (ssl_cert.peer_chain, Python 3.13+)
+    
+    Returns:
+        Dict com: valid, days_remaining, issuer, error, fingerprint,
+        expires_at, chain, ocsp_url, ocsp_status
+    """
+    result = {
+        "valid": None,
+        "days_remaining": None,
+        "issuer": None,
+        "error": None
+    }
+    
+    writer = None
+    try:
+        if ip is None:
+            ip = (await resolve_host(domain)).address
+            if ip is None:
+                raise socket.gaierror("Não foi possível resolver o domínio")
+        
+        if cert_der is None:
+            # Só para ler o certificado: a validação é feita pela análise em cache
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, 443, ssl=context, server_hostname=domain),
+                timeout=timeout
+            )
+            ssl_object = writer.get_extra_info("ssl_object")
+            cert_der = ssl_object.getpeercert(binary_form=True)
+            if chain_der is None and hasattr(ssl_object, "get_unverified_chain"):
+                chain_der = list(ssl_object.get_unverified_chain()) or None
+        
+        info = await get_certificate_cache().inspect(cert_der, domain, ip, timeout, chain_der)
+        result.update(certificate_result(info, domain))
+        
+    except (asyncio.TimeoutError, socket.timeout):
+        result["error"] = "Timeout ao verificar SSL"
+    except socket.gaierror:
+        result["error"] = "Não foi possível resolver o domínio"
+    except ConnectionRefusedError:
+        result["error"] = "Conexão recusada na porta 443"
+    except Exception as e:
+        result["error"] = f"Erro ao verificar SSL: {str(e)}"
+    finally:
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+    
+    return result
+
+
+async def async_scan_critical_ports(
+    domain: str,
+    timeout: float = PORT_SCAN_TIMEOUT,
+    ip: Optional[str] = None,
+    ports: Optional[List[int]] = None
+) -> List[int]:
+    """
+    Escaneia as portas críticas em paralelo.
+    
+    O pior caso (host filtrado) passa a custar ~1 timeout
+    em vez de len(ports) × timeout. As probes passam pelo cache por
+    (IP, porta) e pelo limite global de conexões do port_scan.py, então
+    sites no mesmo servidor testam cada porta uma única vez por janela.
+    
+    Args:
+        domain: O domínio a escanear
+        timeout: Tempo máximo por porta
+        ip: Endereço já resolvido (padrão: resolve pelo cache de DNS)
+        ports: Portas a testar (padrão: DEFAULT_SCAN_PORTS)
+    
+    Returns:
+        Lista de portas abertas encontradas
+    """
+    # Resolve o domínio para IP primeiro
+    if ip is None:
+        ip = (await resolve_host(domain)).address
+        if ip is None:
+            return []  # Retorna vazio se não resolver
+    
+    return await get_port_scan_cache().scan(ip, list(ports or DEFAULT_SCAN_PORTS), timeout)
+
+
+async def _resolve_probe_address(domain: str, route: str, timeout: float) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Resolve o IP usado por uma sonda de confirmação.
+    
+    Returns:
+        (ip, None) para sondar; (None, erro) se o domínio não resolve por
+        essa rota (voto de queda); (None, None) se a rota não se aplica ao
+        site, ex: sem AAAA ou resolvedor alternativo inacessível (abstenção)
+    """
+    if route in ("ipv4", "ipv6"):
+        family = socket.AF_INET if route == "ipv4" else socket.AF_INET6
+        # AI_ADDRCONFIG: worker sem IPv6 (padrão nas redes do Docker) não recebe AAAA
+        flags = socket.AI_ADDRCONFIG if route == "ipv6" else 0
+        try:
+            loop = asyncio.get_running_loop()
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(domain, 443, family=family, type=socket.SOCK_STREAM, flags=flags),
+                timeout=timeout
+            )
+            return infos[0][4][0], None
+        except (socket.gaierror, IndexError, asyncio.TimeoutError):
+            if route == "ipv6":
+                return None, None
+            return None, "Não foi possível resolver o domínio"
+    
+    if route == "resolver":
+        resolver = dns.asyncresolver.Resolver(configure=False)
+        resolver.nameservers = OFFLINE_CONFIRM_RESOLVERS
+        resolver.lifetime = timeout
+        try:
+            answer = await resolver.resolve(domain, "A")
+            return answer[0].to_text(), None
+        except dns.resolver.NXDOMAIN:
+            return None, "Domínio inexistente (NXDOMAIN)"
+        except dns.exception.DNSException:
+            return None, None
+    
+    return None, None
+
+
+async def _probe_uptime(domain: str, route: str, delay: float, timeout: float) -> Optional[Tuple[bool, Optional[int], Optional[float], Optional[str]]]:
+    """
+    Uma sonda de confirmação: conecta direto no IP da rota (conexão nova,
+    Host e SNI do domínio) e testa se o site responde.
+    
+    Returns:
+        Mesma tupla do async_check_uptime, ou None se a sonda se absteve
+        (inclui falha de conexão na rota ipv6: sem conectividade IPv6 no
+        worker, ENETUNREACH não diz nada sobre o site)
+    """
+    if delay:
+        await asyncio.sleep(delay)
+    
+    ip, error = await _resolve_probe_address(domain, route, timeout)
+    if ip is None:
+        return (False, None, None, error) if error else None
+    
+    host = f"[{ip}]" if ":" in ip else ip
+    client = get_async_probe_client()
+    
+    try:
+        start_time = time.time()
+        response = await client.get(
+            f"https://{host}/", headers={"Host": domain},
+            extensions={"sni_hostname": domain}, timeout=timeout
+        )
+    except httpx.TimeoutException:
+        return False, None, None, "Timeout na conexão"
+    except httpx.ConnectError:
+        # Tenta HTTP se HTTPS falhar
+        try:
+            start_time = time.time()
+            response = await client.get(f"http://{host}/", headers={"Host": domain}, timeout=timeout)
+        except httpx.ConnectError:
+            if route == "ipv6":
+                return None
+            return False, None, None, "Erro na conexão HTTP"
+        except Exception:
+            return False, None, None, "Erro na conexão HTTP"
+    except Exception as e:
+        return False, None, None, f"Erro inesperado: {str(e)}"
+    
+    latency_ms = round((time.time() - start_time) * 1000, 2)
+    return 200 <= response.status_code < 400, response.status_code, latency_ms, None
+
+
+async def async_confirm_offline(
+    domain: str,
+    probes: int = OFFLINE_CONFIRM_PROBES,
+    quorum: int = OFFLINE_CONFIRM_QUORUM,
+    timeout: float = OFFLINE_CONFIRM_TIMEOUT
+) -> Tuple[Optional[Tuple[bool, Optional[int], Optional[float], Optional[str]]], int, int]:
+    """
+    Confirma uma queda com várias sondas concorrentes.
+    
+    As sondas saem com OFFLINE_CONFIRM_STAGGER_MS de intervalo, alternando
+    as rotas de OFFLINE_CONFIRM_ROUTES, e rodam em paralelo: a confirmação
+    custa ~1 timeout. Para assim que o resultado está decidido.
+    
+    O site só volta a ser considerado online se ao menos uma sonda teve
+    sucesso e as falhas não atingiram o quorum; sem nenhuma resposta
+    (todas falharam ou se abstiveram) a queda é mantida.
+    
+    Returns:
+        (resposta da primeira sonda com sucesso ou None se a queda foi
+        confirmada, sondas enviadas, sondas que falharam)
+    """
+    routes = OFFLINE_CONFIRM_ROUTES or ["ipv4"]
+    quorum = max(1, min(quorum, probes))
+    stagger = OFFLINE_CONFIRM_STAGGER_MS / 1000
+    
+    pending = [
+        asyncio.ensure_future(_probe_uptime(domain, routes[i % len(routes)], i * stagger, timeout))
+        for i in range(probes)
+    ]
+    
+    failed = 0
+    first_ok = None
+    done = 0
+    
+    try:
+        for next_probe in asyncio.as_completed(pending):
+            outcome = await next_probe
+            done += 1
+            
+            if outcome is not None:
+                if outcome[0]:
+                    first_ok = first_ok or outcome
+                else:
+                    failed += 1
+            
+            # Quorum de falhas atingido, ou inatingível com um sucesso em mãos
+            if failed >= quorum:
+                break
+            if first_ok and failed + (probes - done) < quorum:
+                break
+    finally:
+        for probe in pending:
+            probe.cancel()
+    
+    if failed >= quorum:
+        return None, probes, failed
+    
+    return first_ok, probes, failed
+
+
+async def async_full_scan(
+    domain: str,
+    must_contain_keyword: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    ports: Optional[List[int]] = None
+) -> ScanResult:
+    """
+    Versão assíncrona do full_scan.
+    
+    Uptime e as probes de portas rodam concorrentemente. O check de SSL
+    usa o certificado da conexão HTTPS do uptime (sem outro handshake);
+    só se o uptime não passou por TLS ele faz o próprio handshake, junto
+    com a confirmação de queda. Um site offline custa ~1 timeout mais
+    ~1 timeout da confirmação (ver async_confirm_offline).
+    
+    Args:
+        domain: O domínio a verificar
+        must_contain_keyword: Palavra-chave que deve existir no HTML (anti-defacement)
+        client: AsyncClient compartilhado (opcional)
+        ports: Portas do port scan (padrão: DEFAULT_SCAN_PORTS)
+    
+    Returns:
+        ScanResult com todos os dados coletados
+    """
+    result = ScanResult()
+    
+    # 0. DNS: uma resolução (cacheada por TTL) reaproveitada por todos os checks
+    # (um NXDOMAIN em cache faz os checks falharem sem nova consulta)
+    dns_result = await resolve_host(domain)
+    result.dns_ms = dns_result.elapsed_ms
+    
+    uptime, open_ports = await asyncio.gather(
+        _async_uptime_with_certificate(domain, must_contain_keyword=must_contain_keyword, client=client),
+        async_scan_critical_ports(domain, ip=dns_result.address, ports=ports),
+        return_exceptions=True
+    )
+    
+    cert_der = chain_der = None
+    
+    # 1. Uptime + Anti-Defacement
+    if isinstance(uptime, Exception):
+        result.is_online = False
+        result.error_message = f"Erro no check de uptime: {str(uptime)}"
+    else:
+        (is_online, status_code, latency, error_msg), cert_der, chain_der = uptime
         result.is_online = is_online
         result.http_status_code = status_code
         result.latency_ms = latency
         if error_msg:
             result.error_message = error_msg
-    except Exception as e:
-        result.is_online = False
-        result.error_message = f"Erro no check de uptime: {str(e)}"
+        if not is_online and dns_result.negative:
+            result.error_message = dns_result.error
+    
+    # 1.1 Confirmação de queda (não se aplica a defacement: o site respondeu).
+    # As sondas resolvem o nome de novo, sem o cache de DNS.
+    # O SSL roda junto (com handshake próprio se o uptime não trouxe o certificado)
+    ssl_check = async_check_ssl_certificate(domain, ip=dns_result.address, cert_der=cert_der, chain_der=chain_der)
+    needs_confirmation = result.http_status_code is None or result.http_status_code >= 400
+    if not result.is_online and needs_confirmation and OFFLINE_CONFIRM_PROBES > 0:
+        confirmation, ssl_result = await asyncio.gather(
+            async_confirm_offline(domain), ssl_check, return_exceptions=True
+        )
+        if isinstance(confirmation, Exception):
+            probe_ok = None
+            print(f"⚠️  Erro na confirmação de queda de {domain}: {confirmation}")
+        else:
+            probe_ok, result.probes_sent, result.probes_failed = confirmation
+        
+        if probe_ok:
+            print(f"✅ Queda de {domain} não confirmada ({result.probes_failed}/{result.probes_sent} sondas falharam)")
+            result.is_online = True
+            _, result.http_status_code, result.latency_ms, _ = probe_ok
+            result.error_message = None
+        elif result.probes_sent:
+            result.error_message = (
+                f"{result.error_message or 'Site fora do ar'} "
+                f"(confirmado por {result.probes_failed}/{result.probes_sent} sondas)"
+            )
+    else:
+        try:
+            ssl_result = await ssl_check
+        except Exception as e:
+            ssl_result = e
     
-    # 2. Verifica SSL
-    try:
-        ssl_result = check_ssl_certificate(domain)
+    # 2. SSL
+    if isinstance(ssl_result, Exception):
+        result.ssl_error = f"Erro no check de SSL: {str(ssl_result)}"
+    else:
         result.ssl_valid = ssl_result["valid"]
         result.ssl_days_remaining = ssl_result["days_remaining"]
         result.ssl_issuer = ssl_result["issuer"]
         result.ssl_error = ssl_result["error"]
-    except Exception as e:
-        result.ssl_error = f"Erro no check de SSL: {str(e)}"
+        result.ssl_fingerprint = ssl_result.get("fingerprint")
+        result.ssl_expires_at = ssl_result.get("expires_at")
+        result.ssl_chain = ssl_result.get("chain")
+        result.ssl_ocsp_url = ssl_result.get("ocsp_url")
+        result.ssl_ocsp_status = ssl_result.get("ocsp_status")
     
-    # 3. Scan de Portas
-    try:
-        result.open_ports = scan_critical_ports(domain)
-    except Exception as e:
-        # Não deixa falha no port scan quebrar todo o resultado
-        pass
+    # 3. Portas (falha no port scan não quebra o resultado)
+    if not isinstance(open_ports, Exception):
+        result.open_ports = open_ports
     
     return result
 
 
-# Versão assíncrona para uso futuro
-async def async_full_scan(domain: str) -> ScanResult:
+async def async_full_scan_many(
+    targets: List[Tuple],
+    concurrency: int = SCAN_CONCURRENCY
+) -> List[ScanResult]:
     """
-    Versão assíncrona do full_scan.
-    Útil para quando migrarmos para workers assíncronos.
+    Escaneia centenas de domínios concorrentemente em um único event loop.
+    
+    Args:
+        targets: Lista de (domain, must_contain_keyword) ou (domain, must_contain_keyword, ports)
+        concurrency: Máximo de domínios em voo ao mesmo tempo
+    
+    Returns:
+        Lista de ScanResult na mesma ordem de targets
     """
-    # Por enquanto, apenas wrapper síncrono
-    return await asyncio.get_event_loop().run_in_executor(
-        None, full_scan, domain
-    )
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    client = get_async_http_client(verify=False)
+    
+    async def _scan(domain: str, keyword: Optional[str], ports: Optional[List[int]] = None) -> ScanResult:
+        async with semaphore:
+            try:
+                return await async_full_scan(domain, must_contain_keyword=keyword, client=client, ports=ports)
+            except Exception as e:
+                return ScanResult(error_message=f"Erro inesperado no scan: {str(e)}")
+    
+    return await asyncio.gather(*(_scan(*target) for target in targets))
 
 
 def check_pagespeed(url: str, strategy: str = "mobile", timeout: float = 30.0) -> Dict[str, Any]:
@@ -1183,7 +1612,7 @@ def check_pagespeed(url: str, strategy: str = "mobile", timeout: float = 30.0) -
     try:
         print(f"🚀 Iniciando PageSpeed Insights para {url} ({strategy})...")
         
-        response = requests.get(
+        response = get_http_client().get(
             api_url,
             params=params,
             timeout=timeout
@@ -1254,7 +1683,7 @@ def check_pagespeed(url: str, strategy: str = "mobile", timeout: float = 30.0) -
             "error": None
         }
     
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         return {
             "success": False,
             "error": "Timeout: A API do Google demorou mais de 30 segundos para responder",
@@ -1265,7 +1694,7 @@ def check_pagespeed(url: str, strategy: str = "mobile", timeout: float = 30.0) -
             "metrics": {}
         }
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return {
             "success": False,
             "error": f"Erro na requisição: {str(e)}",
@@ -1562,41 +1991,41 @@ async def check_cves_osv_async(slug: str, version: str) -> List[Dict[str, Any]]:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload)
-            
-            if response.status_code != 200:
-                return []
-            
-            data = response.json()
-            
-            # Se não há vulnerabilidades, a resposta vem vazia
-            if "vulns" not in data or not data["vulns"]:
-                return []
-            
-            vulnerabilities = []
-            
-            for vuln in data["vulns"]:
-                # Extrai severidade (pode não estar presente)
-                severity = "UNKNOWN"
-                if "severity" in vuln:
-                    if isinstance(vuln["severity"], list) and len(vuln["severity"]) > 0:
-                        severity = vuln["severity"][0].get("type", "UNKNOWN")
-                
-                # Extrai referências (links para mais informações)
-                references = []
-                if "references" in vuln:
-                    references = [ref.get("url", "") for ref in vuln["references"] if "url" in ref]
-                
-                vulnerabilities.append({
-                    "id": vuln.get("id", "UNKNOWN"),
-                    "summary": vuln.get("summary", "No description available"),
-                    "severity": severity,
-                    "references": references[:3]  # Limita a 3 referências
-                })
+        client = get_async_http_client()
+        response = await client.post(url, json=payload, timeout=10.0)
+        
+        if response.status_code != 200:
+            return []
+        
+        data = response.json()
+        
+        # Se não há vulnerabilidades, a resposta vem vazia
+        if "vulns" not in data or not data["vulns"]:
+            return []
+        
+        vulnerabilities = []
+        
+        for vuln in data["vulns"]:
+            # Extrai severidade (pode não estar presente)
+            severity = "UNKNOWN"
+            if "severity" in vuln:
+                if isinstance(vuln["severity"], list) and len(vuln["severity"]) > 0:
+                    severity = vuln["severity"][0].get("type", "UNKNOWN")
             
-            return vulnerabilities
+            # Extrai referências (links para mais informações)
+            references = []
+            if "references" in vuln:
+                references = [ref.get("url", "") for ref in vuln["references"] if "url" in ref]
             
+            vulnerabilities.append({
+                "id": vuln.get("id", "UNKNOWN"),
+                "summary": vuln.get("summary", "No description available"),
+                "severity": severity,
+                "references": references[:3]  # Limita a 3 referências
+            })
+        
+        return vulnerabilities
+        
     except Exception as e:
         print(f"⚠️ Erro ao consultar OSV.dev para {slug}@{version}: {e}")
         return []
@@ -1718,13 +2147,14 @@ def audit_security_headers(headers: dict) -> Dict[str, Any]:
     }
 
 
-def detect_tech_stack(url: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, Any]:
+def detect_tech_stack(url: str, timeout: int = DEFAULT_TIMEOUT, page: Optional[PageSnapshot] = None) -> Dict[str, Any]:
     """
     Detecta tecnologias e VERSÕES usando Wappalyzer.
     
     Args:
         url: URL completa do site (ex: https://example.com)
         timeout: Timeout em segundos
+        page: Homepage já baixada; evita o download feito pelo Wappalyzer
     
     Returns:
         {
@@ -1739,7 +2169,12 @@ def detect_tech_stack(url: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, Any
         from Wappalyzer import Wappalyzer, WebPage
         
         wappalyzer = Wappalyzer.latest()
-        webpage = WebPage.new_from_url(url, timeout=timeout)
+        
+        if page is not None:
+            # Reaproveita a homepage já baixada (sem nova requisição)
+            webpage = WebPage(page.url, page.text, page.headers)
+        else:
+            webpage = WebPage.new_from_url(url, timeout=timeout)
         technologies = wappalyzer.analyze_with_versions(webpage)
         
         results = []
@@ -1824,7 +2259,7 @@ def query_osv_vulnerabilities(package_name: str, version: str, ecosystem: str =
     }
     
     try:
-        response = requests.post(api_url, json=payload, timeout=10)
+        response = get_http_client().post(api_url, json=payload, timeout=10)
         if response.status_code == 200:
             data = response.json()
             vulns = data.get('vulns', [])
@@ -1857,13 +2292,14 @@ def query_osv_vulnerabilities(package_name: str, version: str, ecosystem: str =
         return []
 
 
-def check_general_security(url: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, Any]:
+def check_general_security(url: str, timeout: int = DEFAULT_TIMEOUT, page: Optional[PageSnapshot] = None) -> Dict[str, Any]:
     """
     Função orquestradora: Detecta tech stack, consulta CVEs e audita headers.
     
     Args:
         url: URL completa do site
         timeout: Timeout em segundos
+        page: Homepage já baixada (fetch_page); se omitida, é baixada aqui
     
     Returns:
         {
@@ -1883,17 +2319,20 @@ def check_general_security(url: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str
     }
     
     try:
-        # 1. Faz request para pegar headers
-        print(f"🔍 Fazendo request para {url}...")
-        response = httpx.get(url, timeout=timeout, follow_redirects=True)
+        # 1. Faz request para pegar headers (uma única vez, reaproveitada pelo Wappalyzer)
+        if page is None:
+            print(f"🔍 Fazendo request para {url}...")
+            start_time = time.time()
+            response = get_http_client().get(url, timeout=timeout, follow_redirects=True)
+            page = PageSnapshot.from_response(url, response, round((time.time() - start_time) * 1000, 2))
         
         # 2. Audita headers de segurança (sempre funciona)
         print(f"🔐 Auditando headers de segurança...")
-        results['security_headers'] = audit_security_headers(dict(response.headers))
+        results['security_headers'] = audit_security_headers(page.headers)
         
         # 3. Detecta tecnologias
         print(f"🛠️  Detectando tecnologias...")
-        tech_result = detect_tech_stack(url, timeout)
+        tech_result = detect_tech_stack(url, timeout, page=page)
         results['tech_stack'] = tech_result
         
         # 4. Para cada tecnologia com versão, busca CVEs (com rate limiting)
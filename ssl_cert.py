@@ -0,0 +1,489 @@
+"""
+SentinelWeb - Inspeção de Certificados TLS
+==========================================
+O check de SSL reaproveita o handshake do uptime: o certificado é lido
+do ssl_object da conexão que o AsyncClient acabou de usar
+(response.extensions["network_stream"]), sem abrir outra conexão na 443.
+
+A análise pesada fica em cache pelo fingerprint SHA-256 do certificado
+(muitos sites dividem o mesmo certificado wildcard/SAN da hospedagem),
+no processo e no Redis (compartilhado entre os workers):
+
+- Cadeia completa enviada pelo servidor e validação contra as CAs do
+  certifi. No Python 3.13+ a cadeia vem da mesma conexão do uptime
+  (SSLObject.get_unverified_chain). Antes disso o módulo ssl não expõe os
+  intermediários: como fallback deliberado, um segundo handshake com
+  pyOpenSSL (_fetch_chain) lê a cadeia, uma vez por certificado a cada
+  refresh para todos os workers (o resultado vai para o Redis)
+- SANs, emissor, validade e URL do OCSP (Authority Information Access)
+- Status OCSP (good / revoked / unknown) consultado no responder da CA
+
+Tudo isso é refeito só a cada SSL_CERT_REFRESH_HOURS por certificado;
+entre um refresh e outro o scan só recalcula os dias restantes e confere
+se o certificado cobre o domínio. Certificado novo = fingerprint novo =
+análise imediata.
+
+Roda no event loop persistente do http_pool (run_async).
+
+Chaves no Redis:
+    ssl:cert:{fingerprint} → JSON do CertificateInfo (TTL = validade da análise)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import select
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import certifi
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.x509 import ocsp
+from cryptography.x509.oid import AuthorityInformationAccessOID, ExtensionOID, NameOID
+from OpenSSL import SSL, crypto
+
+from http_pool import get_async_http_client
+from redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Cadência da análise completa (cadeia + OCSP) de um mesmo certificado
+SSL_CERT_REFRESH_HOURS = float(os.getenv("SSL_CERT_REFRESH_HOURS", "24"))
+
+# Nova tentativa quando não foi possível obter/validar a cadeia (segundos)
+SSL_CERT_RETRY_SECONDS = float(os.getenv("SSL_CERT_RETRY_SECONDS", "600"))
+
+SSL_CERT_CACHE_MAX_ENTRIES = int(os.getenv("SSL_CERT_CACHE_MAX_ENTRIES", "10000"))
+
+# Tempo máximo da consulta ao responder OCSP
+SSL_OCSP_TIMEOUT = float(os.getenv("SSL_OCSP_TIMEOUT", "5"))
+
+CACHE_KEY = "ssl:cert:{}"
+
+
+@dataclass
+class CertificateInfo:
+    """Análise de um certificado (o que vai para o cache, por fingerprint)"""
+    fingerprint: str
+    subject: Optional[str] = None
+    issuer: Optional[str] = None
+    not_after: Optional[datetime] = None  # UTC, sem tzinfo (como o resto do banco)
+    names: List[str] = field(default_factory=list)  # SANs DNS (ou CN, se não houver SAN)
+    chain: List[Dict[str, Any]] = field(default_factory=list)
+    chain_valid: Optional[bool] = None  # None = não foi possível obter a cadeia
+    chain_error: Optional[str] = None
+    ocsp_url: Optional[str] = None
+    ocsp_status: Optional[str] = None  # good, revoked, unknown (None = sem OCSP)
+
+
+# ============================================
+# PARSE (cryptography)
+# ============================================
+
+def fingerprint(cert_der: bytes) -> str:
+    """SHA-256 do certificado em hexadecimal"""
+    return hashlib.sha256(cert_der).hexdigest()
+
+
+def _name(name: x509.Name) -> Optional[str]:
+    common_names = name.get_attributes_for_oid(NameOID.COMMON_NAME)
+    if common_names:
+        return common_names[0].value
+    return name.rfc4514_string() or None
+
+
+def _summary(cert: x509.Certificate) -> Dict[str, Any]:
+    """Resumo de um certificado da cadeia (JSON-serializável)"""
+    return {
+        "subject": _name(cert.subject),
+        "issuer": _name(cert.issuer),
+        "expires_at": cert.not_valid_after_utc.replace(tzinfo=None).isoformat(),
+    }
+
+
+def _parse(cert_der: bytes) -> Tuple[x509.Certificate, CertificateInfo]:
+    cert = x509.load_der_x509_certificate(cert_der)
+    info = CertificateInfo(
+        fingerprint=fingerprint(cert_der),
+        subject=_name(cert.subject),
+        issuer=_name(cert.issuer),
+        not_after=cert.not_valid_after_utc.replace(tzinfo=None),
+    )
+
+    try:
+        san = cert.extensions.get_extension_for_oid(ExtensionOID.SUBJECT_ALTERNATIVE_NAME)
+        info.names = [name.lower() for name in san.value.get_values_for_type(x509.DNSName)]
+    except x509.ExtensionNotFound:
+        info.names = [info.subject.lower()] if info.subject else []
+
+    try:
+        aia = cert.extensions.get_extension_for_oid(ExtensionOID.AUTHORITY_INFORMATION_ACCESS)
+        for description in aia.value:
+            if description.access_method == AuthorityInformationAccessOID.OCSP:
+                info.ocsp_url = description.access_location.value
+                break
+    except x509.ExtensionNotFound:
+        pass
+
+    return cert, info
+
+
+def hostname_matches(domain: str, names: List[str]) -> bool:
+    """O certificado cobre o domínio? (wildcard só no primeiro rótulo)"""
+    domain = domain.lower().rstrip(".")
+
+    for name in names:
+        name = name.rstrip(".")
+        if name == domain:
+            return True
+        if name.startswith("*.") and "." in domain:
+            if domain.split(".", 1)[1] == name[2:]:
+                return True
+
+    return False
+
+
+# ============================================
+# CADEIA COMPLETA (pyOpenSSL)
+# ============================================
+
+def _fetch_chain(domain: str, address: str, timeout: float) -> List[bytes]:
+    """
+    Handshake com pyOpenSSL só para ler a cadeia enviada pelo servidor.
+
+    Fallback para quando a conexão do uptime não trouxe a cadeia (módulo
+    ssl anterior ao Python 3.13, ou SSL check sem uptime).
+    Bloqueante: chamar via asyncio.to_thread.
+    """
+    context = SSL.Context(SSL.TLS_CLIENT_METHOD)
+    context.set_verify(SSL.VERIFY_NONE)
+
+    deadline = time.monotonic() + timeout
+    sock = socket.create_connection((address, 443), timeout=timeout)
+    connection = SSL.Connection(context, sock)
+
+    try:
+        connection.set_tlsext_host_name(domain.encode("idna"))
+        connection.set_connect_state()
+
+        while True:
+            try:
+                connection.do_handshake()
+                break
+            except (SSL.WantReadError, SSL.WantWriteError) as e:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("Timeout no handshake TLS")
+                if isinstance(e, SSL.WantReadError):
+                    select.select([sock], [], [], remaining)
+                else:
+                    select.select([], [sock], [], remaining)
+
+        return [
+            crypto.dump_certificate(crypto.FILETYPE_ASN1, cert)
+            for cert in (connection.get_peer_cert_chain() or [])
+        ]
+    finally:
+        try:
+            connection.shutdown()
+        except Exception:
+            pass
+        sock.close()
+
+
+def _verify_chain(leaf_der: bytes, intermediates_der: List[bytes]) -> Tuple[bool, Optional[str]]:
+    """Valida o certificado + intermediários contra as CAs do certifi"""
+    store = crypto.X509Store()
+    store.load_locations(certifi.where())
+
+    leaf = crypto.load_certificate(crypto.FILETYPE_ASN1, leaf_der)
+    chain = [crypto.load_certificate(crypto.FILETYPE_ASN1, der) for der in intermediates_der]
+
+    try:
+        crypto.X509StoreContext(store, leaf, chain=chain).verify_certificate()
+        return True, None
+    except crypto.X509StoreContextError as e:
+        return False, str(e)
+
+
+async def _ocsp_status(cert: x509.Certificate, issuer: x509.Certificate, url: str) -> Optional[str]:
+    """Consulta o responder OCSP da CA (None se não houver resposta válida)"""
+    request = ocsp.OCSPRequestBuilder().add_certificate(cert, issuer, hashes.SHA1()).build()
+
+    response = await get_async_http_client().post(
+        url,
+        content=request.public_bytes(serialization.Encoding.DER),
+        headers={"Content-Type": "application/ocsp-request"},
+        timeout=SSL_OCSP_TIMEOUT,
+    )
+    if response.status_code != 200:
+        return None
+
+    ocsp_response = ocsp.load_der_ocsp_response(response.content)
+    if ocsp_response.response_status != ocsp.OCSPResponseStatus.SUCCESSFUL:
+        return None
+
+    return ocsp_response.certificate_status.name.lower()
+
+
+async def analyze_certificate(cert_der: bytes, domain: str, address: str, timeout: float,
+                              chain_der: Optional[List[bytes]] = None) -> Tuple[CertificateInfo, float]:
+    """
+    Análise completa de um certificado (cadeia, validação e OCSP).
+
+    Args:
+        chain_der: Cadeia lida da conexão do uptime (peer_chain); None =
+                   handshake próprio com pyOpenSSL (_fetch_chain)
+
+    Returns:
+        (CertificateInfo, validade em segundos para o cache)
+    """
+    cert, info = _parse(cert_der)
+    ttl = SSL_CERT_REFRESH_HOURS * 3600
+
+    if chain_der is None:
+        try:
+            chain_der = await asyncio.to_thread(_fetch_chain, domain, address, timeout)
+        except Exception as e:
+            info.chain_error = f"Não foi possível obter a cadeia: {e}"
+            return info, min(ttl, SSL_CERT_RETRY_SECONDS)
+
+    # Outro certificado no handshake (balanceador com certificados diferentes):
+    # usa só os intermediários e mantém o certificado do uptime
+    intermediates = [der for der in chain_der if fingerprint(der) != info.fingerprint]
+    intermediate_certs = [x509.load_der_x509_certificate(der) for der in intermediates]
+    info.chain = [_summary(cert)] + [_summary(intermediate) for intermediate in intermediate_certs]
+    info.chain_valid, info.chain_error = await asyncio.to_thread(_verify_chain, cert_der, intermediates)
+
+    issuer = next((candidate for candidate in intermediate_certs if candidate.subject == cert.issuer), None)
+    if info.ocsp_url and issuer is not None:
+        try:
+            info.ocsp_status = await _ocsp_status(cert, issuer, info.ocsp_url)
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"⚠️  Falha na consulta OCSP de {domain}: {e}")
+
+    return info, ttl
+
+
+# ============================================
+# CACHE POR FINGERPRINT
+# ============================================
+
+class CertificateCache:
+    """
+    Cache LRU fingerprint → CertificateInfo com expiração.
+    Análises simultâneas do mesmo certificado compartilham uma única execução.
+    Não é thread-safe: usar sempre no mesmo event loop.
+    """
+
+    def __init__(self, max_entries: int = SSL_CERT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CertificateInfo]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, cert_fingerprint: str) -> Optional[CertificateInfo]:
+        entry = self._entries.get(cert_fingerprint)
+        if entry is None:
+            return None
+
+        expires, info = entry
+        if expires <= time.monotonic():
+            del self._entries[cert_fingerprint]
+            return None
+
+        self._entries.move_to_end(cert_fingerprint)
+        return info
+
+    def put(self, info: CertificateInfo, ttl: float) -> None:
+        self._entries[info.fingerprint] = (time.monotonic() + ttl, info)
+        self._entries.move_to_end(info.fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def _analyze_and_store(self, cert_der: bytes, domain: str, address: str, timeout: float,
+                                 chain_der: Optional[List[bytes]]) -> CertificateInfo:
+        # Outro worker já analisou este certificado: reaproveita do Redis
+        shared = await asyncio.to_thread(_load_shared, fingerprint(cert_der))
+        if shared is not None:
+            info, ttl = shared
+            self.put(info, ttl)
+            return info
+
+        info, ttl = await analyze_certificate(cert_der, domain, address, timeout, chain_der)
+        self.put(info, ttl)
+        await asyncio.to_thread(_store_shared, info, ttl)
+        return info
+
+    async def inspect(self, cert_der: bytes, domain: str, address: str, timeout: float,
+                      chain_der: Optional[List[bytes]] = None) -> CertificateInfo:
+        """CertificateInfo do certificado (cache → Redis → análise em andamento → nova análise)"""
+        cert_fingerprint = fingerprint(cert_der)
+
+        cached = self.get(cert_fingerprint)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(cert_fingerprint)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._analyze_and_store(cert_der, domain, address, timeout, chain_der))
+            self._inflight[cert_fingerprint] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(cert_fingerprint, None))
+
+        return await asyncio.shield(inflight)
+
+
+def _load_shared(cert_fingerprint: str) -> Optional[Tuple[CertificateInfo, float]]:
+    """Análise guardada no Redis e a validade restante (None se não houver)"""
+    try:
+        with get_redis().pipeline(transaction=False) as pipe:
+            pipe.get(CACHE_KEY.format(cert_fingerprint))
+            pipe.ttl(CACHE_KEY.format(cert_fingerprint))
+            raw, ttl = pipe.execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Redis indisponível para o cache de certificados: {e}")
+        return None
+
+    if not raw or ttl is None or ttl <= 0:
+        return None
+
+    data = json.loads(raw)
+    if data.get("not_after"):
+        data["not_after"] = datetime.fromisoformat(data["not_after"])
+    return CertificateInfo(**data), float(ttl)
+
+
+def _store_shared(info: CertificateInfo, ttl: float) -> None:
+    data = asdict(info)
+    if info.not_after:
+        data["not_after"] = info.not_after.isoformat()
+
+    try:
+        get_redis().set(CACHE_KEY.format(info.fingerprint), json.dumps(data), ex=max(1, int(ttl)))
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível gravar o certificado {info.fingerprint[:12]} no Redis: {e}")
+
+
+_pid: Optional[int] = None
+_cache: Optional[CertificateCache] = None
+
+
+def get_certificate_cache() -> CertificateCache:
+    """Cache do processo (recriado após fork)"""
+    global _pid, _cache
+
+    if _cache is None or _pid != os.getpid():
+        _pid = os.getpid()
+        _cache = CertificateCache()
+
+    return _cache
+
+
+# ============================================
+# CERTIFICADO DA CONEXÃO DO UPTIME
+# ============================================
+
+def _peer_ssl_object(response: httpx.Response):
+    """ssl_object da conexão HTTPS que atendeu a resposta (None se não for TLS)"""
+    # Com redirects, usa a primeira resposta (a do próprio domínio)
+    first = response.history[0] if response.history else response
+    if first.url.scheme != "https":
+        return None
+
+    stream = first.extensions.get("network_stream")
+    if stream is None:
+        return None
+
+    return stream.get_extra_info("ssl_object")
+
+
+def peer_certificate(response: httpx.Response) -> Optional[bytes]:
+    """
+    Certificado (DER) da conexão HTTPS que atendeu a resposta.
+
+    Com redirects, usa a primeira resposta (a do próprio domínio).
+    Devolve None se a resposta não veio por TLS.
+    """
+    ssl_object = _peer_ssl_object(response)
+    if ssl_object is None:
+        return None
+
+    try:
+        return ssl_object.getpeercert(binary_form=True)
+    except ValueError:
+        # Conexão já encerrada
+        return None
+
+
+def peer_chain(response: httpx.Response) -> Optional[List[bytes]]:
+    """
+    Cadeia (DER, folha primeiro) enviada pelo servidor na mesma conexão.
+
+    Só no Python 3.13+ (SSLObject.get_unverified_chain); antes disso
+    devolve None e a análise usa o handshake próprio (_fetch_chain).
+    """
+    ssl_object = _peer_ssl_object(response)
+    get_unverified_chain = getattr(ssl_object, "get_unverified_chain", None)
+    if get_unverified_chain is None:
+        return None
+
+    try:
+        return list(get_unverified_chain()) or None
+    except ValueError:
+        return None
+
+
+def certificate_result(info: CertificateInfo, domain: str) -> Dict[str, Any]:
+    """
+    Monta o resultado do check de SSL para um domínio a partir da análise
+    (barato: roda a cada scan, mesmo com o certificado em cache).
+
+    Returns:
+        Dict com: valid, days_remaining, issuer, error, fingerprint,
+        expires_at, chain, ocsp_url, ocsp_status
+    """
+    days_remaining = (info.not_after - datetime.now(timezone.utc).replace(tzinfo=None)).days if info.not_after else None
+
+    error = None
+    valid = days_remaining is not None and days_remaining > 0
+
+    if info.chain_valid is False:
+        valid = False
+        error = f"Certificado inválido: {info.chain_error}"
+    elif not hostname_matches(domain, info.names):
+        valid = False
+        error = f"Certificado inválido: não cobre {domain}"
+    elif info.ocsp_status == "revoked":
+        valid = False
+        error = "Certificado revogado (OCSP)"
+    elif info.chain_valid is None and info.chain_error:
+        error = info.chain_error
+
+    return {
+        "valid": valid,
+        "days_remaining": days_remaining,
+        "issuer": info.issuer,
+        "error": error,
+        "fingerprint": info.fingerprint,
+        "expires_at": info.not_after,
+        "chain": info.chain,
+        "ocsp_url": info.ocsp_url,
+        "ocsp_status": info.ocsp_status,
+    }
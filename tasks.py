@@ -3,6 +3,9 @@ SentinelWeb - Tarefas Celery (Workers)
 ======================================
 Define as tarefas que rodam em background:
 - Scan individual de site
+- Scan em lote (vários sites por mensagem)
+- Scheduler que despacha apenas os sites vencidos (next_check_at)
+- Checks lentos (Whois, RBL, WordPress, SEO, Tech) com cadência própria
 - Scan de todos os sites ativos
 
 IMPORTANTE: Estas tarefas NÃO devem travar a API.
@@ -12,16 +15,606 @@ Elas rodam em processos separados (workers Celery).
 from celery_app import celery_app
 from database import SessionLocal
 from models import Site, MonitorLog, User
-from scanner import full_scan, ScanResult, send_telegram_alert, check_domain_expiration, check_blacklist, check_wordpress_health, check_pagespeed, check_seo_health, check_general_security
-from datetime import datetime
+from scanner import full_scan, full_scan_many, ScanResult, check_blacklist, check_blacklist_many, check_wordpress_health, check_pagespeed, check_seo_health, check_general_security, fetch_page
+from plan_limits import get_effective_check_interval, get_scan_ports
+from rollups import compact_all
+from log_retention import apply_retention
+from heartbeat_store import flush_pings
+from admin_stats import refresh_snapshot as refresh_admin_snapshot
+from alerts import dispatch_due_alerts
+from alert_state import AlertStateStore, PROBLEM_EVENTS, fingerprint, format_alert
+from whois_cache import WHOIS_RETRY_HOURS, get_cached as get_cached_whois, lookup_expiration, refresh_interval
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, object_session
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 import logging
 import json
+import os
+import random
 
 # Configura logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Quantidade de sites processados por mensagem do Celery (scan_site_batch)
+SCAN_BATCH_SIZE = int(os.getenv("SCAN_BATCH_SIZE", "25"))
+
+# Scheduler (dispatch_due_sites): máximo de sites despachados por tick e
+# variação aplicada ao intervalo para não sincronizar os sites
+SCHEDULER_MAX_DISPATCH = int(os.getenv("SCHEDULER_MAX_DISPATCH", "5000"))
+SCHEDULER_JITTER_RATIO = float(os.getenv("SCHEDULER_JITTER_RATIO", "0.05"))
+
+# Fila dedicada do Whois (worker próprio com pouca concorrência, ver docker-compose)
+WHOIS_QUEUE = os.getenv("WHOIS_QUEUE", "whois")
+
+# Checks lentos (slow path): cada um roda em task própria, com cadência própria.
+# O resultado raramente muda entre dois scans de uptime, então não faz
+# sentido repetir Whois/RBL/WordPress/SEO/Tech a cada check_interval.
+SLOW_CHECKS = {
+    # Whois: a cadência vem da distância da expiração (whois_cache.refresh_interval),
+    # gravada em whois_next_check_at; interval_hours é só a reserva ao despachar
+    # (nova tentativa se a task se perder). Roda na fila própria, de baixa prioridade.
+    "whois": {
+        "column": "last_whois_check",
+        "due_column": "whois_next_check_at",
+        "interval_hours": WHOIS_RETRY_HOURS,
+        "queue": WHOIS_QUEUE,
+        "requires_online": False,
+        "skip_wordpress": False,
+    },
+    "blacklist": {
+        "column": "last_blacklist_check",
+        "interval_hours": float(os.getenv("BLACKLIST_CHECK_INTERVAL_HOURS", "6")),
+        "requires_online": False,
+        "skip_wordpress": False,
+    },
+    "wordpress": {
+        "column": "last_wordpress_check",
+        "interval_hours": float(os.getenv("WORDPRESS_CHECK_INTERVAL_HOURS", "12")),
+        "requires_online": True,
+        "skip_wordpress": False,
+    },
+    "seo": {
+        "column": "last_seo_check",
+        "interval_hours": float(os.getenv("SEO_CHECK_INTERVAL_HOURS", "6")),
+        "requires_online": False,
+        "skip_wordpress": False,
+    },
+    "tech": {
+        "column": "last_tech_scan",
+        "interval_hours": float(os.getenv("TECH_CHECK_INTERVAL_HOURS", "24")),
+        "requires_online": True,
+        "skip_wordpress": True,  # General Tech Scanner é só para sites NÃO-WordPress
+    },
+}
+
+# Sites por mensagem e threads usadas nas tasks de checks lentos
+SLOW_CHECK_BATCH_SIZE = int(os.getenv("SLOW_CHECK_BATCH_SIZE", "10"))
+SLOW_CHECK_WORKERS = int(os.getenv("SLOW_CHECK_WORKERS", "8"))
+SLOW_CHECK_MAX_DISPATCH = int(os.getenv("SLOW_CHECK_MAX_DISPATCH", "1000"))
+
+# Máximo de heartbeats vencidos processados por transação no check_heartbeats
+HEARTBEAT_MAX_BATCH = int(os.getenv("HEARTBEAT_MAX_BATCH", "1000"))
+
+
+def _chunks(items: list, size: int) -> list:
+    """Divide uma lista em pedaços de no máximo `size` itens"""
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _apply_scan_result(site: Site, result: ScanResult) -> MonitorLog:
+    """
+    Aplica o resultado do full_scan no site e monta o registro de log.
+    O MonitorLog retornado ainda não foi adicionado à sessão.
+    """
+    site.current_status = "online" if result.is_online else "offline"
+    site.last_check = datetime.utcnow()
+    site.last_latency = result.latency_ms
+    site.ssl_valid = result.ssl_valid
+    site.ssl_days_remaining = result.ssl_days_remaining
+    
+    # Detalhes do certificado: mantém os últimos conhecidos se o check de SSL falhou
+    if result.ssl_fingerprint:
+        site.ssl_fingerprint = result.ssl_fingerprint
+        site.ssl_expires_at = result.ssl_expires_at
+        site.ssl_chain = json.dumps(result.ssl_chain) if result.ssl_chain else None
+        site.ssl_ocsp_url = result.ssl_ocsp_url
+        site.ssl_ocsp_status = result.ssl_ocsp_status
+    
+    # Converte lista de portas para string
+    if result.open_ports:
+        site.open_ports = ",".join(map(str, result.open_ports))
+    else:
+        site.open_ports = None
+    
+    return MonitorLog(
+        site_id=site.id,
+        status="online" if result.is_online else "offline",
+        http_status_code=result.http_status_code,
+        latency_ms=result.latency_ms,
+        dns_ms=result.dns_ms,
+        ssl_valid=result.ssl_valid,
+        ssl_days_remaining=result.ssl_days_remaining,
+        ssl_issuer=result.ssl_issuer,
+        open_ports=site.open_ports,
+        error_message=result.error_message or result.ssl_error,
+        checked_at=datetime.utcnow()
+    )
+
+
+def _alert(site: Site, owner: Optional[User], alert_type: str, failing: bool,
+           message: Optional[str] = None, problem_fingerprint: Optional[str] = None,
+           resolved_message: Optional[str] = None) -> Optional[str]:
+    """
+    Passa o resultado de um check pelo AlertStateStore e agenda a mensagem
+    (enviada após o commit) quando o estado do alerta pede.
+    
+    O estado é atualizado mesmo sem Telegram configurado, para o dono não
+    receber um alerta antigo como novo quando configurar o chat.
+    
+    Returns:
+        Evento do AlertStateStore ('fire', 'resolve', ...) ou None
+    """
+    store = AlertStateStore.for_session(object_session(site))
+    event = store.evaluate(site.id, alert_type, failing, problem_fingerprint)
+    
+    if event is None or not owner or not owner.telegram_chat_id:
+        return event
+    
+    if event in PROBLEM_EVENTS and not message:
+        return event
+    
+    text = format_alert(
+        event, message, alert_type, site.name or site.domain,
+        state=store.get(site.id, alert_type), resolved_message=resolved_message
+    )
+    store.queue(text, owner.telegram_chat_id)
+    logger.info(f"📨 Alerta {alert_type} ({event}) agendado para {site.domain}")
+    
+    return event
+
+
+def _apply_whois(site: Site, domain_expiration: Optional[datetime], checked_at: Optional[datetime] = None) -> None:
+    """
+    Atualiza a data de expiração do domínio (Whois) e agenda o próximo refresh.
+    
+    checked_at é o momento da consulta (padrão: agora). Resultados vindos do
+    cache passam o checked_at original, para o refresh não ser adiado.
+    """
+    # Colunas do Site em UTC sem tzinfo (datetime.utcnow)
+    checked_at = _as_utc(checked_at).replace(tzinfo=None) if checked_at else datetime.utcnow()
+    site.last_whois_check = checked_at
+    site.whois_next_check_at = checked_at + refresh_interval(domain_expiration, checked_at)
+    
+    if domain_expiration:
+        site.domain_expiration_date = domain_expiration
+        logger.info(f"📅 Expiração do domínio {site.domain}: {domain_expiration.strftime('%Y-%m-%d')}")
+    else:
+        logger.warning(f"⚠️  Não foi possível obter data de expiração para {site.domain}")
+
+
+def _apply_blacklist(site: Site, owner: Optional[User], blacklist_result: tuple) -> None:
+    """Atualiza o status de blacklist (RBL) e alerta o dono se listado"""
+    is_blacklisted, blacklisted_in_list = blacklist_result
+    site.is_blacklisted = is_blacklisted
+    site.last_blacklist_check = datetime.utcnow()
+    
+    if blacklisted_in_list:
+        site.blacklisted_in = json.dumps(blacklisted_in_list)
+        logger.warning(f"🚨 {site.domain} está em blacklist: {', '.join(blacklisted_in_list)}")
+    else:
+        site.blacklisted_in = None
+        
+    # Alerta ao entrar em blacklist (ou em uma nova RBL), lembrete periódico e aviso ao sair
+    message = None
+    if is_blacklisted:
+        message = (
+            f"🚨 <b>ALERTA - BLACKLIST DETECTADA</b>\n\n"
+            f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+            f"🔗 <b>Domínio:</b> {site.domain}\n"
+            f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n"
+            f"⚠️ <b>Blacklists:</b> {', '.join(blacklisted_in_list)}\n\n"
+            f"Seu IP está listado em uma ou mais blacklists. "
+            f"Isso pode afetar a reputação e entrega de emails."
+        )
+    
+    _alert(
+        site, owner, "blacklist", is_blacklisted, message,
+        problem_fingerprint=fingerprint(blacklisted_in_list or [])
+    )
+
+
+def _apply_wordpress(site: Site, owner: Optional[User], wp_health: dict) -> None:
+    """Atualiza os dados do scan WordPress e alerta vulnerabilidades críticas"""
+    site.is_wordpress = wp_health['is_wordpress']
+    site.wp_version = wp_health['wp_version']
+    site.last_wordpress_check = datetime.utcnow()
+    
+    critical_vulns = []
+    message = None
+
+    if wp_health['vulnerabilities']:
+        site.vulnerabilities_found = json.dumps(wp_health['vulnerabilities'])
+        logger.warning(f"⚠️ {len(wp_health['vulnerabilities'])} vulnerabilidade(s) WordPress encontrada(s) em {site.domain}")
+
+        # Envia alerta Telegram se houver vulnerabilidades críticas ou high
+        critical_vulns = [v for v in wp_health['vulnerabilities'] if v.get('severity') in ['critical', 'high']]
+
+        if critical_vulns:
+            vuln_list = "\n".join([f"• {v['description']}" for v in critical_vulns[:5]])
+            message = (
+                f"🚨 <b>ALERTA - VULNERABILIDADES WORDPRESS</b>\n\n"
+                f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+                f"🔗 <b>Domínio:</b> {site.domain}\n"
+                f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n"
+                f"⚠️ <b>Vulnerabilidades Críticas:</b> {len(critical_vulns)}\n\n"
+                f"{vuln_list}\n\n"
+                f"Recomenda-se ação imediata para corrigir as vulnerabilidades."
+            )
+    else:
+        site.vulnerabilities_found = None
+
+    # Só alerta de novo se a lista de vulnerabilidades críticas mudar (ou no lembrete)
+    _alert(
+        site, owner, "wordpress_vulns", bool(critical_vulns), message,
+        problem_fingerprint=fingerprint([v.get('description') for v in critical_vulns])
+    )
+    
+    # Salva plugins detectados (incluindo CVEs)
+    if 'plugins_detected' in wp_health and wp_health['plugins_detected']:
+        site.plugins_detected = json.dumps(wp_health['plugins_detected'])
+        
+        # Conta plugins com CVEs
+        plugins_with_cves = [p for p in wp_health['plugins_detected'] if p.get('vulnerabilities')]
+        if plugins_with_cves:
+            logger.warning(f"🔌 {len(plugins_with_cves)} plugin(s) com vulnerabilidades CVE detectado(s) em {site.domain}")
+    else:
+        site.plugins_detected = None
+        
+    if site.is_wordpress:
+        version_info = f" (versão {site.wp_version})" if site.wp_version else ""
+        logger.info(f"✅ WordPress detectado em {site.domain}{version_info}")
+
+
+def _apply_seo(site: Site, owner: Optional[User], seo_health: dict) -> None:
+    """Atualiza o SEO Health e alerta quando o site bloqueia/desbloqueia indexação"""
+    # Atualiza status SEO
+    site.seo_indexable = seo_health.get('indexable', True)
+    site.last_seo_check = datetime.utcnow()
+
+    if seo_health.get('issues'):
+        site.seo_issues = json.dumps(seo_health['issues'])
+        logger.warning(f"⚠️ {len(seo_health['issues'])} problema(s) SEO detectado(s) em {site.domain}")
+    else:
+        site.seo_issues = None
+        logger.info(f"✅ SEO Health OK para {site.domain}")
+
+    # INCIDENTE CRÍTICO: Site bloqueou indexação
+    message = None
+    if not site.seo_indexable:
+        issues_text = "\n".join(seo_health.get('issues') or [])
+        message = (
+            f"💀 <b>ALERTA CRÍTICO - SITE DESINDEXADO</b>\n\n"
+            f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+            f"🔗 <b>Domínio:</b> {site.domain}\n"
+            f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n\n"
+            f"🚨 <b>PERIGO:</b> O site está bloqueando motores de busca!\n\n"
+            f"<b>Problemas encontrados:</b>\n{issues_text}\n\n"
+            f"⚠️ <b>AÇÃO URGENTE NECESSÁRIA:</b> O site não aparecerá nas buscas do Google até isso ser corrigido!"
+        )
+
+    # Site voltou a ser indexável
+    resolved_message = (
+        f"✅ <b>SITE VOLTOU A SER INDEXÁVEL</b>\n\n"
+        f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+        f"🔗 <b>Domínio:</b> {site.domain}\n"
+        f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n\n"
+        f"✅ Os bloqueios de indexação foram removidos.\n"
+        f"O Google poderá rastrear o site novamente!"
+    )
+
+    event = _alert(site, owner, "seo_noindex", not site.seo_indexable, message, resolved_message=resolved_message)
+
+    if event == 'fire':
+        logger.error(f"💀 ALERTA CRÍTICO: {site.domain} está BLOQUEANDO INDEXAÇÃO!")
+    elif event == 'resolve':
+        logger.info(f"✅ {site.domain} voltou a ser indexável")
+
+
+def _apply_general_security(site: Site, owner: Optional[User], general_sec: dict) -> None:
+    """Atualiza tech stack, CVEs e nota de headers (sites não-WordPress)"""
+    # Salva tech stack
+    if general_sec.get('tech_stack') and general_sec['tech_stack'].get('success'):
+        site.tech_stack = json.dumps(general_sec['tech_stack']['technologies'])
+        site.last_tech_scan = datetime.utcnow()
+        logger.info(f"✅ {len(general_sec['tech_stack']['technologies'])} tecnologias detectadas em {site.domain}")
+    
+    # Salva vulnerabilidades
+    if general_sec.get('vulnerabilities'):
+        site.general_vulnerabilities = json.dumps(general_sec['vulnerabilities'])
+    
+    # Sem tech stack não houve consulta de CVEs: não dá para dizer que resolveu
+    if general_sec.get('tech_stack') and general_sec['tech_stack'].get('success'):
+        # Alerta se encontrar CVEs críticos
+        critical_vulns = [
+            v for v in general_sec.get('vulnerabilities') or [] 
+            if 'CRITICAL' in str(v.get('severity', '')).upper() or 
+               'HIGH' in str(v.get('severity', '')).upper()
+        ]
+        
+        message = None
+        if critical_vulns:
+            message = (
+                f"🚨 <b>VULNERABILIDADES CRÍTICAS DETECTADAS</b>\n\n"
+                f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+                f"🔗 <b>Domínio:</b> {site.domain}\n"
+                f"⚠️ <b>CVEs Encontrados:</b> {len(critical_vulns)}\n\n"
+            )
+            
+            # Mostra até 3 vulnerabilidades para não ficar muito longo
+            for vuln in critical_vulns[:3]:
+                message += (
+                    f"🔴 <b>{vuln.get('cve_id')}</b>\n"
+                    f"   Tecnologia: {vuln.get('technology')} {vuln.get('version')}\n"
+                    f"   Severidade: {vuln.get('severity')}\n"
+                    f"   {vuln.get('summary', '')[:100]}...\n\n"
+                )
+            
+            if len(critical_vulns) > 3:
+                message += f"... e mais {len(critical_vulns) - 3} vulnerabilidade(s).\n"
+        
+        # Mesmo conjunto de CVEs = mesmo alerta (só o lembrete periódico)
+        _alert(
+            site, owner, "cve", bool(critical_vulns), message,
+            problem_fingerprint=fingerprint([v.get('cve_id') for v in critical_vulns])
+        )
+    
+    # Salva nota de headers de segurança
+    if general_sec.get('security_headers'):
+        grade = general_sec['security_headers']['grade']
+        site.security_headers_grade = grade
+        logger.info(f"🔐 Security Headers Grade: {grade} para {site.domain}")
+        
+        # Alerta se a nota for F (péssima)
+        missing = general_sec['security_headers'].get('headers_missing', [])
+        message = None
+        if grade == 'F':
+            message = (
+                f"⚠️ <b>SECURITY HEADERS CRÍTICOS AUSENTES</b>\n\n"
+                f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+                f"🔗 <b>Domínio:</b> {site.domain}\n"
+                f"📊 <b>Nota:</b> F (Falhou)\n\n"
+                f"<b>Headers Faltando:</b>\n"
+            )
+            
+            for h in missing[:4]:  # Primeiros 4
+                message += f"• {h['header']}: {h['description']}\n"
+            
+            message += (
+                f"\n⚠️ Sem esses headers, seu site está vulnerável a "
+                f"ataques como XSS, clickjacking e MIME sniffing."
+            )
+        
+        _alert(
+            site, owner, "security_headers", grade == 'F', message,
+            problem_fingerprint=fingerprint([h.get('header') for h in missing]) if grade == 'F' else None
+        )
+    
+    logger.info(f"✅ General Tech Scan concluído para {site.domain}")
+
+
+# Checks que analisam a homepage: compartilham um único download (PageSnapshot)
+PAGE_CHECKS = {"wordpress", "seo", "tech"}
+
+# Funções de coleta (I/O, sem sessão) e aplicação de cada check lento
+_SLOW_CHECK_COLLECTORS = {
+    "whois": lambda domain, page: lookup_expiration(domain),
+    "blacklist": lambda domain, page: check_blacklist(domain),
+    "wordpress": lambda domain, page: check_wordpress_health(domain, timeout=5, page=page),
+    "seo": lambda domain, page: check_seo_health(domain, timeout=5, page=page),
+    "tech": lambda domain, page: check_general_security(f"https://{domain}", timeout=10, page=page),
+}
+
+_SLOW_CHECK_APPLIERS = {
+    "whois": lambda site, owner, value: _apply_whois(site, *value),
+    "blacklist": _apply_blacklist,
+    "wordpress": _apply_wordpress,
+    "seo": _apply_seo,
+    "tech": _apply_general_security,
+}
+
+# Tipos de alerta (alert_state.ALERT_RULES) avaliados por cada check lento
+_SLOW_CHECK_ALERTS = {
+    "blacklist": ["blacklist"],
+    "wordpress": ["wordpress_vulns"],
+    "seo": ["seo_noindex"],
+    "tech": ["cve", "security_headers"],
+}
+
+
+def _collect_slow_checks(domain: str, checks: list, prefetched: Optional[dict] = None) -> dict:
+    """
+    Executa os checks lentos (I/O bloqueante) de um site e devolve os resultados brutos.
+    
+    A homepage é baixada uma única vez e passada para SEO, WordPress e Tech.
+    Não toca no banco nem em objetos ORM, então pode rodar em threads
+    paralelas; a aplicação dos resultados fica com _apply_slow_checks.
+    
+    Args:
+        domain: Domínio do site
+        checks: Checks a executar
+        prefetched: Resultados já coletados para o lote inteiro ({check: (resultado, exceção)})
+    
+    Returns:
+        Dict {check: (resultado, exceção)}
+    """
+    page = None
+    if PAGE_CHECKS.intersection(checks):
+        try:
+            page = fetch_page(domain, timeout=10)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível baixar a homepage de {domain}: {e}")
+    
+    outputs = {}
+    
+    # Ordem de SLOW_CHECKS: o WordPress roda antes do Tech Scanner
+    for check in SLOW_CHECKS:
+        if check not in checks:
+            continue
+        
+        # General Tech Scanner é só para sites NÃO-WordPress
+        if check == "tech" and "wordpress" in outputs:
+            wp_health, _ = outputs["wordpress"]
+            if wp_health and wp_health.get('is_wordpress'):
+                continue
+        
+        if prefetched and check in prefetched:
+            outputs[check] = prefetched[check]
+            continue
+        
+        try:
+            outputs[check] = (_SLOW_CHECK_COLLECTORS[check](domain, page), None)
+        except Exception as e:
+            outputs[check] = (None, e)
+    
+    return outputs
+
+
+def _apply_slow_checks(site: Site, owner: Optional[User], outputs: dict) -> int:
+    """
+    Aplica no site os resultados de _collect_slow_checks.
+    Uma falha em um check não afeta os demais (mesma política do scan_site).
+    
+    Returns:
+        Quantidade de checks que falharam
+    """
+    failed = 0
+    
+    for check, (value, error) in outputs.items():
+        # Se o WordPress deste scan detectou WP, o resultado do Tech não vale
+        if check == "tech" and site.is_wordpress:
+            continue
+        
+        if error is None:
+            try:
+                _SLOW_CHECK_APPLIERS[check](site, owner, value)
+                continue
+            except Exception as e:
+                error = e
+        
+        failed += 1
+        logger.error(f"❌ Erro no check {check} de {site.domain}: {error}")
+        
+        if check == "blacklist":
+            # Não quebra o monitoramento se RBL falhar
+            site.is_blacklisted = False
+            site.blacklisted_in = None
+    
+    return failed
+
+
+def _slow_check_eligible(site: Site, check: str) -> bool:
+    """Mesmo critério de _slow_check_eligible_filters, avaliado no objeto"""
+    config = SLOW_CHECKS[check]
+    
+    if config["requires_online"] and site.current_status != "online":
+        return False
+    if config["skip_wordpress"] and site.is_wordpress:
+        return False
+    
+    return True
+
+
+def _slow_check_eligible_filters(check: str) -> list:
+    """Filtros SQL de elegibilidade de um check lento (além de is_active)"""
+    config = SLOW_CHECKS[check]
+    filters = [Site.is_active == True]
+    
+    if config["requires_online"]:
+        filters.append(Site.current_status == "online")
+    if config["skip_wordpress"]:
+        filters.append(Site.is_wordpress == False)
+    
+    return filters
+
+
+def _site_scan_ports(site: Site) -> Optional[list]:
+    """Portas do port scan do site (configuradas no site ou do plano do dono)"""
+    plan_status = site.owner.plan_status if site.owner else 'free'
+    return get_scan_ports(plan_status, site.scan_ports)
+
+
+def _whois_from_cache(site: Site) -> bool:
+    """
+    Whois do scan_site sem consulta bloqueante.
+    
+    Se o refresh do site venceu (ou nunca rodou), usa o resultado do Redis
+    quando outro site/preview já consultou o domínio.
+    
+    Returns:
+        True se o Whois precisa ser consultado (na fila WHOIS_QUEUE)
+    """
+    if site.whois_next_check_at and _as_utc(site.whois_next_check_at) > datetime.now(timezone.utc):
+        return False
+    
+    cached = get_cached_whois(site.domain)
+    if cached is None:
+        # Reserva: o dispatch_slow_checks não despacha de novo enquanto a fila processa
+        site.whois_next_check_at = datetime.utcnow() + timedelta(hours=WHOIS_RETRY_HOURS)
+        return True
+    
+    _apply_whois(site, *cached)
+    return False
+
+
+def _notify_status_change(site: Site, owner: Optional[User], result: ScanResult) -> None:
+    """
+    🚨 Alerta via Telegram quando o site cai ou volta.
+    
+    A queda só é confirmada após ALERT_DOWN_THRESHOLD falhas nos últimos
+    ALERT_DOWN_WINDOW checks, e a recuperação após ALERT_RECOVER_CHECKS
+    checks OK seguidos (ver alert_state.py). Chamar antes do commit do scan.
+    """
+    message = None
+    if not result.is_online:
+        # Site CAIU (estava online, agora está offline)
+        message = (
+            f"🚨 <b>ALERTA - SITE FORA DO AR</b>\n\n"
+            f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+            f"🔗 <b>Domínio:</b> {site.domain}\n"
+            f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n"
+            f"❌ <b>Status:</b> OFFLINE\n"
+        )
+        
+        if result.error_message:
+            message += f"📝 <b>Erro:</b> {result.error_message}\n"
+    
+    # Site VOLTOU (estava offline, agora está online)
+    resolved_message = None
+    if result.is_online:
+        resolved_message = (
+            f"✅ <b>RECUPERAÇÃO - SITE VOLTOU</b>\n\n"
+            f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+            f"🔗 <b>Domínio:</b> {site.domain}\n"
+            f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n"
+            f"✅ <b>Status:</b> ONLINE\n"
+            f"⚡ <b>Latência:</b> {result.latency_ms:.0f}ms\n"
+        )
+    
+    # Erro diferente com o site ainda fora não é um problema novo
+    event = _alert(site, owner, "down", not result.is_online, message, resolved_message=resolved_message)
+    
+    if event == 'fire':
+        logger.info(f"🚨 Alerta de QUEDA agendado para {site.domain}")
+    elif event == 'resolve':
+        logger.info(f"✅ Alerta de RECUPERAÇÃO agendado para {site.domain}")
+
+
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
 def scan_site(self, site_id: int) -> dict:
     """
@@ -33,6 +626,11 @@ def scan_site(self, site_id: int) -> dict:
     3. Atualiza o status do site
     4. Cria um registro de log
     
+    Usada para scans manuais e para o primeiro scan de um site recém-cadastrado,
+    por isso também roda os checks lentos (o Whois só pelo cache ou pela
+    fila WHOIS_QUEUE, nunca bloqueando o scan). O agendamento periódico usa
+    scan_site_batch (fast path) e run_slow_check_batch.
+    
     Args:
         site_id: ID do site no banco de dados
     
@@ -47,8 +645,8 @@ def scan_site(self, site_id: int) -> dict:
     db = SessionLocal()
     
     try:
-        # Busca o site
-        site = db.query(Site).filter(Site.id == site_id).first()
+        # Busca o site (com o dono, para os alertas)
+        site = db.query(Site).options(joinedload(Site.owner)).filter(Site.id == site_id).first()
         
         if not site:
             logger.warning(f"Site {site_id} não encontrado no banco")
@@ -60,381 +658,412 @@ def scan_site(self, site_id: int) -> dict:
         
         logger.info(f"🔍 Iniciando scan de {site.domain}")
         
-        # Guarda o status anterior para detectar mudanças
-        previous_status = site.current_status
-        was_online = (previous_status == "online")
-        
         # Executa o scan completo (com verificação anti-defacement se configurada)
-        result: ScanResult = full_scan(site.domain, must_contain_keyword=site.must_contain_keyword)
-        
-        # Detecta mudanças de status para disparar alertas
-        is_now_online = result.is_online
-        status_changed = (was_online != is_now_online)
+        result: ScanResult = full_scan(
+            site.domain, must_contain_keyword=site.must_contain_keyword, ports=_site_scan_ports(site)
+        )
         
         # Atualiza o site com os resultados
-        site.current_status = "online" if result.is_online else "offline"
-        site.last_check = datetime.utcnow()
-        site.last_latency = result.latency_ms
-        site.ssl_valid = result.ssl_valid
-        site.ssl_days_remaining = result.ssl_days_remaining
+        log_entry = _apply_scan_result(site, result)
         
-        # Verifica expiração do domínio (Whois)
-        try:
-            domain_expiration = check_domain_expiration(site.domain)
-            if domain_expiration:
-                site.domain_expiration_date = domain_expiration
-                logger.info(f"📅 Expiração do domínio {site.domain}: {domain_expiration.strftime('%Y-%m-%d')}")
-            else:
-                logger.warning(f"⚠️  Não foi possível obter data de expiração para {site.domain}")
-        except Exception as e:
-            logger.error(f"❌ Erro ao verificar expiração do domínio {site.domain}: {e}")
-            # Não quebra o monitoramento se Whois falhar
+        # RBL, WordPress, SEO e Tech Scanner (WordPress e Tech só se online).
+        # O Whois não roda aqui: vem do cache ou vai para a fila "whois"
+        checks = ["blacklist", "seo"]
+        if result.is_online:
+            checks += ["wordpress", "tech"]
+        _apply_slow_checks(site, site.owner, _collect_slow_checks(site.domain, checks))
+        queue_whois = _whois_from_cache(site)
+        
+        # 🚨 LÓGICA DE ALERTAS VIA TELEGRAM 🚨 (enviados após o commit)
+        _notify_status_change(site, site.owner, result)
+        
+        db.add(log_entry)
+        db.commit()
+        
+        if queue_whois:
+            run_slow_check_batch.apply_async((["whois"], [site.id]), queue=WHOIS_QUEUE)
+        
+        logger.info(f"✅ Scan de {site.domain} concluído: {site.current_status}")
+        
+        return result.to_dict()
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao escanear site {site_id}: {str(e)}")
+        db.rollback()
         
-        # Verifica se está em blacklist (RBL)
+        # Tenta novamente se não excedeu retries
         try:
-            is_blacklisted, blacklisted_in_list = check_blacklist(site.domain, timeout=2.0)
-            site.is_blacklisted = is_blacklisted
-            
-            if blacklisted_in_list:
-                site.blacklisted_in = json.dumps(blacklisted_in_list)
-                logger.warning(f"🚨 {site.domain} está em blacklist: {', '.join(blacklisted_in_list)}")
+            self.retry(exc=e)
+        except self.MaxRetriesExceededError:
+            logger.error(f"Máximo de tentativas excedido para site {site_id}")
+            return {"error": str(e)}
+        
+    finally:
+        db.close()
+
+
+@celery_app.task
+def scan_site_batch(site_ids: list) -> dict:
+    """
+    Escaneia um lote de sites em uma única mensagem do Celery.
+    
+    Este é o fast path (uptime, latência, SSL e portas), executado a cada
+    check_interval. Whois, RBL, WordPress, SEO e Tech rodam em
+    run_slow_check_batch, com cadência própria (ver SLOW_CHECKS).
+    
+    Fluxo:
+    1. Carrega sites + donos em uma única query
+    2. Executa o full_scan de todos concorrentemente (engine assíncrona)
+    3. Grava todas as atualizações e MonitorLogs em um único flush/commit
+    4. Dispara os alertas de mudança de status (após o commit, ver alert_state.py)
+    
+    Args:
+        site_ids: IDs dos sites do lote
+    
+    Returns:
+        Dict com contagem de sites escaneados por status
+    """
+    db = SessionLocal()
+    
+    try:
+        sites = db.query(Site).options(joinedload(Site.owner)).filter(
+            Site.id.in_(site_ids),
+            Site.is_active == True
+        ).all()
+        
+        if not sites:
+            return {"scanned": 0, "online": 0, "offline": 0}
+        
+        logger.info(f"🔍 Iniciando scan em lote de {len(sites)} sites")
+        
+        # Estado de alerta de queda de todo o lote em uma query
+        AlertStateStore.for_session(db).preload([site.id for site in sites], ["down"])
+        
+        # 1. Fast path: uptime + SSL + portas de todos os sites em um único event loop
+        results = full_scan_many([
+            (site.domain, site.must_contain_keyword, _site_scan_ports(site)) for site in sites
+        ])
+        
+        # 2. Aplica tudo e grava em um único flush
+        log_entries = [_apply_scan_result(site, result) for site, result in zip(sites, results)]
+        
+        # 3. Alertas de queda/recuperação (entram na fila após o commit)
+        for site, result in zip(sites, results):
+            _notify_status_change(site, site.owner, result)
+        
+        db.add_all(log_entries)
+        db.commit()
+        
+        online = sum(1 for result in results if result.is_online)
+        logger.info(f"✅ Lote concluído: {len(sites)} sites ({online} online, {len(sites) - online} offline)")
+        
+        return {
+            "scanned": len(sites),
+            "online": online,
+            "offline": len(sites) - online
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Erro no scan em lote {site_ids}: {str(e)}")
+        db.rollback()
+        return {"error": str(e)}
+        
+    finally:
+        db.close()
+
+
+@celery_app.task
+def scan_all_sites() -> dict:
+    """
+    Escaneia todos os sites ativos.
+    
+    O agendamento periódico é feito por dispatch_due_sites; esta task
+    fica disponível para forçar um scan geral. Divide os sites ativos em lotes de SCAN_BATCH_SIZE e agenda
+    um scan_site_batch por lote.
+    
+    Isso mantém o paralelismo entre workers, mas com uma mensagem
+    no broker (e um commit no banco) por lote em vez de por site.
+    
+    Returns:
+        Dict com contagem de sites e lotes agendados
+    """
+    db = SessionLocal()
+    
+    try:
+        # Busca apenas os IDs dos sites ativos
+        site_ids = [row.id for row in db.query(Site.id).filter(Site.is_active == True).all()]
+        
+        batches = _chunks(site_ids, SCAN_BATCH_SIZE)
+        
+        logger.info(f"📋 Agendando scan para {len(site_ids)} sites ativos em {len(batches)} lotes")
+        
+        for batch in batches:
+            # Agenda o lote (não bloqueia)
+            scan_site_batch.delay(batch)
+        
+        logger.info(f"✅ {len(batches)} lotes agendados com sucesso")
+        
+        return {
+            "scheduled": len(site_ids),
+            "batches": len(batches),
+            "total_active": len(site_ids)
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao agendar scans: {str(e)}")
+        return {"error": str(e)}
+        
+    finally:
+        db.close()
+
+
+def _schedule_next_check(site: Site, now: datetime, first: bool = False) -> datetime:
+    """
+    Calcula o próximo scan do site a partir do check_interval (limitado pelo plano).
+    
+    No primeiro agendamento a fase é sorteada dentro do intervalo inteiro,
+    espalhando os sites ao longo do ciclo. Nos seguintes aplica só um jitter
+    de SCHEDULER_JITTER_RATIO para não sincronizar os sites de novo.
+    """
+    plan_status = site.owner.plan_status if site.owner else 'free'
+    interval_seconds = get_effective_check_interval(plan_status, site.check_interval) * 60
+    
+    if first:
+        offset = random.uniform(0, interval_seconds)
+    else:
+        jitter = interval_seconds * SCHEDULER_JITTER_RATIO
+        offset = interval_seconds + random.uniform(-jitter, jitter)
+    
+    site.next_check_at = now + timedelta(seconds=offset)
+    return site.next_check_at
+
+
+@celery_app.task
+def dispatch_due_sites() -> dict:
+    """
+    Scheduler de uptime (executado pelo Celery Beat a cada poucos segundos).
+    
+    Seleciona apenas os sites com next_check_at vencido, reserva cada um
+    avançando o next_check_at (FOR UPDATE SKIP LOCKED no Postgres, para
+    dois beats nunca despacharem o mesmo site) e agenda scan_site_batch
+    em lotes de SCAN_BATCH_SIZE.
+    
+    Sites sem next_check_at (novos ou com intervalo alterado) recebem
+    uma fase aleatória dentro do intervalo e não são despachados agora.
+    
+    Returns:
+        Dict com quantidade de sites despachados e agendados
+    """
+    db = SessionLocal()
+    
+    try:
+        now = datetime.utcnow()
+        
+        due_sites = db.query(Site).options(joinedload(Site.owner)).filter(
+            Site.is_active == True,
+            or_(Site.next_check_at == None, Site.next_check_at <= now)
+        ).order_by(Site.next_check_at).limit(SCHEDULER_MAX_DISPATCH).with_for_update(
+            skip_locked=True, of=Site
+        ).all()
+        
+        due_ids = []
+        newly_scheduled = 0
+        
+        for site in due_sites:
+            if site.next_check_at is None:
+                _schedule_next_check(site, now, first=True)
+                newly_scheduled += 1
             else:
-                site.blacklisted_in = None
-                
-            # Envia alerta se estiver em blacklist
-            if is_blacklisted:
-                owner = db.query(User).filter(User.id == site.owner_id).first()
-                if owner and owner.telegram_chat_id:
-                    message = (
-                        f"🚨 <b>ALERTA - BLACKLIST DETECTADA</b>\n\n"
-                        f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                        f"🔗 <b>Domínio:</b> {site.domain}\n"
-                        f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n"
-                        f"⚠️ <b>Blacklists:</b> {', '.join(blacklisted_in_list)}\n\n"
-                        f"Seu IP está listado em uma ou mais blacklists. "
-                        f"Isso pode afetar a reputação e entrega de emails."
-                    )
-                    send_telegram_alert(message, owner.telegram_chat_id)
-                    logger.info(f"🚨 Alerta de blacklist enviado para {site.domain}")
-                    
-        except Exception as e:
-            logger.error(f"❌ Erro ao verificar blacklist para {site.domain}: {e}")
-            # Não quebra o monitoramento se RBL falhar
-            site.is_blacklisted = False
-            site.blacklisted_in = None
+                _schedule_next_check(site, now)
+                due_ids.append(site.id)
+        
+        # Persiste a reserva antes de publicar as mensagens
+        db.commit()
+        
+        batches = _chunks(due_ids, SCAN_BATCH_SIZE)
+        for batch in batches:
+            scan_site_batch.delay(batch)
+        
+        if due_ids or newly_scheduled:
+            logger.info(
+                f"⏱️ Scheduler: {len(due_ids)} sites despachados em {len(batches)} lotes, "
+                f"{newly_scheduled} sites agendados pela primeira vez"
+            )
+        
+        return {
+            "dispatched": len(due_ids),
+            "batches": len(batches),
+            "newly_scheduled": newly_scheduled
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Erro no scheduler de sites: {str(e)}")
+        db.rollback()
+        return {"error": str(e)}
+        
+    finally:
+        db.close()
+
+
+@celery_app.task
+def run_slow_check_batch(checks: list, site_ids: list) -> dict:
+    """
+    Executa checks lentos (whois, blacklist, wordpress, seo, tech) para um lote de sites.
+    
+    Todos os sites do lote recebem o mesmo conjunto de checks; quando há mais
+    de um check de conteúdo, a homepage de cada site é baixada uma única vez.
+    As chamadas de rede rodam em um pool de threads sem tocar na sessão;
+    os resultados (e alertas) são aplicados depois, com um único commit.
+    
+    Args:
+        checks: Nomes dos checks (chaves de SLOW_CHECKS); aceita uma string
+        site_ids: IDs dos sites do lote
+    
+    Returns:
+        Dict com quantidade de sites verificados e falhas
+    """
+    if isinstance(checks, str):
+        checks = [checks]
+    
+    unknown = [check for check in checks if check not in SLOW_CHECKS]
+    if unknown:
+        logger.error(f"❌ Check lento desconhecido: {unknown}")
+        return {"error": f"Check desconhecido: {unknown}"}
+    
+    db = SessionLocal()
+    
+    try:
+        sites = db.query(Site).options(joinedload(Site.owner)).filter(
+            Site.id.in_(site_ids),
+            Site.is_active == True
+        ).all()
         
-        # Verifica WordPress Security (se online)
-        if result.is_online:
+        # Cada site roda só os checks para os quais ainda é elegível
+        jobs = []
+        for site in sites:
+            site_checks = [check for check in checks if _slow_check_eligible(site, check)]
+            if site_checks:
+                jobs.append((site, site_checks))
+        
+        if not jobs:
+            return {"checks": checks, "checked": 0, "failed": 0}
+        
+        # RBL do lote inteiro de uma vez: sites no mesmo IP de hospedagem
+        # são consultados uma única vez (ver dnsbl.py)
+        prefetched = [{} for _ in jobs]
+        blacklist_jobs = [index for index, (_, site_checks) in enumerate(jobs) if "blacklist" in site_checks]
+        if blacklist_jobs:
             try:
-                wp_health = check_wordpress_health(site.domain, timeout=5)
-                
-                site.is_wordpress = wp_health['is_wordpress']
-                site.wp_version = wp_health['wp_version']
-                
-                if wp_health['vulnerabilities']:
-                    site.vulnerabilities_found = json.dumps(wp_health['vulnerabilities'])
-                    logger.warning(f"⚠️ {len(wp_health['vulnerabilities'])} vulnerabilidade(s) WordPress encontrada(s) em {site.domain}")
-                    
-                    # Envia alerta Telegram se houver vulnerabilidades críticas ou high
-                    critical_vulns = [v for v in wp_health['vulnerabilities'] if v.get('severity') in ['critical', 'high']]
-                    
-                    if critical_vulns:
-                        owner = db.query(User).filter(User.id == site.owner_id).first()
-                        if owner and owner.telegram_chat_id:
-                            vuln_list = "\n".join([f"• {v['description']}" for v in critical_vulns[:5]])
-                            message = (
-                                f"🚨 <b>ALERTA - VULNERABILIDADES WORDPRESS</b>\n\n"
-                                f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                                f"🔗 <b>Domínio:</b> {site.domain}\n"
-                                f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n"
-                                f"⚠️ <b>Vulnerabilidades Críticas:</b> {len(critical_vulns)}\n\n"
-                                f"{vuln_list}\n\n"
-                                f"Recomenda-se ação imediata para corrigir as vulnerabilidades."
-                            )
-                            send_telegram_alert(message, owner.telegram_chat_id)
-                            logger.info(f"🚨 Alerta de vulnerabilidades WordPress enviado para {site.domain}")
-                else:
-                    site.vulnerabilities_found = None
-                
-                # Salva plugins detectados (incluindo CVEs)
-                if 'plugins_detected' in wp_health and wp_health['plugins_detected']:
-                    site.plugins_detected = json.dumps(wp_health['plugins_detected'])
-                    
-                    # Conta plugins com CVEs
-                    plugins_with_cves = [p for p in wp_health['plugins_detected'] if p.get('vulnerabilities')]
-                    if plugins_with_cves:
-                        logger.warning(f"🔌 {len(plugins_with_cves)} plugin(s) com vulnerabilidades CVE detectado(s) em {site.domain}")
-                else:
-                    site.plugins_detected = None
-                    
-                if site.is_wordpress:
-                    version_info = f" (versão {site.wp_version})" if site.wp_version else ""
-                    logger.info(f"✅ WordPress detectado em {site.domain}{version_info}")
-                    
+                listings = check_blacklist_many([jobs[index][0].domain for index in blacklist_jobs])
+                for index, listing in zip(blacklist_jobs, listings):
+                    prefetched[index]["blacklist"] = (listing, None)
             except Exception as e:
-                logger.error(f"❌ Erro ao verificar WordPress para {site.domain}: {e}")
-                # Não quebra o monitoramento se WP scan falhar
-        
-        # ============================================
-        # SEO HEALTH CHECK (INDEXABILIDADE)
-        # ============================================
-        try:
-            logger.info(f"🔍 Verificando SEO Health para {site.domain}...")
-            
-            seo_health = check_seo_health(site.domain, timeout=5)
-            
-            # Estado anterior
-            was_indexable = site.seo_indexable
-            
-            # Atualiza status SEO
-            site.seo_indexable = seo_health.get('indexable', True)
-            site.last_seo_check = datetime.utcnow()
-            
-            if seo_health.get('issues'):
-                site.seo_issues = json.dumps(seo_health['issues'])
-                logger.warning(f"⚠️ {len(seo_health['issues'])} problema(s) SEO detectado(s) em {site.domain}")
-                
-                # INCIDENTE CRÍTICO: Site bloqueou indexação
-                if was_indexable and not site.seo_indexable:
-                    owner = db.query(User).filter(User.id == site.owner_id).first()
-                    if owner and owner.telegram_chat_id:
-                        issues_text = "\n".join(seo_health['issues'])
-                        message = (
-                            f"💀 <b>ALERTA CRÍTICO - SITE DESINDEXADO</b>\n\n"
-                            f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                            f"🔗 <b>Domínio:</b> {site.domain}\n"
-                            f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n\n"
-                            f"🚨 <b>PERIGO:</b> O site está bloqueando motores de busca!\n\n"
-                            f"<b>Problemas encontrados:</b>\n{issues_text}\n\n"
-                            f"⚠️ <b>AÇÃO URGENTE NECESSÁRIA:</b> O site não aparecerá nas buscas do Google até isso ser corrigido!"
-                        )
-                        send_telegram_alert(message, owner.telegram_chat_id)
-                        logger.error(f"💀 ALERTA CRÍTICO: {site.domain} está BLOQUEANDO INDEXAÇÃO!")
-                
-                # Site voltou a ser indexável
-                elif not was_indexable and site.seo_indexable:
-                    owner = db.query(User).filter(User.id == site.owner_id).first()
-                    if owner and owner.telegram_chat_id:
-                        message = (
-                            f"✅ <b>SITE VOLTOU A SER INDEXÁVEL</b>\n\n"
-                            f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                            f"🔗 <b>Domínio:</b> {site.domain}\n"
-                            f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n\n"
-                            f"✅ Os bloqueios de indexação foram removidos.\n"
-                            f"O Google poderá rastrear o site novamente!"
-                        )
-                        send_telegram_alert(message, owner.telegram_chat_id)
-                        logger.info(f"✅ {site.domain} voltou a ser indexável")
-            else:
-                site.seo_issues = None
-                logger.info(f"✅ SEO Health OK para {site.domain}")
+                for index in blacklist_jobs:
+                    prefetched[index]["blacklist"] = (None, e)
         
-        except Exception as e:
-            logger.error(f"❌ Erro ao verificar SEO Health para {site.domain}: {e}")
-            # Não quebra o monitoramento se SEO check falhar
+        with ThreadPoolExecutor(max_workers=SLOW_CHECK_WORKERS) as executor:
+            outputs = list(executor.map(
+                lambda job: _collect_slow_checks(job[0][0].domain, job[0][1], job[1]),
+                zip(jobs, prefetched)
+            ))
         
-        # 🔒 GENERAL TECH SCANNER (para sites NÃO-WordPress)
-        if result.is_online and not site.is_wordpress:
-            try:
-                logger.info(f"🛠️ Iniciando General Tech Scanner para {site.domain}...")
-                
-                url = f"https://{site.domain}"
-                general_sec = check_general_security(url, timeout=10)
-                
-                # Salva tech stack
-                if general_sec.get('tech_stack') and general_sec['tech_stack'].get('success'):
-                    site.tech_stack = json.dumps(general_sec['tech_stack']['technologies'])
-                    site.last_tech_scan = datetime.utcnow()
-                    logger.info(f"✅ {len(general_sec['tech_stack']['technologies'])} tecnologias detectadas em {site.domain}")
-                
-                # Salva vulnerabilidades
-                if general_sec.get('vulnerabilities'):
-                    site.general_vulnerabilities = json.dumps(general_sec['vulnerabilities'])
-                    
-                    # Alerta se encontrar CVEs críticos
-                    critical_vulns = [
-                        v for v in general_sec['vulnerabilities'] 
-                        if 'CRITICAL' in str(v.get('severity', '')).upper() or 
-                           'HIGH' in str(v.get('severity', '')).upper()
-                    ]
-                    
-                    if critical_vulns:
-                        owner = db.query(User).filter(User.id == site.owner_id).first()
-                        if owner and owner.telegram_chat_id:
-                            message = (
-                                f"🚨 <b>VULNERABILIDADES CRÍTICAS DETECTADAS</b>\n\n"
-                                f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                                f"🔗 <b>Domínio:</b> {site.domain}\n"
-                                f"⚠️ <b>CVEs Encontrados:</b> {len(critical_vulns)}\n\n"
-                            )
-                            
-                            # Mostra até 3 vulnerabilidades para não ficar muito longo
-                            for vuln in critical_vulns[:3]:
-                                message += (
-                                    f"🔴 <b>{vuln.get('cve_id')}</b>\n"
-                                    f"   Tecnologia: {vuln.get('technology')} {vuln.get('version')}\n"
-                                    f"   Severidade: {vuln.get('severity')}\n"
-                                    f"   {vuln.get('summary', '')[:100]}...\n\n"
-                                )
-                            
-                            if len(critical_vulns) > 3:
-                                message += f"... e mais {len(critical_vulns) - 3} vulnerabilidade(s).\n"
-                            
-                            send_telegram_alert(message, owner.telegram_chat_id)
-                            logger.warning(f"🚨 Alerta de CVE enviado para {site.domain}: {len(critical_vulns)} críticas")
-                
-                # Salva nota de headers de segurança
-                if general_sec.get('security_headers'):
-                    grade = general_sec['security_headers']['grade']
-                    site.security_headers_grade = grade
-                    logger.info(f"🔐 Security Headers Grade: {grade} para {site.domain}")
-                    
-                    # Alerta se a nota for F (péssima)
-                    if grade == 'F':
-                        owner = db.query(User).filter(User.id == site.owner_id).first()
-                        if owner and owner.telegram_chat_id:
-                            missing = general_sec['security_headers'].get('headers_missing', [])
-                            message = (
-                                f"⚠️ <b>SECURITY HEADERS CRÍTICOS AUSENTES</b>\n\n"
-                                f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                                f"🔗 <b>Domínio:</b> {site.domain}\n"
-                                f"📊 <b>Nota:</b> F (Falhou)\n\n"
-                                f"<b>Headers Faltando:</b>\n"
-                            )
-                            
-                            for h in missing[:4]:  # Primeiros 4
-                                message += f"• {h['header']}: {h['description']}\n"
-                            
-                            message += (
-                                f"\n⚠️ Sem esses headers, seu site está vulnerável a "
-                                f"ataques como XSS, clickjacking e MIME sniffing."
-                            )
-                            
-                            send_telegram_alert(message, owner.telegram_chat_id)
-                            logger.warning(f"⚠️ Alerta de Security Headers enviado para {site.domain}")
-                
-                db.commit()
-                logger.info(f"✅ General Tech Scan concluído para {site.domain}")
-                
-            except Exception as e:
-                logger.error(f"❌ Erro no General Tech Scan de {site.domain}: {e}")
-                # Não quebra o monitoramento se tech scan falhar
+        # Estados de alerta dos checks do lote em uma query
+        alert_types = [alert_type for check in checks for alert_type in _SLOW_CHECK_ALERTS.get(check, [])]
+        if alert_types:
+            AlertStateStore.for_session(db).preload([site.id for site, _ in jobs], alert_types)
         
-        # Converte lista de portas para string
-        if result.open_ports:
-            site.open_ports = ",".join(map(str, result.open_ports))
-        else:
-            site.open_ports = None
-        
-        # Cria registro de log
-        log_entry = MonitorLog(
-            site_id=site.id,
-            status="online" if result.is_online else "offline",
-            http_status_code=result.http_status_code,
-            latency_ms=result.latency_ms,
-            ssl_valid=result.ssl_valid,
-            ssl_days_remaining=result.ssl_days_remaining,
-            ssl_issuer=result.ssl_issuer,
-            open_ports=site.open_ports,
-            error_message=result.error_message or result.ssl_error,
-            checked_at=datetime.utcnow()
-        )
+        failed = 0
+        for (site, _), site_outputs in zip(jobs, outputs):
+            failed += _apply_slow_checks(site, site.owner, site_outputs)
         
-        db.add(log_entry)
         db.commit()
         
-        # 🚨 LÓGICA DE ALERTAS VIA TELEGRAM 🚨
-        if status_changed:
-            # Busca o usuário dono do site
-            owner = db.query(User).filter(User.id == site.owner_id).first()
-            
-            if owner and owner.telegram_chat_id:
-                if was_online and not is_now_online:
-                    # Site CAIU (estava online, agora está offline)
-                    message = (
-                        f"🚨 <b>ALERTA - SITE FORA DO AR</b>\n\n"
-                        f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                        f"🔗 <b>Domínio:</b> {site.domain}\n"
-                        f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n"
-                        f"❌ <b>Status:</b> OFFLINE\n"
-                    )
-                    
-                    if result.error_message:
-                        message += f"📝 <b>Erro:</b> {result.error_message}\n"
-                    
-                    logger.info(f"🚨 Enviando alerta de QUEDA para {site.domain}")
-                    send_telegram_alert(message, owner.telegram_chat_id)
-                    
-                elif not was_online and is_now_online:
-                    # Site VOLTOU (estava offline, agora está online)
-                    message = (
-                        f"✅ <b>RECUPERAÇÃO - SITE VOLTOU</b>\n\n"
-                        f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                        f"🔗 <b>Domínio:</b> {site.domain}\n"
-                        f"⏰ <b>Horário:</b> {datetime.utcnow().strftime('%d/%m/%Y %H:%M:%S')} UTC\n"
-                        f"✅ <b>Status:</b> ONLINE\n"
-                        f"⚡ <b>Latência:</b> {result.latency_ms:.0f}ms\n"
-                    )
-                    
-                    logger.info(f"✅ Enviando alerta de RECUPERAÇÃO para {site.domain}")
-                    send_telegram_alert(message, owner.telegram_chat_id)
-        
-        logger.info(f"✅ Scan de {site.domain} concluído: {site.current_status}")
+        logger.info(f"✅ Checks {', '.join(checks)} concluídos para {len(jobs)} sites ({failed} falhas)")
         
-        return result.to_dict()
+        return {"checks": checks, "checked": len(jobs), "failed": failed}
         
     except Exception as e:
-        logger.error(f"❌ Erro ao escanear site {site_id}: {str(e)}")
+        logger.error(f"❌ Erro nos checks {checks} em lote {site_ids}: {str(e)}")
         db.rollback()
-        
-        # Tenta novamente se não excedeu retries
-        try:
-            self.retry(exc=e)
-        except self.MaxRetriesExceededError:
-            logger.error(f"Máximo de tentativas excedido para site {site_id}")
-            return {"error": str(e)}
+        return {"error": str(e)}
         
     finally:
         db.close()
 
 
 @celery_app.task
-def scan_all_sites() -> dict:
+def dispatch_slow_checks() -> dict:
     """
-    Escaneia todos os sites ativos.
+    Agenda os checks lentos vencidos (executada periodicamente pelo Celery Beat).
     
-    Esta task é executada periodicamente pelo Celery Beat.
-    Para cada site ativo, agenda um scan_site individual.
+    Para cada check de SLOW_CHECKS, busca os sites cujo last_*_check é mais
+    antigo que a cadência configurada e marca o timestamp como reservado
+    (evita despachar de novo enquanto o lote ainda roda, e evita repetir
+    sem parar um check que está falhando).
     
-    Isso permite paralelismo: múltiplos sites são escaneados
-    simultaneamente por diferentes workers.
+    Checks com "due_column" (Whois) usam o próximo check gravado no site
+    em vez de uma cadência fixa; a reserva empurra esse horário para frente.
+    
+    Os checks vencidos de um mesmo site seguem juntos na mesma mensagem,
+    para que SEO, WordPress e Tech reaproveitem um único download da homepage.
+    Checks com "queue" própria (Whois) seguem em mensagens separadas, nessa fila.
     
     Returns:
-        Dict com contagem de sites agendados
+        Dict com quantidade de sites despachados por check
     """
     db = SessionLocal()
+    dispatched = {}
     
     try:
-        # Busca todos os sites ativos
-        sites = db.query(Site).filter(Site.is_active == True).all()
+        now = datetime.utcnow()
+        # fila -> site_id -> [checks vencidos]
+        due_checks = defaultdict(lambda: defaultdict(list))
+        
+        for check, config in SLOW_CHECKS.items():
+            if config.get("due_column"):
+                # Próximo check gravado no site (ex: Whois conforme a expiração)
+                column = getattr(Site, config["due_column"])
+                due = or_(column == None, column <= now)
+            else:
+                column = getattr(Site, config["column"])
+                due = or_(column == None, column <= now - timedelta(hours=config["interval_hours"]))
+            
+            sites = db.query(Site).filter(
+                *_slow_check_eligible_filters(check),
+                due
+            ).order_by(column).limit(SLOW_CHECK_MAX_DISPATCH).with_for_update(skip_locked=True).all()
+            
+            for site in sites:
+                if config.get("due_column"):
+                    setattr(site, config["due_column"], now + timedelta(hours=config["interval_hours"]))
+                else:
+                    setattr(site, config["column"], now)
+                due_checks[config.get("queue")][site.id].append(check)
+            
+            dispatched[check] = len(sites)
         
-        logger.info(f"📋 Agendando scan para {len(sites)} sites ativos")
+        # Persiste a reserva antes de publicar as mensagens
+        db.commit()
         
-        scheduled = 0
-        for site in sites:
-            # Agenda scan individual (não bloqueia)
-            scan_site.delay(site.id)
-            scheduled += 1
+        for queue, queue_checks in due_checks.items():
+            # Agrupa sites com o mesmo conjunto de checks vencidos
+            groups = defaultdict(list)
+            for site_id, checks in queue_checks.items():
+                groups[tuple(checks)].append(site_id)
+            
+            for checks, site_ids in groups.items():
+                for batch in _chunks(site_ids, SLOW_CHECK_BATCH_SIZE):
+                    # queue=None: fila padrão do Celery
+                    run_slow_check_batch.apply_async((list(checks), batch), queue=queue)
         
-        logger.info(f"✅ {scheduled} scans agendados com sucesso")
+        if any(dispatched.values()):
+            logger.info(f"🐢 Checks lentos despachados: {dispatched}")
         
-        return {
-            "scheduled": scheduled,
-            "total_active": len(sites)
-        }
+        return dispatched
         
     except Exception as e:
-        logger.error(f"❌ Erro ao agendar scans: {str(e)}")
+        logger.error(f"❌ Erro ao despachar checks lentos: {str(e)}")
+        db.rollback()
         return {"error": str(e)}
         
     finally:
@@ -522,18 +1151,11 @@ def run_pagespeed_audit(self, site_id: int) -> dict:
             site.best_practices_score = result["best_practices_score"]
             site.last_pagespeed_check = datetime.utcnow()
             
-            db.commit()
-            
-            logger.info(
-                f"✅ PageSpeed audit concluído - {site.domain}: "
-                f"Performance {result['performance_score']}/100, "
-                f"SEO {result['seo_score']}/100"
-            )
-            
-            # Alerta se performance estiver crítica (<50)
-            if result["performance_score"] and result["performance_score"] < 50:
-                owner = db.query(User).filter(User.id == site.owner_id).first()
-                if owner and owner.telegram_chat_id:
+            # Alerta se performance estiver crítica (<50), enviado após o commit
+            if result["performance_score"] is not None:
+                is_critical = result["performance_score"] < 50
+                message = None
+                if is_critical:
                     message = (
                         f"⚠️ <b>ALERTA - PERFORMANCE CRÍTICA</b>\n\n"
                         f"🌐 <b>Site:</b> {site.name or site.domain}\n"
@@ -543,7 +1165,16 @@ def run_pagespeed_audit(self, site_id: int) -> dict:
                         f"Seu site está lento. Isso afeta SEO e conversões.\n"
                         f"Acesse o dashboard para ver detalhes."
                     )
-                    send_telegram_alert(message, owner.telegram_chat_id)
+                owner = db.query(User).filter(User.id == site.owner_id).first()
+                _alert(site, owner, "performance", is_critical, message)
+            
+            db.commit()
+            
+            logger.info(
+                f"✅ PageSpeed audit concluído - {site.domain}: "
+                f"Performance {result['performance_score']}/100, "
+                f"SEO {result['seo_score']}/100"
+            )
             
             return {
                 "success": True,
@@ -700,6 +1331,9 @@ def visual_check_task(self, site_id: int) -> dict:
             site.visual_alert_triggered = False
             site.last_visual_check = datetime.utcnow()
             
+            # Baseline novo (ex: atualizado pelo dono): fecha o alerta visual aberto
+            _alert(site, site.owner, "visual", False)
+            
             db.commit()
             
             logger.info(f"✅ Baseline criado para {site.domain} - 0% diff")
@@ -738,18 +1372,17 @@ def visual_check_task(self, site_id: int) -> dict:
             diff_image_path = f"static/screenshots/{site_id}_diff.png"
             create_diff_image(baseline_path, current_path, diff_image_path)
             logger.warning(f"⚠️  ALERTA VISUAL: {site.domain} mudou {diff_percent}%")
-            
-            # Envia alerta Telegram se configurado
-            if site.owner.telegram_chat_id:
-                message = (
-                    f"🎨 <b>ALERTA DE MUDANÇA VISUAL</b>\n\n"
-                    f"🌐 <b>Site:</b> {site.name or site.domain}\n"
-                    f"📊 <b>Diferença:</b> {diff_percent}%\n"
-                    f"⚠️ <b>Status:</b> Mudança significativa detectada (> 5%)\n\n"
-                    f"💡 <b>Ação:</b> Verifique se a mudança foi intencional.\n"
-                    f"Se sim, atualize o baseline no dashboard."
-                )
-                send_telegram_alert(message, site.owner.telegram_chat_id)
+        
+        # Alerta Telegram pelo AlertStateStore (um aviso por mudança, não a cada check)
+        message = (
+            f"🎨 <b>ALERTA DE MUDANÇA VISUAL</b>\n\n"
+            f"🌐 <b>Site:</b> {site.name or site.domain}\n"
+            f"📊 <b>Diferença:</b> {diff_percent}%\n"
+            f"⚠️ <b>Status:</b> Mudança significativa detectada (> 5%)\n\n"
+            f"💡 <b>Ação:</b> Verifique se a mudança foi intencional.\n"
+            f"Se sim, atualize o baseline no dashboard."
+        ) if should_alert else None
+        _alert(site, site.owner, "visual", should_alert, message)
         
         # Atualiza banco
         site.last_screenshot_path = current_path
@@ -888,22 +1521,14 @@ def pagespeed_check_task(self, site_id: int) -> dict:
             site.best_practices_score = pagespeed_result.get('best_practices_score')
             site.last_pagespeed_check = datetime.utcnow()
             
-            db.commit()
-            
-            logger.info(
-                f"✅ PageSpeed atualizado: {site.domain} - "
-                f"Performance: {site.performance_score}, "
-                f"SEO: {site.seo_score}, "
-                f"A11y: {site.accessibility_score}, "
-                f"BP: {site.best_practices_score}"
-            )
-            
             # Busca o dono do site para notificação
             owner = db.query(User).filter(User.id == site.owner_id).first()
             
-            # Envia alerta se performance estiver baixa
-            if owner and owner.telegram_chat_id and site.performance_score is not None:
-                if site.performance_score < 50:
+            # Envia alerta se performance estiver baixa (após o commit)
+            if site.performance_score is not None:
+                is_critical = site.performance_score < 50
+                message = None
+                if is_critical:
                     message = (
                         f"⚠️ <b>PERFORMANCE CRÍTICA DETECTADA</b>\n\n"
                         f"🌐 <b>Site:</b> {site.name}\n"
@@ -913,8 +1538,17 @@ def pagespeed_check_task(self, site_id: int) -> dict:
                         f"♿ <b>Acessibilidade:</b> {site.accessibility_score}/100\n\n"
                         f"<i>Recomenda-se otimizar o site urgentemente.</i>"
                     )
-                    send_telegram_alert(message, owner.telegram_chat_id)
-                    logger.info(f"📱 Alerta de performance crítica enviado via Telegram")
+                _alert(site, owner, "performance", is_critical, message)
+            
+            db.commit()
+            
+            logger.info(
+                f"✅ PageSpeed atualizado: {site.domain} - "
+                f"Performance: {site.performance_score}, "
+                f"SEO: {site.seo_score}, "
+                f"A11y: {site.accessibility_score}, "
+                f"BP: {site.best_practices_score}"
+            )
             
             return {
                 "site_id": site_id,
@@ -948,115 +1582,294 @@ def pagespeed_check_task(self, site_id: int) -> dict:
         db.close()
 
 
+def _as_utc(value: datetime) -> datetime:
+    """Datetimes lidos do SQLite vêm sem tzinfo; no Postgres já vêm em UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _heartbeat_alert_message(hb, now: datetime, deadline: datetime) -> str:
+    hours_late = int((now - deadline).total_seconds() / 3600)
+    
+    return (
+        f"🚨 <b>HEARTBEAT PERDIDO</b>\n\n"
+        f"⚠️ <b>Tarefa:</b> {hb.name}\n"
+        f"📋 <b>Descrição:</b> {hb.description or 'N/A'}\n"
+        f"⏰ <b>Último ping:</b> {hb.last_ping.strftime('%d/%m/%Y %H:%M:%S')}\n"
+        f"🕐 <b>Atrasado há:</b> {hours_late}h\n"
+        f"⚙️ <b>Período esperado:</b> {hb.expected_period // 3600}h\n\n"
+        f"💡 <b>Ação:</b> Verifique se o cron job/script está rodando corretamente!\n"
+        f"🔗 <b>URL do ping:</b> /ping/{hb.slug}"
+    )
+
+
+def _process_due_heartbeats(db, now: datetime, heartbeat_ids: Optional[list] = None) -> dict:
+    """
+    Aplica as transições de status dos heartbeats com next_deadline vencido.
+    
+    - up → late quando passa last_ping + expected_period
+    - late → down quando passa também o grace_period (alerta uma vez)
+    - O next_deadline avança para a próxima transição (ou NULL após o down)
+    
+    Só as linhas vencidas são lidas (índice em next_deadline, FOR UPDATE
+    SKIP LOCKED no Postgres) e os donos vêm junto (joinedload). Não faz commit;
+    os alertas só são enfileirados após o commit de quem chama.
+    
+    Args:
+        db: Sessão do banco
+        now: Horário de referência (UTC)
+        heartbeat_ids: Restringe a estes heartbeats (usado pelo watchdog)
+    
+    Returns:
+        Dict com as transições realizadas
+    """
+    from models import HeartbeatCheck
+    
+    query = db.query(HeartbeatCheck).options(joinedload(HeartbeatCheck.owner)).filter(
+        HeartbeatCheck.is_active == True,
+        HeartbeatCheck.next_deadline != None,
+        HeartbeatCheck.next_deadline <= now
+    )
+    if heartbeat_ids is not None:
+        query = query.filter(HeartbeatCheck.id.in_(heartbeat_ids))
+    
+    due = query.order_by(HeartbeatCheck.next_deadline).limit(HEARTBEAT_MAX_BATCH).with_for_update(
+        skip_locked=True, of=HeartbeatCheck
+    ).all()
+    
+    stats = {
+        "total_checked": len(due),
+        "late": 0,
+        "down": 0,
+        "rescheduled": 0,
+        "alerts_sent": 0
+    }
+    
+    for hb in due:
+        if not hb.last_ping:
+            hb.next_deadline = None
+            continue
+        
+        last_ping = _as_utc(hb.last_ping)
+        
+        # Quando fica "late" (sem grace period) e "down" (com grace period)
+        late_deadline = last_ping + timedelta(seconds=hb.expected_period)
+        deadline = late_deadline + timedelta(seconds=hb.grace_period or 0)
+        
+        if now > deadline:
+            # OVERDUE - Passou do prazo + tolerância = DOWN
+            old_status = hb.status
+            hb.next_deadline = None
+            
+            if old_status == 'down':
+                continue
+            
+            hb.status = 'down'
+            hb.missed_pings = (hb.missed_pings or 0) + 1
+            stats["down"] += 1
+            
+            # Envia alerta apenas uma vez (quando muda de status). Sai pelo
+            # outbox do AlertStateStore: só é enfileirado após o commit de
+            # quem chama, junto com alert_sent/status
+            owner = hb.owner
+            if not hb.alert_sent and owner and owner.telegram_chat_id:
+                message = _heartbeat_alert_message(hb, now, deadline)
+                
+                AlertStateStore.for_session(db).queue(message, owner.telegram_chat_id)
+                hb.alert_sent = True
+                hb.alert_sent_at = now
+                stats["alerts_sent"] += 1
+                logger.info(f"🚨 Alerta de heartbeat perdido agendado: {hb.name}")
+            
+        elif now > late_deadline:
+            # LATE - Passou do prazo mas ainda dentro da tolerância
+            hb.next_deadline = deadline
+            if hb.status != 'late':
+                hb.status = 'late'
+                stats["late"] += 1
+            
+        else:
+            # Ping mais novo que o prazo gravado: só reagenda
+            hb.next_deadline = late_deadline
+            stats["rescheduled"] += 1
+    
+    return stats
+
+
 @celery_app.task(name="check_heartbeats", bind=True, max_retries=3)
 def check_heartbeats(self):
     """
-    Verifica todos os heartbeats e detecta os que estão atrasados.
+    Aplica as transições dos heartbeats cujo prazo venceu.
     
     Lógica:
-    - Busca heartbeats ativos que já receberam pelo menos 1 ping
-    - Verifica se last_ping + expected_period + grace_period < now
-    - Se sim, marca como 'down' e envia alerta
-    - Se passou apenas o expected_period (mas ainda no grace), marca como 'late'
+    - Grava antes os pings ainda no buffer do Redis
+    - Busca apenas heartbeats com next_deadline <= agora (índice), em vez
+      de todos os ativos; o custo é proporcional às transições
+    - Marca 'late' após expected_period e 'down' após o grace_period,
+      enviando o alerta uma vez (ver _process_due_heartbeats)
     - Roda a cada 1 minuto via Celery Beat
     
     Returns:
         Dict com estatísticas da verificação
     """
-    from datetime import datetime, timezone, timedelta
-    from models import HeartbeatCheck
+    # Grava antes os pings ainda no buffer do Redis (evita falso "down")
+    try:
+        flush_pings()
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao gravar pings pendentes: {e}")
     
     db = SessionLocal()
     
     try:
         now = datetime.now(timezone.utc)
+        totals = defaultdict(int)
         
-        # Busca todos os heartbeats ativos
-        heartbeats = db.query(HeartbeatCheck).filter(
-            HeartbeatCheck.is_active == True
-        ).all()
-        
-        stats = {
-            "total_checked": len(heartbeats),
-            "up": 0,
-            "late": 0,
-            "down": 0,
-            "new": 0,
-            "alerts_sent": 0
-        }
-        
-        for hb in heartbeats:
-            # Heartbeats novos (sem ping ainda)
-            if not hb.last_ping:
-                stats["new"] += 1
-                continue
+        # Processa em lotes até não restar prazo vencido
+        while True:
+            stats = _process_due_heartbeats(db, now)
+            db.commit()
             
-            # Calcula deadline final (com grace period)
-            deadline = hb.last_ping + timedelta(
-                seconds=hb.expected_period + hb.grace_period
-            )
+            for key, value in stats.items():
+                totals[key] += value
             
-            # Calcula quando fica "late" (sem grace period)
-            late_deadline = hb.last_ping + timedelta(
-                seconds=hb.expected_period
+            if stats["total_checked"] < HEARTBEAT_MAX_BATCH:
+                break
+        
+        if totals["total_checked"]:
+            logger.info(
+                f"✅ Verificação de heartbeats concluída: "
+                f"{totals['late']} late, {totals['down']} down, "
+                f"{totals['rescheduled']} reagendados, {totals['alerts_sent']} alertas enviados"
             )
-            
-            # Verifica status
-            if now > deadline:
-                # OVERDUE - Passou do prazo + tolerância = DOWN
-                old_status = hb.status
-                hb.status = 'down'
-                hb.missed_pings += 1
-                stats["down"] += 1
-                
-                # Envia alerta apenas uma vez (quando muda de status)
-                if not hb.alert_sent and old_status != 'down':
-                    # Busca dono
-                    owner = db.query(User).filter(User.id == hb.owner_id).first()
-                    
-                    if owner and owner.telegram_chat_id:
-                        hours_late = int((now - deadline).total_seconds() / 3600)
-                        
-                        message = (
-                            f"🚨 <b>HEARTBEAT PERDIDO</b>\n\n"
-                            f"⚠️ <b>Tarefa:</b> {hb.name}\n"
-                            f"📋 <b>Descrição:</b> {hb.description or 'N/A'}\n"
-                            f"⏰ <b>Último ping:</b> {hb.last_ping.strftime('%d/%m/%Y %H:%M:%S')}\n"
-                            f"🕐 <b>Atrasado há:</b> {hours_late}h\n"
-                            f"⚙️ <b>Período esperado:</b> {hb.expected_period // 3600}h\n\n"
-                            f"💡 <b>Ação:</b> Verifique se o cron job/script está rodando corretamente!\n"
-                            f"🔗 <b>URL do ping:</b> /ping/{hb.slug}"
-                        )
-                        
-                        if send_telegram_alert(message, owner.telegram_chat_id):
-                            hb.alert_sent = True
-                            hb.alert_sent_at = now
-                            stats["alerts_sent"] += 1
-                            logger.info(f"🚨 Alerta de heartbeat perdido enviado: {hb.name}")
-                
-            elif now > late_deadline:
-                # LATE - Passou do prazo mas ainda dentro da tolerância
-                hb.status = 'late'
-                stats["late"] += 1
-                
-            else:
-                # UP - Dentro do prazo
-                hb.status = 'up'
-                stats["up"] += 1
         
-        db.commit()
+        return dict(totals)
         
-        logger.info(
-            f"✅ Verificação de heartbeats concluída: "
-            f"{stats['up']} up, {stats['late']} late, {stats['down']} down, "
-            f"{stats['new']} new, {stats['alerts_sent']} alertas enviados"
-        )
+    except Exception as e:
+        logger.error(f"❌ Erro ao verificar heartbeats: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task
+def dispatch_alerts() -> dict:
+    """
+    Envia os alertas Telegram enfileirados cuja janela de agrupamento venceu.
+    
+    Executada a cada ALERT_DISPATCH_TICK_SECONDS pelo Celery Beat (ver alerts.py).
+    
+    Returns:
+        Dict com chats processados e mensagens enviadas/reenfileiradas/descartadas
+    """
+    try:
+        stats = dispatch_due_alerts()
+        
+        if stats["chats"]:
+            logger.info(
+                f"📨 Alertas: {stats['sent']} mensagens enviadas para {stats['chats']} chats, "
+                f"{stats['retried']} reenfileiradas, {stats['dropped']} descartadas"
+            )
         
         return stats
         
     except Exception as e:
-        logger.error(f"❌ Erro ao verificar heartbeats: {e}")
+        logger.error(f"❌ Erro ao despachar alertas: {e}")
+        return {"error": str(e)}
+
+
+@celery_app.task
+def flush_heartbeat_pings() -> dict:
+    """
+    Grava em heartbeat_checks os pings acumulados no Redis pela rota /ping.
+    
+    Executada a cada HEARTBEAT_FLUSH_SECONDS pelo Celery Beat (ver heartbeat_store.py).
+    
+    Returns:
+        Dict com quantidade de heartbeats atualizados
+    """
+    try:
+        flushed = flush_pings()
+        
+        if flushed:
+            logger.info(f"💓 {flushed} heartbeats atualizados a partir do buffer")
+        
+        return {"flushed": flushed}
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao gravar pings de heartbeat: {e}")
+        return {"error": str(e)}
+
+
+@celery_app.task
+def refresh_admin_stats() -> dict:
+    """
+    Recalcula o snapshot de KPIs do dashboard executivo (admin_stats.py).
+    
+    Executada a cada ADMIN_STATS_REFRESH_SECONDS pelo Celery Beat; a rota
+    /admin/api/dashboard-stats só lê o snapshot.
+    
+    Returns:
+        Dict com o momento do snapshot
+    """
+    try:
+        snapshot = refresh_admin_snapshot()
+        return {"generated_at": snapshot["generated_at"]}
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao atualizar os KPIs do admin: {e}")
+        return {"error": str(e)}
+
+
+@celery_app.task
+def compact_monitor_rollups() -> dict:
+    """
+    Compacta os MonitorLogs em rollups de 5 minutos, 1 hora e 1 dia.
+    
+    Executada periodicamente pelo Celery Beat. É idempotente: recalcula
+    sempre o último intervalo de cada resolução (ver rollups.py).
+    
+    Returns:
+        Dict com quantidade de rollups gravados por resolução
+    """
+    db = SessionLocal()
+    
+    try:
+        written = compact_all(db)
+        
+        if any(written.values()):
+            logger.info(f"📊 Rollups compactados: {written}")
+        
+        return written
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao compactar rollups: {e}")
         db.rollback()
-        raise
+        return {"error": str(e)}
+        
+    finally:
+        db.close()
+
+
+@celery_app.task
+def maintain_monitor_logs() -> dict:
+    """
+    Manutenção diária de monitor_logs: cria as partições dos próximos meses
+    e remove as que passaram da retenção máxima (ver log_retention.py).
+    
+    Returns:
+        Dict com o que foi feito
+    """
+    db = SessionLocal()
+    
+    try:
+        result = apply_retention(db)
+        logger.info(f"🗄️ Retenção de logs aplicada: {result}")
+        return result
+        
+    except Exception as e:
+        logger.error(f"❌ Erro na retenção de logs: {e}")
+        db.rollback()
+        return {"error": str(e)}
+        
     finally:
         db.close()
@@ -0,0 +1,123 @@
+"""
+Testes - Máquina de Estados dos Alertas (alert_state.py)
+========================================================
+Confirmação N-de-M, histerese na recuperação, lembrete periódico e
+supressão de flapping do AlertStateStore, em um SQLite em memória.
+
+Execute com: python -m pytest -q test_alert_state.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import alert_state
+from alert_state import ALERT_RULES, AlertStateStore
+from database import Base
+
+SITE_ID = 1
+T0 = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def store():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    try:
+        yield AlertStateStore(db)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def rules(monkeypatch):
+    """Regras fixas (os padrões vêm de variáveis de ambiente)"""
+    monkeypatch.setitem(ALERT_RULES, "down", {
+        "window": 3, "threshold": 2, "recover": 2, "renotify_hours": 6, "notify_resolve": True,
+    })
+    monkeypatch.setitem(ALERT_RULES, "blacklist", {
+        "window": 1, "threshold": 1, "recover": 1, "renotify_hours": 0, "notify_resolve": True,
+    })
+    monkeypatch.setattr(alert_state, "ALERT_FLAP_THRESHOLD", 4)
+    monkeypatch.setattr(alert_state, "ALERT_FLAP_WINDOW_MINUTES", 60)
+
+
+def run(store, alert_type, results, start=T0, step=timedelta(minutes=5)):
+    """Avalia uma sequência de checks (True = falhou) e devolve os eventos"""
+    return [
+        store.evaluate(SITE_ID, alert_type, failing, now=start + index * step)
+        for index, failing in enumerate(results)
+    ]
+
+
+def test_healthy_site_creates_no_state(store):
+    assert run(store, "down", [False, False]) == [None, None]
+    assert store.get(SITE_ID, "down") is None
+
+
+def test_fires_after_n_of_m_failures(store):
+    # 2 falhas nos últimos 3 checks, mesmo sem serem seguidas
+    assert run(store, "down", [True, False, True]) == [None, None, "fire"]
+    assert store.get(SITE_ID, "down").status == "firing"
+
+
+def test_isolated_failures_do_not_fire(store):
+    # Falhas separadas por 2 checks OK nunca somam 2 na janela de 3
+    assert run(store, "down", [True, False, False, True, False, False, True]) == [None] * 7
+    assert store.get(SITE_ID, "down").status == "ok"
+
+
+def test_recovery_needs_consecutive_ok_checks(store):
+    events = run(store, "down", [True, True, False, True, False, False])
+
+    # Um OK isolado (histerese) não fecha o alerta; dois seguidos fecham
+    assert events == [None, "fire", None, None, None, "resolve"]
+    assert store.get(SITE_ID, "down").status == "ok"
+
+
+def test_renotifies_after_interval_while_firing(store):
+    assert run(store, "down", [True, True]) == [None, "fire"]
+    fired_at = T0 + timedelta(minutes=5)
+
+    assert store.evaluate(SITE_ID, "down", True, now=fired_at + timedelta(hours=5)) is None
+    assert store.evaluate(SITE_ID, "down", True, now=fired_at + timedelta(hours=6)) == "renotify"
+    # O intervalo recomeça a partir do lembrete
+    assert store.evaluate(SITE_ID, "down", True, now=fired_at + timedelta(hours=7)) is None
+    assert store.evaluate(SITE_ID, "down", True, now=fired_at + timedelta(hours=12)) == "renotify"
+
+
+def test_no_renotify_when_disabled(store):
+    assert store.evaluate(SITE_ID, "blacklist", True, now=T0) == "fire"
+    assert store.evaluate(SITE_ID, "blacklist", True, now=T0 + timedelta(days=30)) is None
+
+
+def test_changed_fingerprint_notifies_once(store):
+    assert store.evaluate(SITE_ID, "blacklist", True, "a", now=T0) == "fire"
+    assert store.evaluate(SITE_ID, "blacklist", True, "a", now=T0 + timedelta(minutes=5)) is None
+    assert store.evaluate(SITE_ID, "blacklist", True, "b", now=T0 + timedelta(minutes=10)) == "changed"
+    assert store.evaluate(SITE_ID, "blacklist", True, "b", now=T0 + timedelta(minutes=15)) is None
+
+
+def test_flapping_is_announced_once_and_suppressed(store):
+    # Abre e fecha a cada check: a 4ª transição na janela vira 'flapping'
+    events = run(store, "blacklist", [True, False, True, False, True, False])
+
+    assert events == ["fire", "resolve", "fire", "flapping", None, None]
+    assert store.get(SITE_ID, "blacklist").flapping
+
+
+def test_flapping_ends_with_current_state_after_quiet_window(store):
+    run(store, "blacklist", [True, False, True, False, True])
+    last_check = T0 + timedelta(minutes=20)
+
+    # Ainda dentro da janela: continua suspenso
+    assert store.evaluate(SITE_ID, "blacklist", True, now=last_check + timedelta(minutes=30)) is None
+
+    # Sem transições por ALERT_FLAP_WINDOW_MINUTES: avisa o estado atual (aberto)
+    assert store.evaluate(SITE_ID, "blacklist", True, now=last_check + timedelta(minutes=61)) == "fire"
+    assert not store.get(SITE_ID, "blacklist").flapping
@@ -0,0 +1,159 @@
+"""
+Testes - Rollups de MonitorLog (rollups.py)
+===========================================
+Compactação 5m → 1h → 1d, leitura com o final completado pelos logs
+brutos (get_site_buckets), recálculo do lookback para logs atrasados e
+retenção por resolução (prune_rollups), em um SQLite em memória.
+
+Execute com: python -m pytest -q test_rollups.py
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import rollups
+from database import Base
+from models import MonitorLog, MonitorRollup
+from rollups import (
+    ROLLUP_RETENTION, compact_all, compact_resolution, get_site_buckets,
+    pick_resolution, prune_rollups, summarize,
+)
+
+SITE_ID = 1
+NOW = datetime(2026, 1, 3, 2, 0)
+
+# 600 checks a cada 5 minutos nas últimas 50 horas, 1 em cada 10 offline
+LOG_COUNT = 600
+LOG_START = NOW - timedelta(minutes=5 * LOG_COUNT) + timedelta(minutes=1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch):
+    """Lookback e retenção fixos (os padrões vêm de variáveis de ambiente)"""
+    monkeypatch.setattr(rollups, "ROLLUP_LOOKBACK", timedelta(minutes=30))
+    monkeypatch.setitem(ROLLUP_RETENTION, "5m", timedelta(days=3))
+    monkeypatch.setitem(ROLLUP_RETENTION, "1h", timedelta(days=90))
+    monkeypatch.setitem(ROLLUP_RETENTION, "1d", timedelta(days=365))
+
+
+def add_log(db, checked_at, online=True):
+    db.add(MonitorLog(
+        site_id=SITE_ID,
+        status="online" if online else "offline",
+        http_status_code=200 if online else 503,
+        latency_ms=120.0 if online else None,
+        checked_at=checked_at,
+    ))
+
+
+@pytest.fixture
+def logs(db):
+    for index in range(LOG_COUNT):
+        add_log(db, LOG_START + timedelta(minutes=5 * index), online=index % 10 != 0)
+    db.commit()
+
+
+def compact_until(db, now, runs=15):
+    """Repete o compact_all (cada execução processa no máximo ROLLUP_MAX_WINDOW)"""
+    for _ in range(runs):
+        compact_all(db, now=now)
+
+
+def stored_checks(db, resolution):
+    return db.query(func.sum(MonitorRollup.check_count)).filter(
+        MonitorRollup.resolution == resolution
+    ).scalar() or 0
+
+
+@pytest.mark.parametrize("resolution", ["5m", "1h"])
+def test_buckets_match_raw_logs(db, logs, resolution):
+    compact_until(db, NOW)
+
+    stats = summarize(get_site_buckets(db, SITE_ID, NOW - timedelta(hours=50), NOW, resolution))
+
+    assert stats["total_checks"] == LOG_COUNT
+    assert stats["uptime_percent"] == pytest.approx(90.0)
+
+
+@pytest.mark.parametrize("resolution", ["5m", "1h"])
+def test_uncompacted_tail_comes_from_raw_logs(db, logs, resolution):
+    # Sem rollups, e com a compactação parada 20 horas atrás
+    stats = summarize(get_site_buckets(db, SITE_ID, NOW - timedelta(hours=50), NOW, resolution))
+    assert stats["total_checks"] == LOG_COUNT
+
+    compact_until(db, NOW - timedelta(hours=20))
+    stats = summarize(get_site_buckets(db, SITE_ID, NOW - timedelta(hours=50), NOW, resolution))
+
+    assert stats["total_checks"] == LOG_COUNT
+    assert stats["uptime_percent"] == pytest.approx(90.0)
+
+
+def test_late_log_reaches_compacted_buckets(db, logs):
+    compact_until(db, NOW)
+    assert stored_checks(db, "5m") == LOG_COUNT
+    assert stored_checks(db, "1h") == LOG_COUNT
+
+    # Commit atrasado: horário dentro de intervalos 5m e 1h já compactados
+    add_log(db, NOW - timedelta(minutes=19), online=False)
+    db.commit()
+    compact_all(db, now=NOW + timedelta(minutes=1))
+
+    assert stored_checks(db, "5m") == LOG_COUNT + 1
+    assert stored_checks(db, "1h") == LOG_COUNT + 1
+    assert stored_checks(db, "1d") == LOG_COUNT + 1
+
+
+def test_prune_keeps_source_until_consumer_recomputed(db, logs):
+    compact_until(db, NOW)
+    hourly = db.query(MonitorRollup).filter(MonitorRollup.resolution == "1h").count()
+
+    deleted = prune_rollups(db, now=NOW + timedelta(days=4))
+
+    # 5m passou da retenção, mas só some até o recálculo do 1h (último intervalo - 1h)
+    oldest_5m = db.query(func.min(MonitorRollup.bucket_start)).filter(MonitorRollup.resolution == "5m").scalar()
+    assert deleted["5m"] > 0
+    assert oldest_5m == datetime(2026, 1, 3, 0, 0)
+
+    # 1h e 1d dentro da retenção
+    assert deleted["1h"] == 0
+    assert deleted["1d"] == 0
+    assert db.query(MonitorRollup).filter(MonitorRollup.resolution == "1h").count() == hourly
+
+
+def test_prune_skips_source_without_consumer_rollups(db, logs):
+    for _ in range(15):
+        compact_resolution(db, "5m", now=NOW)
+    five_minute = db.query(MonitorRollup).filter(MonitorRollup.resolution == "5m").count()
+
+    deleted = prune_rollups(db, now=NOW + timedelta(days=30))
+
+    assert deleted["5m"] == 0
+    assert db.query(MonitorRollup).filter(MonitorRollup.resolution == "5m").count() == five_minute
+
+
+def test_pick_resolution_respects_retention(monkeypatch):
+    assert pick_resolution(24) == "5m"
+    assert pick_resolution(24 * 7) == "1h"
+    assert pick_resolution(24 * 60) == "1d"
+
+    # Janela maior que a retenção da preferida: passa para a próxima mais grossa
+    monkeypatch.setitem(ROLLUP_RETENTION, "5m", timedelta(days=1))
+    monkeypatch.setitem(ROLLUP_RETENTION, "1h", timedelta(days=5))
+    assert pick_resolution(36) == "1h"
+    assert pick_resolution(24 * 7) == "1d"
@@ -0,0 +1,200 @@
+"""
+SentinelWeb - Cache de Usuários da Autenticação
+===============================================
+Toda rota autenticada decodifica o JWT e precisaria buscar o usuário no
+banco, inclusive cada XHR dos gráficos (/api/sites/{id}/history). Este
+módulo guarda só a projeção que a autenticação usa (AuthUser) por
+AUTH_USER_CACHE_TTL segundos:
+
+- Cache LRU do processo (padrão)
+- Opcionalmente no Redis (AUTH_USER_CACHE_REDIS=true), compartilhado
+  entre os workers do uvicorn: a invalidação vale para todos na hora
+
+Sem Redis, a invalidação só alcança o processo que fez a alteração; os
+outros workers enxergam a mudança em até AUTH_USER_CACHE_TTL segundos.
+
+Invalide (invalidate_user) sempre que mudar is_active, is_superuser,
+plan_status ou telegram_chat_id de um usuário.
+
+Chaves no Redis:
+    auth:user:{id}  → JSON do AuthUser (TTL = AUTH_USER_CACHE_TTL)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import User
+from redis_pool import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Validade da projeção em cache (segundos, 0 = desativado)
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "10000"))
+
+# Guarda no Redis em vez do processo (invalidação imediata em todos os workers)
+AUTH_USER_CACHE_REDIS = os.getenv("AUTH_USER_CACHE_REDIS", "false").lower() == "true"
+
+CACHE_KEY = "auth:user:{}"
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    """Projeção do User usada pela autenticação (somente leitura)"""
+    id: int
+    is_active: bool
+    is_superuser: bool
+    plan_status: str
+    telegram_chat_id: Optional[str] = None
+
+
+class UserCache:
+    """
+    Cache LRU id → AuthUser com expiração. Thread-safe: as dependências
+    síncronas do FastAPI rodam no threadpool.
+    """
+
+    def __init__(self, ttl: float = AUTH_USER_CACHE_TTL, max_entries: int = AUTH_USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[float, AuthUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> Optional[AuthUser]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+
+            expires, user = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user: AuthUser) -> None:
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# ============================================
+# CACHE DO PROCESSO
+# ============================================
+
+_pid: Optional[int] = None
+_cache: Optional[UserCache] = None
+
+
+def get_user_cache() -> UserCache:
+    """Cache do processo (recriado após fork)"""
+    global _pid, _cache
+
+    if _cache is None or _pid != os.getpid():
+        _pid = os.getpid()
+        _cache = UserCache()
+
+    return _cache
+
+
+# ============================================
+# CONSULTA E INVALIDAÇÃO
+# ============================================
+
+async def _load_auth_user(user_id: int) -> Optional[AuthUser]:
+    """Busca a projeção no banco (AsyncSession própria, só no cache miss)"""
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(User.id, User.is_active, User.is_superuser, User.plan_status, User.telegram_chat_id)
+            .where(User.id == user_id)
+        )).first()
+
+    if not row:
+        return None
+
+    return AuthUser(
+        id=row.id,
+        is_active=bool(row.is_active),
+        is_superuser=bool(row.is_superuser),
+        plan_status=row.plan_status,
+        telegram_chat_id=row.telegram_chat_id
+    )
+
+
+async def get_auth_user(user_id: int) -> Optional[AuthUser]:
+    """
+    Projeção do usuário: cache (processo ou Redis) → banco.
+
+    Returns:
+        AuthUser ou None se o usuário não existir
+    """
+    if AUTH_USER_CACHE_TTL <= 0:
+        return await _load_auth_user(user_id)
+
+    if not AUTH_USER_CACHE_REDIS:
+        cache = get_user_cache()
+        user = cache.get(user_id)
+        if user is None:
+            user = await _load_auth_user(user_id)
+            if user is not None:
+                cache.put(user)
+        return user
+
+    key = CACHE_KEY.format(user_id)
+    try:
+        cached = await get_async_redis().get(key)
+        if cached:
+            return AuthUser(**json.loads(cached))
+    except Exception as e:
+        logger.warning(f"⚠️ Redis indisponível para o cache de usuários: {e}")
+        return await _load_auth_user(user_id)
+
+    user = await _load_auth_user(user_id)
+    if user is not None:
+        try:
+            await get_async_redis().set(key, json.dumps(asdict(user)), ex=max(1, int(AUTH_USER_CACHE_TTL)))
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível gravar o usuário {user_id} no Redis: {e}")
+    return user
+
+
+def invalidate_user(user_id: int) -> None:
+    """Descarta a projeção do usuário (após alterar plano, status ou perfil)"""
+    get_user_cache().invalidate(user_id)
+
+    if AUTH_USER_CACHE_REDIS:
+        try:
+            get_redis().delete(CACHE_KEY.format(user_id))
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao invalidar o usuário {user_id} no Redis: {e}")
@@ -0,0 +1,281 @@
+"""
+SentinelWeb - Cache de Whois
+============================
+A consulta Whois é a mais lenta de todos os checks (conexão TCP com o
+servidor do TLD, às vezes com referral para o registrar) e a data de
+expiração quase nunca muda. Este módulo:
+
+- Guarda o resultado por domínio no Redis, compartilhado entre sites,
+  usuários e o preview (scan_site_immediate)
+- Calcula quando consultar de novo conforme a distância da expiração
+  (refresh_interval): semanal longe do vencimento, diário perto dele
+- Limita as consultas simultâneas por servidor Whois (um por TLD),
+  entre todos os workers, para não tomar bloqueio por rate limit
+
+No banco, o resultado fica no próprio site (domain_expiration_date,
+last_whois_check) junto com whois_next_check_at, que o
+dispatch_slow_checks usa para despachar o check na fila "whois".
+
+Chaves no Redis:
+    whois:{domínio}       → JSON {expiration, checked_at} (TTL = próximo refresh)
+    whois:slots:{tld}     → sorted set dos tokens de quem está consultando o TLD
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+
+# Intervalo de refresh conforme os dias até a expiração
+WHOIS_REFRESH_FAR_DAYS = float(os.getenv("WHOIS_REFRESH_FAR_DAYS", "7"))    # mais de 90 dias
+WHOIS_REFRESH_MID_DAYS = float(os.getenv("WHOIS_REFRESH_MID_DAYS", "3"))    # entre 30 e 90 dias
+WHOIS_REFRESH_NEAR_DAYS = float(os.getenv("WHOIS_REFRESH_NEAR_DAYS", "1"))  # até 30 dias (ou expirado)
+WHOIS_FAR_HORIZON_DAYS = int(os.getenv("WHOIS_FAR_HORIZON_DAYS", "90"))
+WHOIS_NEAR_HORIZON_DAYS = int(os.getenv("WHOIS_NEAR_HORIZON_DAYS", "30"))
+
+# Nova tentativa quando o Whois falha ou não informa a expiração
+WHOIS_RETRY_HOURS = float(os.getenv("WHOIS_RETRY_HOURS", "12"))
+
+# Consultas simultâneas por servidor Whois (TLD), somando todos os workers
+WHOIS_TLD_CONCURRENCY = int(os.getenv("WHOIS_TLD_CONCURRENCY", "2"))
+
+# Espera máxima por uma vaga do TLD antes de desistir (o check volta no próximo ciclo)
+WHOIS_SLOT_WAIT_SECONDS = float(os.getenv("WHOIS_SLOT_WAIT_SECONDS", "60"))
+
+# Vaga de um worker que morreu no meio da consulta é liberada após este tempo
+WHOIS_SLOT_TIMEOUT_SECONDS = int(os.getenv("WHOIS_SLOT_TIMEOUT_SECONDS", "120"))
+
+CACHE_KEY = "whois:{}"
+SLOTS_KEY = "whois:slots:{}"
+
+
+class WhoisSlotTimeout(Exception):
+    """Não houve vaga no servidor Whois do TLD dentro de WHOIS_SLOT_WAIT_SECONDS"""
+
+
+def whois_domain(domain: str) -> str:
+    """Mesma limpeza do check_domain_expiration (chave do cache)"""
+    clean = domain.strip().lower()
+    for prefix in ("https://", "http://"):
+        if clean.startswith(prefix):
+            clean = clean[len(prefix):]
+    if clean.startswith("www."):
+        clean = clean[4:]
+    return clean.split("/")[0].split("?")[0].rstrip(".")
+
+
+def _tld(domain: str) -> str:
+    return domain.rsplit(".", 1)[-1] if "." in domain else domain
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+# ============================================
+# CADÊNCIA DE REFRESH
+# ============================================
+
+def refresh_interval(expiration: Optional[datetime], now: Optional[datetime] = None) -> timedelta:
+    """
+    Tempo até a próxima consulta Whois do domínio.
+
+    Args:
+        expiration: Data de expiração conhecida (None = falhou / sem data)
+        now: Momento de referência (padrão: agora, UTC)
+
+    Returns:
+        - Sem data: WHOIS_RETRY_HOURS
+        - Mais de WHOIS_FAR_HORIZON_DAYS: WHOIS_REFRESH_FAR_DAYS (semanal)
+        - Até WHOIS_NEAR_HORIZON_DAYS ou já expirado: WHOIS_REFRESH_NEAR_DAYS (diário)
+        - Entre os dois: WHOIS_REFRESH_MID_DAYS
+    """
+    if expiration is None:
+        return timedelta(hours=WHOIS_RETRY_HOURS)
+
+    now = now or datetime.now(timezone.utc)
+    days_left = (_as_utc(expiration) - _as_utc(now)).total_seconds() / 86400
+
+    if days_left > WHOIS_FAR_HORIZON_DAYS:
+        return timedelta(days=WHOIS_REFRESH_FAR_DAYS)
+    if days_left > WHOIS_NEAR_HORIZON_DAYS:
+        return timedelta(days=WHOIS_REFRESH_MID_DAYS)
+    return timedelta(days=WHOIS_REFRESH_NEAR_DAYS)
+
+
+# ============================================
+# CACHE NO REDIS
+# ============================================
+
+def get_cached(domain: str) -> Optional[Tuple[Optional[datetime], datetime]]:
+    """
+    Resultado em cache do domínio.
+
+    Returns:
+        (expiração ou None, momento da consulta), ou None se não houver
+        cache válido (ou o Redis estiver indisponível)
+    """
+    try:
+        raw = get_redis().get(CACHE_KEY.format(whois_domain(domain)))
+    except Exception as e:
+        logger.warning(f"⚠️ Redis indisponível para o cache de Whois: {e}")
+        return None
+
+    if not raw:
+        return None
+
+    data = json.loads(raw)
+    expiration = datetime.fromisoformat(data["expiration"]) if data.get("expiration") else None
+    return expiration, datetime.fromisoformat(data["checked_at"])
+
+
+def store(domain: str, expiration: Optional[datetime], checked_at: Optional[datetime] = None) -> timedelta:
+    """
+    Guarda o resultado no Redis até o próximo refresh.
+
+    Returns:
+        O intervalo de refresh usado como TTL
+    """
+    checked_at = checked_at or datetime.now(timezone.utc)
+    interval = refresh_interval(expiration, checked_at)
+
+    payload = json.dumps({
+        "expiration": _as_utc(expiration).isoformat() if expiration else None,
+        "checked_at": _as_utc(checked_at).isoformat(),
+    })
+
+    try:
+        get_redis().set(CACHE_KEY.format(whois_domain(domain)), payload, ex=max(1, int(interval.total_seconds())))
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível gravar o Whois de {domain} no Redis: {e}")
+
+    return interval
+
+
+# ============================================
+# LIMITE POR SERVIDOR WHOIS (TLD)
+# ============================================
+
+_local_lock = threading.Lock()
+_local_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def _local_slot(tld: str) -> threading.BoundedSemaphore:
+    """Semáforo do processo, usado quando o Redis está indisponível"""
+    with _local_lock:
+        if tld not in _local_slots:
+            _local_slots[tld] = threading.BoundedSemaphore(max(1, WHOIS_TLD_CONCURRENCY))
+        return _local_slots[tld]
+
+
+def _try_acquire(client, key: str, token: str) -> bool:
+    """
+    Semáforo distribuído em um sorted set (score = momento da entrada).
+    Entradas mais velhas que WHOIS_SLOT_TIMEOUT_SECONDS são de workers mortos.
+    """
+    now = time.time()
+    pipe = client.pipeline()
+    pipe.zremrangebyscore(key, "-inf", now - WHOIS_SLOT_TIMEOUT_SECONDS)
+    pipe.zadd(key, {token: now})
+    pipe.zrank(key, token)
+    pipe.expire(key, WHOIS_SLOT_TIMEOUT_SECONDS)
+    _, _, rank, _ = pipe.execute()
+
+    if rank is not None and rank < max(1, WHOIS_TLD_CONCURRENCY):
+        return True
+
+    client.zrem(key, token)
+    return False
+
+
+@contextmanager
+def tld_slot(domain: str):
+    """
+    Segura uma vaga do servidor Whois do TLD do domínio.
+
+    Raises:
+        WhoisSlotTimeout: Se não houver vaga em WHOIS_SLOT_WAIT_SECONDS
+    """
+    tld = _tld(whois_domain(domain))
+    key = SLOTS_KEY.format(tld)
+    token = uuid.uuid4().hex
+
+    try:
+        client = get_redis()
+        client.ping()
+    except Exception as e:
+        logger.warning(f"⚠️ Redis indisponível, limite de Whois por TLD só neste processo: {e}")
+        client = None
+
+    if client is None:
+        semaphore = _local_slot(tld)
+        if not semaphore.acquire(timeout=WHOIS_SLOT_WAIT_SECONDS):
+            raise WhoisSlotTimeout(f"Sem vaga no servidor Whois de .{tld}")
+        try:
+            yield
+        finally:
+            semaphore.release()
+        return
+
+    deadline = time.monotonic() + WHOIS_SLOT_WAIT_SECONDS
+    delay = 0.2
+    while not _try_acquire(client, key, token):
+        if time.monotonic() >= deadline:
+            raise WhoisSlotTimeout(f"Sem vaga no servidor Whois de .{tld}")
+        time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+    try:
+        yield
+    finally:
+        try:
+            client.zrem(key, token)
+        except Exception:
+            pass  # Expira sozinha após WHOIS_SLOT_TIMEOUT_SECONDS
+
+
+# ============================================
+# CONSULTA COM CACHE
+# ============================================
+
+def lookup_expiration(domain: str, use_cache: bool = True) -> Tuple[Optional[datetime], datetime]:
+    """
+    Data de expiração do domínio: cache do Redis → Whois (com vaga do TLD).
+
+    O resultado da consulta (inclusive "sem data") vai para o cache com
+    TTL de refresh_interval(). Falta de vaga no TLD não é guardada.
+
+    Returns:
+        (expiração ou None, momento da consulta) — do cache, o momento da
+        consulta original, para o próximo refresh ser contado a partir dele
+
+    Raises:
+        WhoisSlotTimeout: Se o servidor Whois do TLD estiver saturado
+    """
+    # Import tardio: a migração usa refresh_interval sem carregar o scanner
+    from scanner import check_domain_expiration
+
+    if use_cache:
+        cached = get_cached(domain)
+        if cached is not None:
+            return cached
+
+    with tld_slot(domain):
+        expiration = check_domain_expiration(domain)
+
+    checked_at = datetime.now(timezone.utc)
+    store(domain, expiration, checked_at)
+    return expiration, checked_at